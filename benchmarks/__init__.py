@@ -0,0 +1,18 @@
+"""
+Benchmarks do gerador de dashboards SPSS.
+
+- synthetic_sav: gera arquivos .sav sintéticos (sem dados de clientes) com
+  filtros demográficos, MR binárias e categóricas, baterias de escala,
+  respostas abertas, peso e rótulos de valores.
+- run_benchmarks: mede cada etapa do pipeline em vários tamanhos e grava
+  o resultado em JSON (benchmarks/results/) para comparar execuções.
+- js/dashboard_harness.js: roda o JavaScript de um dashboard no Node (DOM
+  mínimo, Chart.js simulado) e mede trocas de filtro e as funções de render.
+
+Uso:
+    python -m benchmarks.synthetic_sav saida.sav --respondents 20000
+    python -m benchmarks.run_benchmarks --sizes 1000,10000,50000
+    python -m benchmarks.run_benchmarks --compare antes.json depois.json
+    python -m benchmarks.run_benchmarks --sizes 10000 --js
+    node benchmarks/js/dashboard_harness.js 2025_comunicacao.html --json js.json
+"""
@@ -0,0 +1,272 @@
+#!/usr/bin/env node
+// Benchmark do JavaScript dos dashboards gerados, sem navegador.
+//
+// Carrega cada página com o DOM mínimo de dom_stub.js (Chart.js e afins são
+// stubs), instrumenta os caminhos quentes (getFilteredRecords, render*...) e
+// repete uma sequência de trocas de filtro, medindo o tempo de cada passo e
+// de cada função. Funciona com as páginas novas (FILTER_SELECTION /
+// setFilterSelection) e com as antigas, em que o filtro é lido dos checkboxes.
+//
+// Uso:
+//   node benchmarks/js/dashboard_harness.js 2025_comunicacao.html [mais.html...]
+//        [--repeat 5] [--scenario passos.json] [--auto-filters 2] [--cold]
+//        [--json saida.json]
+//
+// Cenário (--scenario): lista de passos; cada passo define o estado completo
+//   [{"label": "Sul", "filters": {"REGIAO": ["Sul"]}},
+//    {"label": "idade", "ranges": {"IDADE": [18, 40]}},
+//    {"label": "limpar", "clear": true}]
+'use strict';
+
+const fs = require('fs');
+const path = require('path');
+const { performance } = require('perf_hooks');
+const { loadPage } = require('./dom_stub');
+
+const HOT_PATHS = [
+  'renderAll', 'getFilteredRecords', 'createSection',
+  'renderCategoricalVariable', 'renderNumericScaleVariable', 'renderStringVariable', 'renderDateVariable',
+  'renderTrendVariable', 'aggregateCategorical', 'aggregateNumericScale', 'aggregateString', 'aggregateDate',
+  'aggregateTrend', 'computeFacetCounts', 'setFilterSelection', 'setRangeSelection',
+];
+const AUTO_FILTER_MAX_VALUES = 12;
+
+function parseArgs(argv) {
+  const args = { pages: [], repeat: 5, scenario: null, autoFilters: 2, cold: false, json: null, verbose: false };
+  for (let i = 0; i < argv.length; i++) {
+    const a = argv[i];
+    if (a === '--repeat') args.repeat = Math.max(1, parseInt(argv[++i], 10));
+    else if (a === '--scenario') args.scenario = argv[++i];
+    else if (a === '--auto-filters') args.autoFilters = parseInt(argv[++i], 10);
+    else if (a === '--cold') args.cold = true;
+    else if (a === '--json') args.json = argv[++i];
+    else if (a === '-v' || a === '--verbose') args.verbose = true;
+    else if (a === '-h' || a === '--help') { args.help = true; }
+    else args.pages.push(a);
+  }
+  return args;
+}
+
+function percentile(sorted, p) {
+  if (!sorted.length) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+}
+
+function summarize(samples) {
+  const sorted = samples.slice().sort((a, b) => a - b);
+  const total = samples.reduce((s, x) => s + x, 0);
+  return {
+    n: samples.length,
+    total_ms: +total.toFixed(3),
+    mean_ms: +(samples.length ? total / samples.length : 0).toFixed(3),
+    median_ms: +percentile(sorted, 0.5).toFixed(3),
+    p95_ms: +percentile(sorted, 0.95).toFixed(3),
+    min_ms: +(sorted[0] || 0).toFixed(3),
+  };
+}
+
+// Troca as funções globais por versões cronometradas (tempo inclusivo)
+function instrument(page, timings) {
+  for (const name of HOT_PATHS) {
+    const original = page.win[name];
+    if (typeof original !== 'function') continue;
+    timings[name] = [];
+    page.win[name] = function (...args) {
+      const t0 = performance.now();
+      try {
+        return original.apply(this, args);
+      } finally {
+        timings[name].push(performance.now() - t0);
+      }
+    };
+  }
+}
+
+function pageData(page) {
+  return page.run(`({
+    records: RECORDS,
+    vars: VARS_META,
+    filters: FILTERS,
+    ranges: typeof RANGE_FILTERS !== 'undefined' ? RANGE_FILTERS : [],
+  })`);
+}
+
+// Páginas antigas sem filtros: usa variáveis simples de poucas categorias
+// como filtros, para que haja o que medir em getFilteredRecords
+function addAutoFilters(page, data, count) {
+  if (count <= 0 || data.filters.length || typeof page.win.setFilterSelection === 'function') return [];
+  const added = [];
+  for (const v of data.vars) {
+    if (added.length >= count) break;
+    if (v.type !== 'single' || v.measure === 'scale') continue;
+    const values = new Set();
+    for (const r of data.records) {
+      const x = r[v.name];
+      if (x !== null && x !== undefined && x !== '') values.add(String(x).trim());
+      if (values.size > AUTO_FILTER_MAX_VALUES) break;
+    }
+    if (values.size < 2 || values.size > AUTO_FILTER_MAX_VALUES) continue;
+    data.filters.push({ name: v.name, title: v.title || v.name, values: [...values].sort() });
+    added.push(v.name);
+  }
+  if (added.length) page.win.buildFilters();
+  return added;
+}
+
+function topValues(data, name, k) {
+  const freq = new Map();
+  for (const r of data.records) {
+    const x = r[name];
+    if (x === null || x === undefined || x === '') continue;
+    const key = String(x).trim();
+    freq.set(key, (freq.get(key) || 0) + 1);
+  }
+  return [...freq.entries()].sort((a, b) => b[1] - a[1]).slice(0, k).map(([v]) => v);
+}
+
+// Sequência padrão: cada filtro sozinho, todos juntos, faixas, repetição
+// de um estado já visto (acerto de cache nas páginas novas) e limpeza
+function defaultScenario(data) {
+  const steps = [{ label: 'todos', clear: true }];
+  const top = {};
+  for (const f of data.filters) {
+    top[f.name] = topValues(data, f.name, 2);
+    if (top[f.name].length) steps.push({ label: `${f.name}=${top[f.name][0]}`, filters: { [f.name]: [top[f.name][0]] } });
+  }
+  if (data.filters.length > 1) {
+    const filters = {};
+    data.filters.forEach(f => { if (top[f.name].length) filters[f.name] = top[f.name]; });
+    steps.push({ label: 'combinado', filters });
+  }
+  for (const rf of data.ranges) {
+    const sv = rf.sorted_values || [];
+    if (sv.length < 4) continue;
+    const from = sv[Math.floor(sv.length * 0.25)];
+    const to = sv[Math.floor(sv.length * 0.75)];
+    steps.push({ label: `${rf.name} p25–p75`, ranges: { [rf.name]: [from, to] } });
+  }
+  if (steps.length > 1) steps.push(Object.assign({}, steps[1], { label: steps[1].label + ' (de novo)' }));
+  steps.push({ label: 'limpar', clear: true });
+  return steps;
+}
+
+function setLegacySelection(page, name, values) {
+  const content = page.doc.getElementById(name + 'Content');
+  if (!content) return;
+  const wanted = new Set((values || []).map(String));
+  content.querySelectorAll('.dropdown-option:not(.select-all) input').forEach(cb => { cb.checked = wanted.has(String(cb.value)); });
+}
+
+function applyStep(page, data, step) {
+  const w = page.win;
+  if (step.clear) { w.clearFilters(); return; }
+  const modern = typeof w.setFilterSelection === 'function';
+  for (const f of data.filters) {
+    const values = (step.filters && step.filters[f.name]) || [];
+    if (modern) w.setFilterSelection(f.name, values);
+    else setLegacySelection(page, f.name, values);
+  }
+  if (typeof w.setRangeSelection === 'function') {
+    for (const rf of data.ranges) {
+      const range = step.ranges && step.ranges[rf.name];
+      if (range) w.setRangeSelection(rf.name, range[0], range[1]);
+      else w.setRangeSelection(rf.name, null, null);
+    }
+  }
+  w.applyFilters();
+}
+
+const flush = () => new Promise(resolve => setTimeout(resolve, 0));
+
+async function benchPage(file, args) {
+  const timings = {};
+  const t0 = performance.now();
+  const page = loadPage(file, { verbose: args.verbose, beforeReady: p => instrument(p, timings) });
+  const loadMs = performance.now() - t0;
+  await flush();
+  const data = pageData(page);
+  const autoFilters = addAutoFilters(page, data, args.autoFilters);
+  const scenario = args.scenario ? JSON.parse(fs.readFileSync(args.scenario, 'utf8')) : defaultScenario(data);
+
+  // As medições por função contam só a partir dos passos do cenário
+  for (const name in timings) timings[name].length = 0;
+  const stepSamples = scenario.map(() => []);
+  const hasCache = page.run("typeof RESULT_CACHE !== 'undefined'");
+  for (let round = 0; round < args.repeat; round++) {
+    for (let i = 0; i < scenario.length; i++) {
+      if (args.cold && hasCache) page.run('RESULT_CACHE.clear()');
+      const start = performance.now();
+      try {
+        applyStep(page, data, scenario[i]);
+      } catch (e) {
+        page.errors.push(`${scenario[i].label}: ${e.message}`);
+      }
+      stepSamples[i].push(performance.now() - start);
+      await flush();
+    }
+  }
+
+  const functions = {};
+  for (const name in timings) if (timings[name].length) functions[name] = summarize(timings[name]);
+  return {
+    page: path.basename(file),
+    bytes: fs.statSync(file).size,
+    records: data.records.length,
+    variables: data.vars.length,
+    filters: data.filters.map(f => f.name),
+    auto_filters: autoFilters,
+    range_filters: data.ranges.map(r => r.name),
+    load_ms: +loadMs.toFixed(3),
+    charts: page.charts.length,
+    steps: scenario.map((step, i) => Object.assign({ step: step.label || `passo ${i + 1}` }, summarize(stepSamples[i]))),
+    functions,
+    errors: page.errors.slice(0, 20),
+  };
+}
+
+function printReport(r) {
+  const filters = r.filters.length ? r.filters.join(', ') + (r.auto_filters.length ? ' (automáticos)' : '') : 'nenhum';
+  console.log(`\n📊 ${r.page} — ${r.records} registros, ${r.variables} variáveis, filtros: ${filters}`);
+  console.log(`   carga inicial ${r.load_ms.toFixed(1)} ms`);
+  console.log(`   ${'passo'.padEnd(32)} ${'mediana'.padStart(10)} ${'p95'.padStart(10)} ${'mín'.padStart(10)}`);
+  for (const s of r.steps) {
+    console.log(`   ${s.step.slice(0, 32).padEnd(32)} ${s.median_ms.toFixed(2).padStart(8)}ms ${s.p95_ms.toFixed(2).padStart(8)}ms ${s.min_ms.toFixed(2).padStart(8)}ms`);
+  }
+  console.log(`   ${'função'.padEnd(32)} ${'chamadas'.padStart(10)} ${'total'.padStart(10)} ${'média'.padStart(10)} ${'p95'.padStart(10)}`);
+  for (const [name, f] of Object.entries(r.functions).sort((a, b) => b[1].total_ms - a[1].total_ms)) {
+    console.log(`   ${name.padEnd(32)} ${String(f.n).padStart(10)} ${f.total_ms.toFixed(1).padStart(8)}ms ${f.mean_ms.toFixed(3).padStart(8)}ms ${f.p95_ms.toFixed(3).padStart(8)}ms`);
+  }
+  if (r.errors.length) console.log(`   ⚠️ ${r.errors.length} erro(s): ${r.errors[0]}`);
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+  if (args.help || !args.pages.length) {
+    console.log('Uso: node dashboard_harness.js PAGINA.html [...] [--repeat N] [--scenario passos.json] [--auto-filters N] [--cold] [--json saida.json]');
+    return args.help ? 0 : 2;
+  }
+  const results = [];
+  for (const file of args.pages) {
+    const result = await benchPage(file, args);
+    printReport(result);
+    results.push(result);
+  }
+  if (args.json) {
+    const report = {
+      generated_at: new Date().toISOString(),
+      node: process.version,
+      repeat: args.repeat,
+      cold: args.cold,
+      results,
+    };
+    fs.writeFileSync(args.json, JSON.stringify(report, null, 2));
+    console.log(`\n📝 Resultados: ${args.json}`);
+  }
+  return 0;
+}
+
+if (require.main === module) {
+  main().then(code => { process.exitCode = code; }, e => { console.error('❌ ' + (e.stack || e)); process.exitCode = 1; });
+}
+
+module.exports = { benchPage, defaultScenario, HOT_PATHS };
@@ -0,0 +1,350 @@
+// DOM mínimo para executar os dashboards gerados no Node (sem navegador).
+// Cobre só o que os scripts da página usam: árvore de elementos, seletores
+// simples (tag, #id, .classe, [attr], :checked, :not()), eventos, estilos e
+// stubs de Chart.js, XLSX, html2canvas e jsPDF. Nada é desenhado.
+'use strict';
+
+const vm = require('vm');
+const fs = require('fs');
+const path = require('path');
+const { performance } = require('perf_hooks');
+
+class ClassList {
+  constructor(el) { this.el = el; }
+  _get() { return (this.el.className || '').split(/\s+/).filter(Boolean); }
+  _set(list) { this.el.className = list.join(' '); }
+  add(...names) { const list = this._get(); names.forEach(n => { if (!list.includes(n)) list.push(n); }); this._set(list); }
+  remove(...names) { this._set(this._get().filter(n => !names.includes(n))); }
+  contains(name) { return this._get().includes(name); }
+  toggle(name, force) {
+    const want = force === undefined ? !this.contains(name) : !!force;
+    if (want) this.add(name); else this.remove(name);
+    return want;
+  }
+}
+
+function matchesSimple(el, sel) {
+  sel = sel.trim();
+  const nots = [];
+  sel = sel.replace(/:not\(([^)]*)\)/g, (_, s) => { nots.push(s); return ''; });
+  let checked = false;
+  if (sel.includes(':checked')) { checked = true; sel = sel.replace(':checked', ''); }
+  const attrs = [];
+  sel = sel.replace(/\[([\w-]+)(?:="?([^"\]]*)"?)?\]/g, (_, k, v) => { attrs.push([k, v]); return ''; });
+  const tag = sel.match(/^[a-zA-Z][\w-]*/);
+  if (tag && el.tagName.toLowerCase() !== tag[0].toLowerCase()) return false;
+  for (const id of sel.match(/#[\w-]+/g) || []) if (el.id !== id.slice(1)) return false;
+  for (const c of sel.match(/\.[\w-]+/g) || []) if (!el.classList.contains(c.slice(1))) return false;
+  for (const [k, v] of attrs) {
+    const val = el.getAttribute(k);
+    if (val === null || val === undefined) return false;
+    if (v !== undefined && String(val) !== v) return false;
+  }
+  if (checked && !el.checked) return false;
+  for (const n of nots) if (matchesSimple(el, n)) return false;
+  return true;
+}
+
+// Seletores descendentes ("a .b c") e listas ("a, b"); sem combinadores > + ~
+function matches(el, selector) {
+  return selector.split(',').some(part => {
+    const chain = part.trim().split(/\s+/);
+    if (!matchesSimple(el, chain[chain.length - 1])) return false;
+    let cur = el.parentNode;
+    let i = chain.length - 2;
+    while (i >= 0 && cur) {
+      if (cur.tagName && matchesSimple(cur, chain[i])) i--;
+      cur = cur.parentNode;
+    }
+    return i < 0;
+  });
+}
+
+const counters = { nodes: 0 };
+
+class Element {
+  constructor(tag, doc) {
+    this.tagName = tag.toUpperCase();
+    this.ownerDocument = doc;
+    this.children = [];
+    this.parentNode = null;
+    this.attributes = {};
+    this.style = { cssText: '', setProperty() {}, removeProperty() {} };
+    this.dataset = {};
+    this.className = '';
+    this.id = '';
+    this._text = '';
+    this.listeners = {};
+    this.classList = new ClassList(this);
+    this.scrollTop = 0;
+    this.clientHeight = 400;
+    this.offsetHeight = 0;
+    counters.nodes++;
+  }
+  get childNodes() { return this.children; }
+  get firstChild() { return this.children[0] || null; }
+  get lastChild() { return this.children[this.children.length - 1] || null; }
+  get firstElementChild() { return this.firstChild; }
+  get childElementCount() { return this.children.length; }
+  get nextElementSibling() {
+    if (!this.parentNode) return null;
+    const siblings = this.parentNode.children;
+    return siblings[siblings.indexOf(this) + 1] || null;
+  }
+  appendChild(c) {
+    if (c.isFragment) { c.children.slice().forEach(x => this.appendChild(x)); c.children = []; return c; }
+    if (c.parentNode) c.parentNode.removeChild(c);
+    c.parentNode = this;
+    this.children.push(c);
+    return c;
+  }
+  append(...cs) { cs.forEach(c => this.appendChild(typeof c === 'string' ? this.ownerDocument.createTextNode(c) : c)); }
+  insertBefore(c, ref) {
+    if (c.parentNode) c.parentNode.removeChild(c);
+    const i = ref ? this.children.indexOf(ref) : -1;
+    c.parentNode = this;
+    if (i < 0) this.children.push(c); else this.children.splice(i, 0, c);
+    return c;
+  }
+  removeChild(c) {
+    const i = this.children.indexOf(c);
+    if (i >= 0) this.children.splice(i, 1);
+    c.parentNode = null;
+    return c;
+  }
+  remove() { if (this.parentNode) this.parentNode.removeChild(this); }
+  replaceChildren(...cs) { this.children.forEach(c => { c.parentNode = null; }); this.children = []; cs.forEach(c => this.appendChild(c)); }
+  set innerHTML(v) {
+    this.children.forEach(c => { c.parentNode = null; });
+    this.children = [];
+    this._text = '';
+    parseFragment(this, String(v));
+  }
+  get innerHTML() { return this.children.map(c => c.outerHTML).join(''); }
+  get outerHTML() {
+    const t = this.tagName.toLowerCase();
+    const attrs = Object.entries(this.attributes).map(([k, v]) => ` ${k}="${escapeAttr(v)}"`).join('');
+    const open = '<' + t + (this.id ? ` id="${escapeAttr(this.id)}"` : '') + (this.className ? ` class="${escapeAttr(this.className)}"` : '') + attrs + '>';
+    return VOID_TAGS.has(t) ? open : open + escapeText(this._text) + this.innerHTML + '</' + t + '>';
+  }
+  set textContent(v) { this.innerHTML = ''; this._text = String(v); }
+  get textContent() { return this._text + this.children.map(c => c.textContent).join(''); }
+  set innerText(v) { this.textContent = v; }
+  get innerText() { return this.textContent; }
+  setAttribute(k, v) { this.attributes[k] = String(v); if (k === 'id') this.id = v; if (k === 'class') this.className = v; }
+  getAttribute(k) {
+    if (k === 'id') return this.id || null;
+    if (k === 'class') return this.className || null;
+    if (k.startsWith('data-')) {
+      const key = k.slice(5).replace(/-(\w)/g, (_, c) => c.toUpperCase());
+      if (key in this.dataset) return String(this.dataset[key]);
+    }
+    if (k in this) { const v = this[k]; if (typeof v !== 'object' && typeof v !== 'function') return v; }
+    return k in this.attributes ? this.attributes[k] : null;
+  }
+  hasAttribute(k) { return this.getAttribute(k) !== null; }
+  removeAttribute(k) { delete this.attributes[k]; }
+  addEventListener(t, fn) { (this.listeners[t] = this.listeners[t] || []).push(fn); }
+  removeEventListener(t, fn) { this.listeners[t] = (this.listeners[t] || []).filter(f => f !== fn); }
+  dispatchEvent(ev) {
+    ev.target = ev.target || this;
+    ev.currentTarget = this;
+    (this.listeners[ev.type] || []).forEach(f => f.call(this, ev));
+    const handler = this['on' + ev.type];
+    if (typeof handler === 'function') handler.call(this, ev);
+    return true;
+  }
+  click() { this.dispatchEvent({ type: 'click', stopPropagation() {}, preventDefault() {} }); }
+  focus() {}
+  blur() {}
+  scrollIntoView() {}
+  scrollTo(o) { if (o && typeof o.top === 'number') this.scrollTop = o.top; }
+  getBoundingClientRect() { return { top: 0, left: 0, width: 800, height: this.clientHeight, bottom: this.clientHeight, right: 800 }; }
+  closest(sel) { let c = this; while (c && c.tagName) { if (matches(c, sel)) return c; c = c.parentNode; } return null; }
+  matches(sel) { return matches(this, sel); }
+  _walk(fn) { for (const c of this.children) { if (c.tagName) { fn(c); c._walk(fn); } } }
+  querySelectorAll(sel) { const out = []; this._walk(c => { if (matches(c, sel)) out.push(c); }); return out; }
+  querySelector(sel) { return this.querySelectorAll(sel)[0] || null; }
+  getElementsByTagName(t) { return this.querySelectorAll(t); }
+  getElementsByClassName(c) { return this.querySelectorAll('.' + c); }
+  getContext() { return { canvas: this }; }
+  get isConnected() { let c = this; while (c.parentNode) c = c.parentNode; return c === this.ownerDocument.documentElement; }
+}
+
+class TextNode {
+  constructor(t) { this.nodeType = 3; this._t = String(t); this.parentNode = null; this.children = []; }
+  get textContent() { return this._t; }
+  set textContent(v) { this._t = String(v); }
+  get outerHTML() { return escapeText(this._t); }
+  _walk() {}
+}
+
+// ----- innerHTML: parser de fragmentos (tags, atributos, texto, entidades básicas) -----
+const VOID_TAGS = new Set(['area', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'wbr']);
+const ENTITIES = { amp: '&', lt: '<', gt: '>', quot: '"', apos: "'", nbsp: '\u00a0' };
+
+function decodeEntities(s) {
+  return s.replace(/&(#x[0-9a-f]+|#\d+|\w+);/gi, (m, e) => {
+    if (e[0] === '#') return String.fromCodePoint(e[1] === 'x' || e[1] === 'X' ? parseInt(e.slice(2), 16) : parseInt(e.slice(1), 10));
+    return e in ENTITIES ? ENTITIES[e] : m;
+  });
+}
+const escapeText = s => String(s).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+const escapeAttr = s => escapeText(s).replace(/"/g, '&quot;');
+
+function setParsedAttribute(el, name, value) {
+  if (name === 'id') el.id = value;
+  else if (name === 'class') el.className = value;
+  else if (name === 'style') el.style.cssText = value;
+  else if (name.startsWith('data-')) el.dataset[name.slice(5).replace(/-(\w)/g, (_, c) => c.toUpperCase())] = value;
+  else if (name === 'checked' || name === 'selected' || name === 'disabled') el[name] = true;
+  else if (name === 'value' || name === 'type') el[name] = value;
+  else el.attributes[name] = value;
+}
+
+function parseFragment(parent, html) {
+  if (!html.includes('<')) { if (html) parent.appendChild(new TextNode(decodeEntities(html))); return; }
+  const doc = parent.ownerDocument;
+  const stack = [parent];
+  const tagRe = /<\/?([a-zA-Z][\w-]*)((?:\s+[^\s=>\/]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>]+))?)*)\s*\/?>|<!--[\s\S]*?-->/g;
+  const attrRe = /([^\s=>\/]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?/g;
+  let last = 0;
+  let m;
+  while ((m = tagRe.exec(html))) {
+    const top = stack[stack.length - 1];
+    if (m.index > last) top.appendChild(new TextNode(decodeEntities(html.slice(last, m.index))));
+    last = tagRe.lastIndex;
+    if (!m[1]) continue;  // comentário
+    const tag = m[1].toLowerCase();
+    if (m[0][1] === '/') {
+      for (let i = stack.length - 1; i > 0; i--) {
+        if (stack[i].tagName.toLowerCase() === tag) { stack.length = i; break; }
+      }
+      continue;
+    }
+    const el = doc.createElement(tag);
+    let a;
+    attrRe.lastIndex = 0;
+    while ((a = attrRe.exec(m[2] || ''))) {
+      const value = a[2] !== undefined ? a[2] : a[3] !== undefined ? a[3] : a[4] !== undefined ? a[4] : '';
+      setParsedAttribute(el, a[1].toLowerCase(), decodeEntities(value));
+    }
+    top.appendChild(el);
+    if (!VOID_TAGS.has(tag) && !m[0].endsWith('/>')) stack.push(el);
+  }
+  if (last < html.length) stack[stack.length - 1].appendChild(new TextNode(decodeEntities(html.slice(last))));
+}
+
+function makeDocument() {
+  const doc = { listeners: {}, readyState: 'loading' };
+  doc.createElement = t => new Element(t, doc);
+  doc.createElementNS = (_, t) => new Element(t, doc);
+  doc.createTextNode = t => new TextNode(t);
+  doc.createDocumentFragment = () => { const f = new Element('fragment', doc); f.isFragment = true; return f; };
+  doc.documentElement = new Element('html', doc);
+  doc.head = doc.createElement('head');
+  doc.body = doc.createElement('body');
+  doc.documentElement.appendChild(doc.head);
+  doc.documentElement.appendChild(doc.body);
+  doc.getElementById = id => { let r = null; doc.documentElement._walk(c => { if (!r && c.id === id) r = c; }); return r; };
+  doc.querySelectorAll = s => doc.documentElement.querySelectorAll(s);
+  doc.querySelector = s => doc.documentElement.querySelector(s);
+  doc.addEventListener = (t, fn) => { (doc.listeners[t] = doc.listeners[t] || []).push(fn); };
+  doc.removeEventListener = (t, fn) => { doc.listeners[t] = (doc.listeners[t] || []).filter(f => f !== fn); };
+  doc.dispatch = (t, ev) => (doc.listeners[t] || []).forEach(f => f(ev || { type: t, target: doc.body }));
+  return doc;
+}
+
+// O HTML estático não é interpretado: cria só os elementos com id do <body>
+// (contêineres que os scripts procuram com getElementById)
+function seedBody(doc, bodyHtml) {
+  for (const m of bodyHtml.matchAll(/<(\w+)([^>]*)\bid="([^"]+)"([^>]*)>/g)) {
+    const [, tag, before, id, after] = m;
+    if (tag === 'script' || tag === 'style') continue;
+    const el = doc.createElement(tag);
+    el.id = id;
+    const cls = /class="([^"]*)"/.exec(before + after);
+    if (cls) el.className = cls[1];
+    doc.body.appendChild(el);
+  }
+}
+
+// Scripts da página na ordem: os embutidos e os locais (src relativo que
+// existe ao lado do HTML, como o dicionário de rótulos); CDNs ficam de fora
+function pageScripts(html, file) {
+  const scripts = [];
+  for (const m of html.matchAll(/<script([^>]*)>([\s\S]*?)<\/script>/g)) {
+    const src = /\bsrc="([^"]+)"/.exec(m[1]);
+    if (!src) { scripts.push({ code: m[2], filename: file }); continue; }
+    const local = path.join(path.dirname(file), src[1]);
+    if (!/^([a-z]+:)?\/\//i.test(src[1]) && fs.existsSync(local)) {
+      scripts.push({ code: fs.readFileSync(local, 'utf8'), filename: local });
+    }
+  }
+  return scripts;
+}
+
+/**
+ * Carrega a página num contexto vm. opts.beforeReady(page) roda depois dos
+ * scripts e antes do DOMContentLoaded (para instrumentar funções globais).
+ */
+function loadPage(file, opts = {}) {
+  const html = fs.readFileSync(file, 'utf8');
+  const doc = makeDocument();
+  seedBody(doc, html.split(/<body[^>]*>/)[1] || '');
+  const errors = [];
+  const charts = [];
+  const noop = () => {};
+  const quietConsole = { log: noop, info: noop, debug: noop, table: noop, group: noop, groupEnd: noop, time: noop, timeEnd: noop,
+    warn: noop, error: (...a) => errors.push(a.map(String).join(' ')) };
+  class Chart {
+    constructor(ctx, cfg) { this.ctx = ctx; this.config = cfg; this.data = cfg && cfg.data; charts.push(this); }
+    destroy() {}
+    update() {}
+    resize() {}
+  }
+  const win = {
+    document: doc,
+    console: opts.verbose ? console : quietConsole,
+    setTimeout, clearTimeout, setInterval, clearInterval, queueMicrotask,
+    requestAnimationFrame: fn => setTimeout(() => fn(performance.now()), 0),
+    cancelAnimationFrame: clearTimeout,
+    requestIdleCallback: fn => setTimeout(() => fn({ timeRemaining: () => 50, didTimeout: false }), 0),
+    cancelIdleCallback: clearTimeout,
+    performance,
+    navigator: { userAgent: 'node', language: 'pt-BR' },
+    location: { href: 'file://' + file, protocol: 'file:', search: '', hash: '', pathname: file },
+    alert: m => errors.push('alert: ' + m),
+    confirm: () => true,
+    addEventListener: (t, fn) => doc.addEventListener('window:' + t, fn),
+    removeEventListener: noop,
+    getComputedStyle: () => ({ getPropertyValue: () => '' }),
+    matchMedia: () => ({ matches: false, addListener: noop, addEventListener: noop }),
+    IntersectionObserver: class { observe() {} unobserve() {} disconnect() {} },
+    ResizeObserver: class { observe() {} unobserve() {} disconnect() {} },
+    Chart,
+    XLSX: { utils: { book_new: () => ({ sheets: [] }), aoa_to_sheet: a => a, book_append_sheet: (wb, ws, n) => wb.sheets.push([n, ws]) }, writeFile: noop },
+    html2canvas: () => Promise.resolve(new Element('canvas', doc)),
+    jspdf: { jsPDF: class { addImage() {} addPage() {} save() {} text() {} } },
+    print: noop,
+    fetch: opts.fetch,
+  };
+  win.window = win;
+  win.self = win;
+  win.parent = win;
+  win.top = win;
+  win.postMessage = noop;
+  win.HTMLElement = Element;
+  win.Element = Element;
+
+  const ctx = vm.createContext(win);
+  const page = { file, html, win, doc, ctx, errors, charts, run: code => vm.runInContext(code, ctx) };
+  for (const script of pageScripts(html, file)) vm.runInContext(script.code, ctx, { filename: script.filename });
+  if (opts.beforeReady) opts.beforeReady(page);
+  doc.readyState = 'complete';
+  doc.dispatch('DOMContentLoaded');
+  (doc.listeners['window:load'] || []).forEach(f => f({ type: 'load' }));
+  return page;
+}
+
+module.exports = { loadPage, makeDocument, Element, counters };
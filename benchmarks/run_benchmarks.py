@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do pipeline completo (leitura → metadados → perfil das colunas →
+detecção → registros → palavras-chave → HTML → gravação) em vários tamanhos
+de pesquisa sintética.
+
+Cada execução grava benchmarks/results/<data>_<commit>.json com o ambiente e,
+por tamanho, o melhor tempo (parede) de cada etapa entre as repetições.
+--compare mostra a variação etapa a etapa entre dois desses arquivos.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+import gerador_spss_5_0 as gerador  # noqa: E402
+from benchmarks.synthetic_sav import DATASET_VERSION, dataset_variables, write_synthetic_sav  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+JS_HARNESS = os.path.join(ROOT, "benchmarks", "js", "dashboard_harness.js")
+DEFAULT_SIZES = "1000,10000,50000"
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def dataset_path(respondents: int, seed: int) -> str:
+    """Gera o .sav sintético na primeira vez; depois reaproveita o arquivo."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"synthetic_{respondents}_s{seed}_v{DATASET_VERSION}.sav")
+    if not os.path.exists(path):
+        print(f"🧪 Gerando {os.path.basename(path)}...")
+        write_synthetic_sav(path, respondents=respondents, seed=seed)
+    return path
+
+
+def run_pipeline(path: str, out_dir: str, trace_memory: bool) -> List[dict]:
+    """Uma geração completa, com as mesmas etapas do --profile da CLI."""
+    report_vars, filter_vars, weight_var = dataset_variables(path)
+    profiler = gerador.PROFILER
+    profiler.start(trace_memory=trace_memory)
+    try:
+        with profiler.stage("read"):
+            df, meta = gerador.read_sav_auto(path)
+        with profiler.stage("meta_fix"):
+            gerador.fix_labels_in_meta(meta)
+        with profiler.stage("columns", columns=len(df.columns)):
+            gerador.profile_columns(df, meta)
+
+        file_source = os.path.basename(path)
+        created_at, vars_meta, filters_meta, records, value_orders, code_to_label = gerador.build_records_and_meta(
+            df, meta, report_vars, filter_vars, file_source, "Benchmark", weight_var
+        )
+        html = gerador.render_html_with_working_filters(
+            file_source, created_at, "Benchmark", vars_meta, filters_meta, records, value_orders, code_to_label
+        )
+        with profiler.stage("write", bytes=len(html.encode("utf-8"))):
+            with open(os.path.join(out_dir, "dashboard.html"), "w", encoding="utf-8") as f:
+                f.write(html)
+        profiler.end()
+        return list(profiler.stages)
+    finally:
+        profiler.stop()
+
+
+def run_js_harness(html_path: str, repeat: int) -> Optional[dict]:
+    """Mede o JavaScript do dashboard gerado com o harness do Node (se houver node)."""
+    node = shutil.which("node")
+    if not node:
+        print("⚠️ node não encontrado: medição do JavaScript ignorada")
+        return None
+    json_path = html_path + ".js.json"
+    proc = subprocess.run([node, JS_HARNESS, html_path, "--repeat", str(repeat), "--json", json_path],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(f"⚠️ Harness JavaScript falhou: {proc.stderr.strip()[:300]}")
+        return None
+    with open(json_path, encoding="utf-8") as f:
+        return json.load(f)["results"][0]
+
+
+def best_of(runs: List[List[dict]]) -> List[dict]:
+    """Por etapa, a repetição de menor tempo de parede (menos ruído do sistema)."""
+    best: Dict[str, dict] = {}
+    order: List[str] = []
+    for stages in runs:
+        for st in stages:
+            name = st["stage"]
+            if name not in best:
+                order.append(name)
+                best[name] = st
+            elif st["wall_s"] < best[name]["wall_s"]:
+                best[name] = st
+    return [best[name] for name in order]
+
+
+def run_benchmarks(sizes: List[int], repeat: int, seed: int, trace_memory: bool, js: bool = False) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for size in sizes:
+            path = dataset_path(size, seed)
+            runs = []
+            for i in range(repeat):
+                print(f"⏱️ {size:>8} respondentes • execução {i + 1}/{repeat}")
+                runs.append(run_pipeline(path, out_dir, trace_memory))
+            stages = best_of(runs)
+            result = {
+                "respondents": size,
+                "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+                "total_wall_s": round(sum(st["wall_s"] for st in stages), 4),
+                "stages": stages,
+            }
+            if js:
+                result["js"] = run_js_harness(os.path.join(out_dir, "dashboard.html"), repeat)
+            results.append(result)
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "seed": seed,
+        "trace_memory": trace_memory,
+        "results": results,
+    }
+
+
+def print_summary(report: dict) -> None:
+    for res in report["results"]:
+        print(f"\n📊 {res['respondents']} respondentes ({res['file_mb']} MB) — {res['total_wall_s']:.3f}s")
+        for st in res["stages"]:
+            memory = f"{st['peak_mb']:>8.1f} MB pico" if st.get("peak_mb") is not None else ""
+            print(f"   {st['stage']:<10} {st['wall_s']:>8.3f}s parede  {st['cpu_s']:>8.3f}s CPU  {memory}")
+        js = res.get("js")
+        if js:
+            print(f"   JavaScript: carga {js['load_ms']:.1f} ms")
+            for step in js["steps"]:
+                print(f"     {step['step'][:28]:<28} {step['median_ms']:>8.2f} ms (mediana)")
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Variação por tamanho e etapa entre dois relatórios do benchmark."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"🔍 {old.get('commit')} ({old.get('generated_at')}) → {new.get('commit')} ({new.get('generated_at')})")
+    old_by_size = {res["respondents"]: res for res in old["results"]}
+    for res in new["results"]:
+        before = old_by_size.get(res["respondents"])
+        if before is None:
+            print(f"\n⚠️ {res['respondents']} respondentes: ausente em {os.path.basename(old_path)}")
+            continue
+        print(f"\n📊 {res['respondents']} respondentes")
+        old_stages = {st["stage"]: st for st in before["stages"]}
+        rows = [(st["stage"], old_stages.get(st["stage"], {}).get("wall_s"), st["wall_s"]) for st in res["stages"]]
+        rows.append(("TOTAL", before["total_wall_s"], res["total_wall_s"]))
+        for name, a, b in rows:
+            if a is None:
+                print(f"   {name:<10} {'-':>9}  → {b:>8.3f}s")
+                continue
+            delta = (b - a) / a * 100 if a else 0.0
+            mark = "🟢" if delta <= -5 else "🔴" if delta >= 5 else "  "
+            print(f"   {name:<10} {a:>8.3f}s → {b:>8.3f}s  {delta:+7.1f}% {mark}")
+        old_js, new_js = before.get("js"), res.get("js")
+        if old_js and new_js:
+            old_steps = {st["step"]: st["median_ms"] for st in old_js["steps"]}
+            for st in new_js["steps"]:
+                a = old_steps.get(st["step"])
+                if a:
+                    delta = (st["median_ms"] - a) / a * 100
+                    print(f"   JS {st['step'][:20]:<20} {a:>8.2f}ms → {st['median_ms']:>8.2f}ms  {delta:+7.1f}%")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark do gerador de dashboards SPSS")
+    p.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Respondentes por rodada (padrão {DEFAULT_SIZES})")
+    p.add_argument("--repeat", type=int, default=3, help="Repetições por tamanho (vale a melhor)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--memory", action="store_true",
+                   help="Mede o pico de memória com tracemalloc (deixa os tempos mais lentos)")
+    p.add_argument("--js", action="store_true",
+                   help="Mede também o JavaScript do dashboard gerado (benchmarks/js, requer node)")
+    p.add_argument("-o", "--output", default=None, help="JSON de saída (padrão benchmarks/results/)")
+    p.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"), help="Compara dois JSON e sai")
+    args = p.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    # O benchmark só quer os números: o progresso do gerador fica em silêncio
+    logging.getLogger("gerador_spss").setLevel(logging.WARNING)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run_benchmarks(sizes, max(1, args.repeat), args.seed, args.memory, args.js)
+    print_summary(report)
+
+    out_path = args.output
+    if not out_path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out_path = os.path.join(RESULTS_DIR, f"{stamp}_{report['commit']}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n📝 Resultados: {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gerador de arquivos .sav sintéticos para benchmark.
+
+Os nomes e rótulos seguem os padrões que o gerador reconhece em pesquisas
+reais: P05_1..P05_k com rótulos "[Item] Pergunta" viram MR binária,
+P10_1..P10_k com a mesma lista de códigos viram MR categórica (códigos de
+assunto não sequenciais, senão a detecção os toma por escala), P20_1..P20_k
+ordinais de 1 a 5 viram bateria de escala, P30.. são respostas abertas,
+REGIAO/SEXO/FAIXA_ETARIA servem de filtro, MUNICIPIO tem alta cardinalidade
+e PESO é a variável de ponderação. write_synthetic_sav confere com a própria
+detecção do gerador que cada grupo cai no subtipo esperado.
+"""
+
+import argparse
+import inspect
+import os
+import sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyreadstat
+
+REGIOES = {1: "Norte", 2: "Nordeste", 3: "Centro-Oeste", 4: "Sudeste", 5: "Sul"}
+SEXOS = {1: "Masculino", 2: "Feminino", 3: "Outro"}
+FAIXAS = {1: "18 a 24", 2: "25 a 34", 3: "35 a 44", 4: "45 a 59", 5: "60 ou mais"}
+SIM_NAO = {0: "Não", 1: "Sim"}
+AVALIACAO = {1: "Muito ruim", 2: "Ruim", 3: "Regular", 4: "Bom", 5: "Muito bom"}
+CANAIS = ["Site", "E-mail", "Revista", "WhatsApp", "Instagram", "Rádio", "TV", "Jornal",
+          "Eventos", "Intranet", "Mural", "Podcast"]
+# Códigos agrupados por tema (11, 12, 21...), como nos livros de códigos reais;
+# uma sequência 1..k faria detect_mr_type_improved ver uma escala numérica
+ASSUNTOS = {11: "Benefícios", 12: "Saúde", 13: "Previdência", 21: "Investimentos",
+            22: "Educação financeira", 31: "Eventos", 32: "Cultura", 33: "Esporte",
+            41: "Notícias", 42: "Serviços"}
+# Muda quando o conteúdo gerado muda: os .sav em cache de versões antigas não são reaproveitados
+DATASET_VERSION = 2
+PALAVRAS = ["informação", "comunicação", "atendimento", "site", "revista", "benefício",
+            "saúde", "plano", "clareza", "rapidez", "conteúdo", "melhorar", "ótimo",
+            "ruim", "aplicativo", "linguagem", "acesso", "notícias", "prazo", "contato"]
+
+
+def generate_dataset(respondents: int = 1000, categorical: int = 10, mr_binary: int = 2,
+                     mr_categorical: int = 1, mr_items: int = 6, batteries: int = 2,
+                     battery_items: int = 5, open_ended: int = 2, municipalities: int = 1500,
+                     weights: bool = True, seed: int = 42) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Monta o DataFrame e os metadados (rótulos de variáveis e valores, medidas)
+    de uma pesquisa sintética. Retorna (df, kwargs para pyreadstat.write_sav).
+    """
+    rng = np.random.default_rng(seed)
+    n = respondents
+    columns: Dict[str, np.ndarray] = {}
+    labels: Dict[str, str] = {}
+    value_labels: Dict[str, Dict] = {}
+    measures: Dict[str, str] = {}
+
+    def add(name, values, label, vlabels=None, measure=None):
+        columns[name] = values
+        labels[name] = label
+        if vlabels:
+            value_labels[name] = vlabels
+        if measure:
+            measures[name] = measure
+
+    # ----- Filtros demográficos e alta cardinalidade -----
+    add("REGIAO", rng.choice(list(REGIOES), n, p=[0.1, 0.25, 0.1, 0.4, 0.15]).astype(float),
+        "Região", REGIOES, "nominal")
+    add("SEXO", rng.choice(list(SEXOS), n, p=[0.48, 0.5, 0.02]).astype(float), "Sexo", SEXOS, "nominal")
+    add("FAIXA_ETARIA", rng.integers(1, 6, n).astype(float), "Faixa etária", FAIXAS, "ordinal")
+    # Cauda longa: poucos municípios grandes, muitos pequenos
+    municipio = np.minimum(rng.zipf(1.3, n), municipalities).astype(float)
+    add("MUNICIPIO", municipio, "Município",
+        {float(i): f"Município {i}" for i in range(1, municipalities + 1)}, "nominal")
+    add("IDADE", rng.integers(18, 90, n).astype(float), "Idade", measure="scale")
+    if weights:
+        add("PESO", np.round(rng.lognormal(0, 0.25, n), 4), "Peso amostral", measure="scale")
+
+    # ----- Categóricas simples -----
+    for i in range(categorical):
+        name = f"Q{i + 1:02d}"
+        if i % 2:
+            add(name, rng.integers(1, 6, n).astype(float), f"Avaliação geral do item {i + 1}",
+                AVALIACAO, "ordinal")
+        else:
+            add(name, rng.integers(0, 2, n).astype(float), f"Conhece o canal {i + 1}?",
+                SIM_NAO, "nominal")
+
+    # ----- MR binária: P05_1..P05_k (0/1 com rótulo "[Item] Pergunta") -----
+    for g in range(mr_binary):
+        base = f"P{5 + g:02d}"
+        for k in range(mr_items):
+            canal = CANAIS[k % len(CANAIS)]
+            add(f"{base}_{k + 1}", (rng.random(n) < 0.15 + 0.6 / (k + 1)).astype(float),
+                f"[{canal}] Por quais canais você se informa? (grupo {g + 1})", SIM_NAO, "nominal")
+
+    # ----- MR categórica: P10_1..P10_k (cada item guarda um código de assunto) -----
+    for g in range(mr_categorical):
+        base = f"P{10 + g:02d}"
+        for k in range(min(mr_items, 3)):
+            values = rng.choice(list(ASSUNTOS), n).astype(float)
+            values[rng.random(n) < 0.2 * k] = np.nan
+            add(f"{base}_{k + 1}", values, f"Assuntos de interesse - {k + 1}ª opção", ASSUNTOS, "nominal")
+
+    # ----- Baterias de escala: P20_1..P20_k (1 a 5) -----
+    for g in range(batteries):
+        base = f"P{20 + g:02d}"
+        for k in range(battery_items):
+            add(f"{base}_{k + 1}", rng.integers(1, 6, n).astype(float),
+                f"Satisfação [{CANAIS[k % len(CANAIS)]}]", AVALIACAO, "ordinal")
+
+    # ----- Respostas abertas -----
+    for g in range(open_ended):
+        words = rng.choice(PALAVRAS, (n, 6))
+        sizes = rng.integers(0, 7, n)
+        texts = [" ".join(row[:size]).capitalize() for row, size in zip(words, sizes)]
+        add(f"P{30 + g:02d}", np.array(texts, dtype=object), f"Comentários e sugestões ({g + 1})")
+
+    # ----- Data de envio -----
+    start = pd.Timestamp("2024-03-01")
+    columns["submitdate"] = (start + pd.to_timedelta(rng.integers(0, 45 * 24 * 60, n), unit="min")).values
+    labels["submitdate"] = "Data de envio"
+
+    df = pd.DataFrame(columns)
+    meta_kwargs = {
+        "column_labels": labels,
+        "variable_value_labels": value_labels,
+        "variable_measure": measures,
+    }
+    return df, meta_kwargs
+
+
+def mr_subtypes(path: str) -> Dict[str, str]:
+    """Grupos MR (nome → mr_subtype) que o gerador detecta no .sav."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import gerador_spss_5_0 as gerador
+
+    df, meta = gerador.read_sav_auto(path)
+    gerador.fix_labels_in_meta(meta)
+    groups, _ = gerador.detect_mr_groups_improved(list(df.columns), meta, df)
+    return {name: group["mr_subtype"] for name, group in groups.items()}
+
+def write_synthetic_sav(path: str, **params) -> str:
+    """
+    Gera e grava o .sav; params são os de generate_dataset. Confere que os
+    grupos P05.. são MR binárias, os P10.. MR categóricas e que as baterias
+    P20.. não viraram MR.
+    """
+    df, meta_kwargs = generate_dataset(**params)
+    pyreadstat.write_sav(df, path, **meta_kwargs)
+
+    spec = {name: param.default for name, param in inspect.signature(generate_dataset).parameters.items()}
+    spec.update(params)
+    expected = {f"mr_p{5 + g:02d}": "binary" for g in range(spec["mr_binary"])}
+    expected.update({f"mr_p{10 + g:02d}": "categorical" for g in range(spec["mr_categorical"])})
+    detected = mr_subtypes(path)
+    for name, subtype in expected.items():
+        if detected.get(name) != subtype:
+            raise RuntimeError(f"{name}: detectado {detected.get(name)!r}, esperado {subtype!r}")
+    batteries = [f"mr_p{20 + g:02d}" for g in range(spec["batteries"])]
+    if set(batteries) & set(detected):
+        raise RuntimeError(f"baterias detectadas como MR: {sorted(set(batteries) & set(detected))}")
+    return path
+
+
+def dataset_variables(path: str) -> Tuple[List[str], List[str], str]:
+    """(variáveis do relatório, variáveis-filtro, peso) de um .sav gerado aqui."""
+    _, meta = pyreadstat.read_sav(path, metadataonly=True)
+    names = list(meta.column_names)
+    filters = [v for v in ("REGIAO", "SEXO", "FAIXA_ETARIA") if v in names]
+    weight = "PESO" if "PESO" in names else None
+    report = [v for v in names if v not in filters and v not in ("PESO", "submitdate")]
+    return report, filters, weight
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Gera um .sav sintético para benchmark")
+    p.add_argument("output", help="Arquivo .sav de saída")
+    p.add_argument("--respondents", type=int, default=1000)
+    p.add_argument("--categorical", type=int, default=10, help="Categóricas simples")
+    p.add_argument("--mr-binary", type=int, default=2, help="Grupos MR binários")
+    p.add_argument("--mr-categorical", type=int, default=1, help="Grupos MR categóricos")
+    p.add_argument("--mr-items", type=int, default=6, help="Itens por grupo MR")
+    p.add_argument("--batteries", type=int, default=2, help="Baterias de escala")
+    p.add_argument("--battery-items", type=int, default=5)
+    p.add_argument("--open-ended", type=int, default=2, help="Respostas abertas")
+    p.add_argument("--municipalities", type=int, default=1500, help="Categorias de MUNICIPIO")
+    p.add_argument("--no-weights", action="store_true")
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+
+    write_synthetic_sav(
+        args.output, respondents=args.respondents, categorical=args.categorical,
+        mr_binary=args.mr_binary, mr_categorical=args.mr_categorical, mr_items=args.mr_items,
+        batteries=args.batteries, battery_items=args.battery_items, open_ended=args.open_ended,
+        municipalities=args.municipalities, weights=not args.no_weights, seed=args.seed,
+    )
+    size_mb = os.path.getsize(args.output) / 1024 / 1024
+    print(f"✅ {args.output}: {args.respondents} respondentes ({size_mb:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
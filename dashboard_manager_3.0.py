@@ -6,10 +6,114 @@ Sistema otimizado onde análises SPSS sobrepõem header e Dashboard Master só f
 """
 
 import os
+import re
 import json
+import gzip
+import hashlib
 import sys
+import unicodedata
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import brotli  # opcional: sem ele a publicação grava só .gz
+except ImportError:
+    brotli = None
+
+# Quantas análises o Dashboard Master mantém carregadas (iframes ocultos)
+DEFAULT_IFRAME_POOL_SIZE = 3
+# Orçamento do pré-carregamento (hover/ociosidade) de análises no master
+DEFAULT_PREFETCH_BUDGET_KB = 2048
+# "iframe": uma página completa por análise; "runtime": um único runtime do
+# dashboard (gerador_spss_5_0.py --runtime) que troca só os dados (<análise>.data.js)
+MASTER_MODES = ("iframe", "runtime")
+RUNTIME_PAGE = "spss_runtime.html"
+# Cache offline do site publicado: service worker + manifesto com hash de conteúdo
+SERVICE_WORKER = "sw.js"
+ASSET_MANIFEST = "asset-manifest.json"
+# Bibliotecas das CDNs referenciadas pelas páginas (scripts e folhas de estilo)
+CDN_ASSET_PATTERNS = (
+    re.compile(r'<script\b[^>]*\bsrc="(https://[^"]+)"'),
+    re.compile(r'<link\b[^>]*\brel="stylesheet"[^>]*\bhref="(https://[^"]+)"'),
+)
+# Publicação pré-comprimida: irmãos .gz/.br, manifesto e exemplos de configuração
+PUBLISH_MANIFEST = "publish-manifest.json"
+NGINX_SAMPLE = "publish-nginx.conf"
+APACHE_SAMPLE = "publish-apache.htaccess"
+# Nomes com hash de conteúdo (ex.: dicionário de rótulos): cache longo e imutável
+HASHED_NAME_PATTERN = re.compile(r"\.[0-9a-f]{12}\.js$")
+SHARED_LABELS_PATTERN = re.compile(r'<script src="([^"/]+\.labels\.[0-9a-f]+\.js)"></script>')
+
+# Exemplos gravados por publish_site. HTML, sw.js e manifestos mantêm o nome a
+# cada publicação: "no-cache" (o navegador revalida com ETag e recebe 304 se não
+# mudou). Só nomes com hash de conteúdo ganham cache longo e imutável.
+NGINX_SAMPLE_CONF = r"""# Dashboard Master — arquivos pré-comprimidos (gerado por dashboard_manager_3.0.py)
+# Inclua no bloco server {} do site. brotli_static requer o módulo ngx_brotli;
+# sem ele, remova essas linhas (o .gz continua valendo).
+location / {
+    gzip_static on;
+    brotli_static on;
+    add_header Vary Accept-Encoding;
+    add_header Cache-Control "no-cache";
+}
+
+location ~* "\.[0-9a-f]{12}\.js$" {
+    gzip_static on;
+    brotli_static on;
+    add_header Vary Accept-Encoding;
+    add_header Cache-Control "public, max-age=31536000, immutable";
+}
+"""
+
+APACHE_SAMPLE_CONF = r"""# Dashboard Master — arquivos pré-comprimidos (gerado por dashboard_manager_3.0.py)
+# Renomeie para .htaccess na pasta publicada. Requer mod_rewrite e mod_headers.
+RewriteEngine On
+
+# Brotli, depois gzip, quando o navegador aceita e o irmão existe
+RewriteCond %{HTTP:Accept-Encoding} br
+RewriteCond %{REQUEST_FILENAME}.br -s
+RewriteRule ^(.+\.(html|js|json))$ $1.br [L]
+
+RewriteCond %{HTTP:Accept-Encoding} gzip
+RewriteCond %{REQUEST_FILENAME}.gz -s
+RewriteRule ^(.+\.(html|js|json))$ $1.gz [L]
+
+# Sem compressão dupla pelo mod_deflate
+RewriteRule \.(br|gz)$ - [E=no-gzip:1,E=no-brotli:1]
+
+<FilesMatch "\.html\.(br|gz)$">
+    ForceType "text/html; charset=utf-8"
+</FilesMatch>
+<FilesMatch "\.js\.(br|gz)$">
+    ForceType "text/javascript; charset=utf-8"
+</FilesMatch>
+<FilesMatch "\.json\.(br|gz)$">
+    ForceType "application/json; charset=utf-8"
+</FilesMatch>
+<FilesMatch "\.br$">
+    Header set Content-Encoding br
+</FilesMatch>
+<FilesMatch "\.gz$">
+    Header set Content-Encoding gzip
+</FilesMatch>
+
+<FilesMatch "\.(html|js|json)(\.br|\.gz)?$">
+    Header append Vary Accept-Encoding
+    Header set Cache-Control "no-cache"
+</FilesMatch>
+<FilesMatch "\.[0-9a-f]{12}\.js(\.br|\.gz)?$">
+    Header set Cache-Control "public, max-age=31536000, immutable"
+</FilesMatch>
+"""
+# Literais de dados das páginas geradas (uma linha cada), para extrair o módulo
+# de dados de análises antigas que não têm <análise>.data.js
+DATA_LITERALS = {
+    "vars_meta": "VARS_META",
+    "filters_meta": "FILTERS_META",
+    "records": "RECORDS",
+    "value_orders": "VARS_VALUE_ORDER",
+    "code_to_label": "CODE_TO_LABEL",
+}
 
 class DashboardManagerOverlay:
     def __init__(self, config_file="dashboard_overlay_config.json"):
@@ -33,6 +137,10 @@ class DashboardManagerOverlay:
             "architecture": "v2_overlay",
             "description": "Sistema onde header SPSS sobrepõe interface com navegação lateral otimizada",
             "client_logo": "",  # URL da logomarca do cliente
+            "iframe_pool_size": DEFAULT_IFRAME_POOL_SIZE,  # análises mantidas em cache
+            "prefetch_budget_kb": DEFAULT_PREFETCH_BUDGET_KB,  # 0 desativa o pré-carregamento
+            "master_mode": "iframe",  # ou "runtime" (ver MASTER_MODES)
+            "offline_cache": False,  # grava sw.js + asset-manifest.json junto do master
             "items": [
                 {
                     "id": "home",
@@ -165,6 +273,282 @@ class DashboardManagerOverlay:
         self.save_config()
         print(f"✅ Logomarca do cliente atualizada: {logo_url}")
     
+    def update_iframe_pool_size(self, size: int):
+        """Define quantas análises o Dashboard Master mantém carregadas"""
+        self.config["iframe_pool_size"] = max(1, int(size))
+        self.save_config()
+        print(f"✅ Cache de análises: {self.config['iframe_pool_size']} iframe(s)")
+    
+    def update_prefetch_budget(self, budget_kb: int):
+        """Define o orçamento (KB) do pré-carregamento de análises; 0 desativa"""
+        self.config["prefetch_budget_kb"] = max(0, int(budget_kb))
+        self.save_config()
+        print(f"✅ Pré-carregamento: até {self.config['prefetch_budget_kb']} KB")
+    
+    def update_master_mode(self, mode: str):
+        """Define como o master abre as análises: iframe por página ou runtime único"""
+        if mode not in MASTER_MODES:
+            print(f"❌ Modo inválido: {mode} (use {' ou '.join(MASTER_MODES)})")
+            return
+        self.config["master_mode"] = mode
+        self.save_config()
+        print(f"✅ Modo do master: {mode}")
+    
+    def update_offline_cache(self, enabled: bool):
+        """Liga/desliga o service worker (cache offline) do site publicado"""
+        self.config["offline_cache"] = bool(enabled)
+        self.save_config()
+        print(f"✅ Cache offline: {'ligado' if enabled else 'desligado'}")
+    
+    def analysis_labels(self) -> List[List[str]]:
+        """[arquivo, rótulo] de cada análise do menu, na ordem do menu (rótulo = grupo + item)"""
+        labels = []
+        for item in self.config["items"]:
+            if item.get("type") == "file" and item.get("file"):
+                labels.append([item["file"], item.get("title", item["file"])])
+            for child in item.get("children", []):
+                if child.get("file"):
+                    labels.append([child["file"], f"{item.get('title', '')} {child.get('title', '')}".strip()])
+        return labels
+    
+    def analysis_files(self) -> List[str]:
+        """Arquivos HTML das análises do menu, na ordem do menu"""
+        return [file for file, _ in self.analysis_labels()]
+    
+    def analysis_file_sizes(self, base_dir: str, data_modules: bool = False) -> Dict[str, int]:
+        """Tamanho em bytes de cada análise do menu encontrada em base_dir
+        (com data_modules=True, o do módulo de dados <análise>.data.js)"""
+        sizes = {}
+        for file in self.analysis_files():
+            path = os.path.join(base_dir, data_module_name(file) if data_modules else file)
+            if os.path.isfile(path):
+                sizes[file] = os.path.getsize(path)
+        return sizes
+    
+    def collect_analysis_summaries(self, base_dir: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Resumo de cada análise do menu para os cartões da tela inicial: o
+        <análise>.summary.json gravado pelo gerador (N, período, variáveis...) e o
+        tamanho do HTML. A página da análise em si não é aberta.
+        """
+        summaries = {}
+        for file in self.analysis_files():
+            html_path = os.path.join(base_dir, file)
+            if not os.path.isfile(html_path):
+                continue
+            summary = {}
+            summary_path = os.path.join(base_dir, analysis_id(file) + ".summary.json")
+            if os.path.isfile(summary_path):
+                try:
+                    with open(summary_path, 'r', encoding='utf-8') as f:
+                        summary = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️  Resumo de {file} ignorado ({e})")
+            summary["bytes"] = os.path.getsize(html_path)
+            summaries[file] = summary
+        return summaries
+    
+    def build_question_index(self, base_dir: str) -> Dict[str, Any]:
+        """
+        Junta os índices de busca das análises (<análise>.search.json, gravado pelo
+        gerador; nas páginas antigas, montado a partir do HTML) num índice único de
+        prefixos: palavras sem acento em ordem, cada uma com a lista das perguntas em
+        que ocorre, para que cada palavra digitada no master vire um intervalo por
+        busca binária.
+        """
+        files, docs, postings = [], [], {}
+        for file, label in self.analysis_labels():
+            try:
+                variables = load_search_entries(base_dir, file)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Busca: {file} ignorado ({e})")
+                continue
+            if variables is None:
+                continue
+            file_index = len(files)
+            files.append([file, label])
+            for entry in variables:
+                position = len(docs)
+                options = entry.get("options", [])
+                docs.append([file_index, entry["name"], entry["title"], options])
+                text = " ".join([entry["name"], entry["title"], *options])
+                for token in set(search_tokens(text) + [entry["name"].lower()]):
+                    postings.setdefault(token, []).append(position)
+        tokens = sorted(postings)
+        return {
+            "files": files,
+            "docs": docs,
+            "tokens": tokens,
+            "postings": [postings[token] for token in tokens],
+        }
+    
+    def prepare_runtime(self, base_dir: str) -> bool:
+        """
+        Confere o runtime único e os módulos de dados das análises do menu.
+        Análises sem <análise>.data.js (geradas antes do --data-module) têm os
+        dados extraídos do próprio HTML; o módulo também é reextraído quando o
+        HTML mudou depois dele (ver data_module_is_current). Retorna False se o
+        runtime não existir.
+        """
+        if not os.path.isfile(os.path.join(base_dir, RUNTIME_PAGE)):
+            print(f"⚠️  {RUNTIME_PAGE} não encontrado: gere com "
+                  f"'python gerador_spss_5_0.py --runtime {RUNTIME_PAGE}'. Usando o modo iframe.")
+            return False
+        for file in self.analysis_files():
+            html_path = os.path.join(base_dir, file)
+            module_path = os.path.join(base_dir, data_module_name(file))
+            if not os.path.isfile(html_path) or data_module_is_current(html_path, module_path):
+                continue
+            stale = os.path.isfile(module_path)
+            try:
+                extract_data_module(html_path, module_path)
+                print(f"📦 Módulo de dados {'atualizado' if stale else 'extraído'}: "
+                      f"{data_module_name(file)}")
+            except ValueError as e:
+                print(f"⚠️  {file}: {e}")
+        return True
+    
+    def site_files(self, base_dir: str, master_file: str, master_mode: str) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Arquivos do site publicado em base_dir: (master, runtime e dicionários de
+        rótulos; análises e módulos de dados; bibliotecas das CDNs usadas pelas páginas)
+        """
+        precache = [master_file]
+        analyses = []
+        pages = [master_file]
+        if master_mode == "runtime":
+            precache.append(RUNTIME_PAGE)
+            pages.append(RUNTIME_PAGE)
+        for file in self.analysis_files():
+            if not os.path.isfile(os.path.join(base_dir, file)):
+                continue
+            analyses.append(file)
+            pages.append(file)
+            if master_mode == "runtime" and os.path.isfile(os.path.join(base_dir, data_module_name(file))):
+                analyses.append(data_module_name(file))
+
+        libraries = set()
+        for page in pages:
+            with open(os.path.join(base_dir, page), 'r', encoding='utf-8') as f:
+                html = f.read()
+            for pattern in CDN_ASSET_PATTERNS:
+                libraries.update(pattern.findall(html))
+            for labels_file in SHARED_LABELS_PATTERN.findall(html):
+                if labels_file not in precache and os.path.isfile(os.path.join(base_dir, labels_file)):
+                    precache.append(labels_file)
+        return precache, analyses, sorted(libraries)
+    
+    def build_asset_manifest(self, base_dir: str, master_file: str, master_mode: str) -> Dict[str, Any]:
+        """
+        Manifesto do cache offline: hash de conteúdo de cada arquivo local (master,
+        runtime e dicionários de rótulos no pré-cache; análises e módulos de dados
+        sob demanda) e as bibliotecas das CDNs que as páginas usam. A versão é o
+        hash do manifesto inteiro e vai no sw.js.
+        """
+        precache, analyses, libraries = self.site_files(base_dir, master_file, master_mode)
+        manifest = {
+            "master": master_file,
+            "precache": [{"url": f, "hash": file_hash(os.path.join(base_dir, f))} for f in precache],
+            "analyses": [{"url": f, "hash": file_hash(os.path.join(base_dir, f))} for f in analyses],
+            "libraries": libraries,
+        }
+        manifest["version"] = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        return manifest
+    
+    def write_offline_cache(self, base_dir: str, master_file: str, master_mode: str) -> Dict[str, Any]:
+        """Grava asset-manifest.json e sw.js ao lado do master"""
+        manifest = self.build_asset_manifest(base_dir, master_file, master_mode)
+        with open(os.path.join(base_dir, ASSET_MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        hosts = sorted({re.match(r"https://([^/]+)", url).group(1) for url in manifest["libraries"]})
+        with open(os.path.join(base_dir, SERVICE_WORKER), 'w', encoding='utf-8') as f:
+            f.write(render_service_worker(manifest["version"], ASSET_MANIFEST, hosts))
+        return manifest
+    
+    def publish_site(self, master_file: str = "index.html") -> Dict[str, Any]:
+        """
+        Publicação para servidor estático: grava irmãos .gz (nível 9) e .br
+        (qualidade 11, se o módulo brotli estiver instalado) de cada arquivo do
+        site — o master, as análises do menu e o que o modo do master e o cache
+        offline usam —, o manifesto com tamanhos e hashes e exemplos de
+        configuração do nginx e do Apache. Um irmão só é reaproveitado quando o
+        manifesto anterior registra o mesmo hash do original e o mesmo tamanho do
+        irmão (a data do arquivo não basta: cp -p, rsync e git checkout a
+        preservam); irmão que não é regravado nem confirmado é apagado, para o
+        servidor nunca entregar conteúdo antigo.
+        """
+        base_dir = os.path.dirname(os.path.abspath(master_file))
+        master_file = os.path.basename(master_file)
+        if not os.path.isfile(os.path.join(base_dir, master_file)):
+            print(f"❌ {master_file} não encontrado: gere o Dashboard Master antes de publicar")
+            return {}
+        master_mode = self.config.get("master_mode", "iframe")
+        if master_mode != "runtime" or not os.path.isfile(os.path.join(base_dir, RUNTIME_PAGE)):
+            master_mode = "iframe"
+        precache, analyses, _ = self.site_files(base_dir, master_file, master_mode)
+        files = precache + analyses
+        if self.config.get("offline_cache", False):
+            files += [f for f in (SERVICE_WORKER, ASSET_MANIFEST) if os.path.isfile(os.path.join(base_dir, f))]
+        if brotli is None:
+            print("⚠️  Módulo brotli não instalado: só .gz (📦 pip install brotli)")
+
+        previous = {}
+        try:
+            with open(os.path.join(base_dir, PUBLISH_MANIFEST), 'r', encoding='utf-8') as f:
+                previous = {e["file"]: e for e in json.load(f).get("files", [])}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        compressors = [
+            ("gzip", ".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0)),
+            ("br", ".br", (lambda d: brotli.compress(d, mode=brotli.MODE_TEXT, quality=11)) if brotli else None),
+        ]
+        entries = []
+        for file in files:
+            path = os.path.join(base_dir, file)
+            with open(path, 'rb') as f:
+                data = f.read()
+            entry = {"file": file, "bytes": len(data), "hash": hashlib.sha256(data).hexdigest()[:12],
+                     "immutable": bool(HASHED_NAME_PATTERN.search(file))}
+            before = previous.get(file, {})
+            for name, suffix, compress in compressors:
+                sibling = path + suffix
+                key = f"{name}_bytes"
+                exists = os.path.isfile(sibling)
+                if exists and before.get("hash") == entry["hash"] and before.get(key) == os.path.getsize(sibling):
+                    entry[key] = before[key]  # mesmo conteúdo já comprimido
+                    continue
+                packed = compress(data) if compress else None
+                if packed is None or len(packed) >= len(data):
+                    if exists:
+                        os.remove(sibling)  # desatualizado e não regravado
+                    continue
+                with open(sibling, 'wb') as f:
+                    f.write(packed)
+                entry[key] = len(packed)
+            entries.append(entry)
+
+        total = sum(e["bytes"] for e in entries)
+        manifest = {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "files": entries,
+            "total_bytes": total,
+            "gzip_bytes": sum(e.get("gzip_bytes", e["bytes"]) for e in entries),
+            "br_bytes": sum(e.get("br_bytes", e.get("gzip_bytes", e["bytes"])) for e in entries) if brotli else None,
+        }
+        with open(os.path.join(base_dir, PUBLISH_MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(base_dir, NGINX_SAMPLE), 'w', encoding='utf-8') as f:
+            f.write(NGINX_SAMPLE_CONF)
+        with open(os.path.join(base_dir, APACHE_SAMPLE), 'w', encoding='utf-8') as f:
+            f.write(APACHE_SAMPLE_CONF)
+
+        print(f"✅ Publicação pré-comprimida: {len(entries)} arquivos em {base_dir}")
+        print(f"   • Original: {total / 1024:.0f} KB • gzip: {manifest['gzip_bytes'] / 1024:.0f} KB"
+              + (f" • brotli: {manifest['br_bytes'] / 1024:.0f} KB" if brotli else ""))
+        print(f"   • Manifesto: {PUBLISH_MANIFEST} • Exemplos: {NGINX_SAMPLE}, {APACHE_SAMPLE}")
+        return manifest
+    
     def show_emoji_options(self):
         """Exibe opções de emojis organizadas por categoria"""
         print("\n🎨 OPÇÕES DE EMOJIS POR CATEGORIA:")
@@ -683,6 +1067,69 @@ class DashboardManagerOverlay:
             transform: rotate(180deg);
         }}
 
+        .sidebar-search {{
+            position: relative;
+            padding: 10px 12px 4px;
+        }}
+
+        .sidebar-search input {{
+            width: 100%;
+            padding: 8px 10px;
+            border: 1px solid var(--border);
+            border-radius: 6px;
+            font-size: 13px;
+            color: var(--text);
+            background: var(--bg);
+        }}
+
+        .sidebar-search input:focus {{
+            outline: none;
+            border-color: var(--primary);
+            background: white;
+        }}
+
+        .sidebar.collapsed .sidebar-search {{
+            display: none;
+        }}
+
+        .search-results {{
+            max-height: 50vh;
+            overflow-y: auto;
+            margin-top: 6px;
+        }}
+
+        .search-result {{
+            padding: 7px 8px;
+            border-radius: 6px;
+            cursor: pointer;
+            font-size: 12px;
+            line-height: 1.35;
+        }}
+
+        .search-result:hover,
+        .search-result.selected {{
+            background: var(--hover);
+        }}
+
+        .search-result .search-analysis {{
+            display: block;
+            color: var(--secondary);
+            font-weight: 600;
+            font-size: 11px;
+        }}
+
+        .search-result .search-option,
+        .search-empty {{
+            display: block;
+            color: var(--text-light);
+            font-style: italic;
+        }}
+
+        .search-empty {{
+            padding: 6px 8px;
+            font-size: 12px;
+        }}
+
         .sidebar-menu {{
             flex: 1;
             overflow-y: auto;
@@ -862,13 +1309,56 @@ class DashboardManagerOverlay:
             display: flex;
             flex-direction: column;
             align-items: center;
-            justify-content: center;
+            justify-content: safe center;
             height: 100vh;
+            overflow-y: auto;
             text-align: center;
             padding: 40px;
             background: white;
         }}
 
+        .analysis-cards {{
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(220px, 1fr));
+            gap: 14px;
+            width: 100%;
+            max-width: 960px;
+            margin-bottom: 10px;
+            text-align: left;
+        }}
+
+        .analysis-card {{
+            border: 1px solid var(--border);
+            border-radius: 8px;
+            padding: 14px 16px;
+            cursor: pointer;
+            background: white;
+            transition: all 0.3s ease;
+        }}
+
+        .analysis-card:hover {{
+            border-color: var(--primary);
+            box-shadow: var(--shadow);
+        }}
+
+        .analysis-card h4 {{
+            color: var(--secondary);
+            font-size: 14px;
+            margin-bottom: 8px;
+        }}
+
+        .analysis-card .card-n {{
+            font-size: 22px;
+            font-weight: 700;
+            color: var(--text);
+        }}
+
+        .analysis-card .card-line {{
+            font-size: 12px;
+            color: var(--text-light);
+            line-height: 1.6;
+        }}
+
         .welcome-icon {{
             font-size: 64px;
             color: var(--primary);
@@ -948,6 +1438,11 @@ class DashboardManagerOverlay:
                 </div>
             </div>
 
+            <div class="sidebar-search">
+                <input type="search" id="questionSearch" placeholder="🔍 Buscar pergunta em todas as análises" autocomplete="off">
+                <div class="search-results" id="searchResults"></div>
+            </div>
+
             <nav class="sidebar-menu" id="sidebarMenu">
                 <!-- Menu será gerado dinamicamente -->
             </nav>
@@ -962,12 +1457,14 @@ class DashboardManagerOverlay:
         <div class="mobile-overlay" id="mobileOverlay" onclick="closeMobileSidebar()"></div>
 
         <div class="main-content">
-            <iframe class="content-frame" id="contentFrame" style="display: none;"></iframe>
+            <!-- iframes das análises: criados sob demanda e mantidos em cache (IFRAME_POOL_SIZE) -->
             
             <div class="welcome" id="welcomeState" style="display: none;">
                 <div class="welcome-icon">🎯</div>
                 <h2>{title}</h2>
                 <p>Sistema otimizado onde análises SPSS sobrepõem toda a interface com header próprio, mantendo apenas sidebar para navegação.</p>
+
+                <div class="analysis-cards" id="analysisCards"></div>
                 
                 <div class="feature-highlight">
                     <h3>🚀 Arquitetura v2.0</h3>
@@ -991,6 +1488,9 @@ class DashboardManagerOverlay:
                 </div>
             </div>
 
+            <!-- erro de arquivo ausente: elemento próprio, a tela inicial (e seus cards) fica intacta -->
+            <div class="welcome" id="missingFileState" style="display: none;"></div>
+
             <div class="loading" id="loadingState" style="display: none;">
                 <div class="loading-spinner"></div>
                 Carregando Dados...
@@ -1005,6 +1505,51 @@ class DashboardManagerOverlay:
         let currentAnalysisFrame = null;
         let isMobile = window.innerWidth <= 768;
 
+        // Cache LRU de iframes: análises visitadas recentemente continuam carregadas
+        // (ocultas) e reaparecem na hora; a menos usada é descartada quando o cache enche.
+        // A ordem do Map é a ordem de uso: o primeiro item é o menos recente.
+        const IFRAME_POOL_SIZE = Math.max(1, {iframe_pool_size});
+        const framePool = new Map();  // arquivo -> iframe
+        let activeFile = null;
+
+        // Pré-carregamento: ao passar o mouse/focar um item e, com o navegador ocioso,
+        // as outras análises do grupo aberto. Usa <link rel="prefetch"> (o iframe
+        // reaproveita o download) dentro de um orçamento de bytes; tamanhos medidos
+        // na geração do master. Desligado com "economia de dados" ou rede 2G.
+        const PREFETCH_BUDGET_BYTES = {prefetch_budget_bytes};
+        const PREFETCH_SIZES = {prefetch_sizes_json};
+        const prefetched = new Set();
+        let prefetchedBytes = 0;
+
+        // Modo runtime: um único iframe com o runtime do dashboard (bibliotecas e código
+        // carregados uma vez); cada análise é só um módulo de dados (<análise>.data.js)
+        // que o runtime aplica sem recarregar a página.
+        const MASTER_MODE = '{master_mode}';
+        const RUNTIME_PAGE = '{runtime_page}';
+        let runtimeFrame = null;
+        let runtimeReady = false;
+        let runtimeItem = null;
+        let pendingAnalysis = null;
+
+        function analysisId(file) {{
+            return file.replace(/\\.html?$/i, '');
+        }}
+
+        function dataModule(file) {{
+            return analysisId(file) + '.data.js';
+        }}
+
+        // Busca de perguntas em todas as análises, sem abrir nenhuma: índice montado na
+        // geração do master com as palavras sem acento em ordem (cada uma com as perguntas
+        // em que ocorre); cada palavra digitada vira um intervalo por busca binária (prefixo).
+        const SEARCH_INDEX = {search_index_json};
+        const SEARCH_MAX_RESULTS = 30;
+        let pendingJump = null;  // pergunta a mostrar quando a análise terminar de carregar
+
+        // Resumo de cada análise (gerado junto com a página, em <análise>.summary.json)
+        // para os cartões da tela inicial, sem abrir nenhuma análise
+        const ANALYSIS_SUMMARIES = {analysis_summaries_json};
+
         let analysisStats = {{
             loaded: 0,
             variables: 0,
@@ -1012,6 +1557,15 @@ class DashboardManagerOverlay:
             records: 0
         }};
 
+        // Telemetria enviada pelas análises: último resumo de cada página
+        // (dados embutidos, primeira pintura, latência dos filtros)
+        const analysisPerf = {{}};
+
+        function recordAnalysisPerf(timings) {{
+            if (!timings || !timings.page) return;
+            analysisPerf[timings.page] = Object.assign({{ updated_at: new Date().toISOString() }}, timings);
+        }}
+
         window.addEventListener('message', (event) => {{
             if (event.data && event.data.source === 'spss-analysis-overlay') {{
                 const {{ type, data }} = event.data;
@@ -1025,6 +1579,27 @@ class DashboardManagerOverlay:
                             records: data.records
                         }};
                         console.log(`📊 Análise carregada: ${{data.variables}} vars, ${{data.filters}} filtros, ${{data.records}} registros`);
+                        recordAnalysisPerf(data.timings);
+                        if (MASTER_MODE === 'runtime') showRuntimeAnalysis(data.page);
+                        if (data.timings) {{
+                            console.log(`⏱️ ${{data.page}}: primeira pintura ${{data.timings.first_paint_ms}} ms (render ${{data.timings.initial_render_ms}} ms)`);
+                        }}
+                        break;
+
+                    case 'performance':
+                        recordAnalysisPerf(data.timings);
+                        break;
+
+                    case 'runtime-ready':
+                        runtimeReady = true;
+                        if (pendingAnalysis) {{
+                            postToRuntime(pendingAnalysis);
+                            pendingAnalysis = null;
+                        }}
+                        break;
+
+                    case 'analysis-error':
+                        if (runtimeItem && data.page === analysisId(runtimeItem.file)) showMissingFile(runtimeItem.file);
                         break;
                         
                     case 'status-update':
@@ -1072,6 +1647,276 @@ class DashboardManagerOverlay:
             overlay.classList.remove('active');
         }}
 
+        function prefetchAllowed() {{
+            const connection = navigator.connection;
+            if (!connection) return true;
+            return !connection.saveData && !/(^|-)2g$/.test(connection.effectiveType || '');
+        }}
+
+        function prefetchAnalysis(file) {{
+            if (!file || !(file in PREFETCH_SIZES)) return;
+            if (prefetched.has(file) || framePool.has(file) || !prefetchAllowed()) return;
+            const size = PREFETCH_SIZES[file];
+            if (prefetchedBytes + size > PREFETCH_BUDGET_BYTES) return;
+            prefetched.add(file);
+            prefetchedBytes += size;
+            const link = document.createElement('link');
+            link.rel = 'prefetch';
+            link.as = MASTER_MODE === 'runtime' ? 'script' : 'document';
+            link.href = MASTER_MODE === 'runtime' ? dataModule(file) : file;
+            document.head.appendChild(link);
+        }}
+
+        function bindPrefetch(element, item) {{
+            const prefetch = () => prefetchAnalysis(item.file);
+            element.tabIndex = 0;
+            element.addEventListener('mouseenter', prefetch);
+            element.addEventListener('focus', prefetch);
+            element.addEventListener('touchstart', prefetch, {{ passive: true }});
+            element.addEventListener('keydown', (e) => {{
+                if (e.key === 'Enter' || e.key === ' ') {{
+                    e.preventDefault();
+                    element.click();
+                }}
+            }});
+        }}
+
+        // Com o navegador ocioso, uma de cada vez, a partir das vizinhas da análise aberta
+        function scheduleSiblingPrefetch(item) {{
+            const group = menuConfig.items.find(g => g.type === 'group' && (g.children || []).some(c => c.file === item.file));
+            if (!group) return;
+            const index = group.children.findIndex(c => c.file === item.file);
+            const queue = group.children
+                .map((child, i) => [child.file, Math.abs(i - index)])
+                .filter(([file]) => file && file !== item.file)
+                .sort((a, b) => a[1] - b[1])
+                .map(([file]) => file);
+            const idle = window.requestIdleCallback || ((cb) => setTimeout(cb, 1500));
+            const next = () => {{
+                if (!queue.length || activeFile !== item.file) return;
+                idle(() => {{
+                    prefetchAnalysis(queue.shift());
+                    next();
+                }}, {{ timeout: 5000 }});
+            }};
+            next();
+        }}
+
+        function searchTokens(text) {{
+            const folded = String(text || '').toLowerCase().normalize('NFKD').replace(/[\\u0300-\\u036f]/g, '');
+            return folded.match(/[a-z0-9]+/g) || [];
+        }}
+
+        function lowerBound(sorted, value) {{
+            let lo = 0, hi = sorted.length;
+            while (lo < hi) {{
+                const mid = (lo + hi) >> 1;
+                if (sorted[mid] < value) lo = mid + 1;
+                else hi = mid;
+            }}
+            return lo;
+        }}
+
+        // Perguntas cujas palavras (nome, título, opções) começam com TODAS as palavras da consulta
+        function searchQuestions(query) {{
+            const tokens = searchTokens(query);
+            if (!tokens.length) return [];
+            let result = null;
+            for (const token of tokens) {{
+                const lo = lowerBound(SEARCH_INDEX.tokens, token);
+                const hi = lowerBound(SEARCH_INDEX.tokens, token + '\\uffff');
+                const hits = new Set(SEARCH_INDEX.postings.slice(lo, hi).flat());
+                result = result === null ? hits : new Set([...result].filter(p => hits.has(p)));
+                if (!result.size) return [];
+            }}
+            return [...result].sort((a, b) => a - b).map(position => {{
+                const [fileIndex, name, title, options] = SEARCH_INDEX.docs[position];
+                const [file, label] = SEARCH_INDEX.files[fileIndex];
+                // Opção que explica o acerto quando o título não contém a consulta
+                const titleTokens = searchTokens(name + ' ' + title);
+                const inTitle = tokens.every(t => titleTokens.some(w => w.startsWith(t)));
+                const option = inTitle ? null : (options || []).find(o => {{
+                    const words = searchTokens(o);
+                    return tokens.some(t => words.some(w => w.startsWith(t)));
+                }});
+                return {{ file, label, name, title, option }};
+            }});
+        }}
+
+        function renderSearchResults(query) {{
+            const container = document.getElementById('searchResults');
+            container.innerHTML = '';
+            if (!searchTokens(query).length) return;
+            const results = searchQuestions(query);
+            if (!results.length) {{
+                const empty = document.createElement('div');
+                empty.className = 'search-empty';
+                empty.textContent = 'Nenhuma pergunta encontrada';
+                container.appendChild(empty);
+                return;
+            }}
+            results.slice(0, SEARCH_MAX_RESULTS).forEach((result, i) => {{
+                const row = document.createElement('div');
+                row.className = 'search-result' + (i === 0 ? ' selected' : '');
+                const analysis = document.createElement('span');
+                analysis.className = 'search-analysis';
+                analysis.textContent = result.label;
+                const title = document.createElement('span');
+                title.textContent = result.title;
+                row.appendChild(analysis);
+                row.appendChild(title);
+                if (result.option) {{
+                    const option = document.createElement('span');
+                    option.className = 'search-option';
+                    option.textContent = 'opção: ' + result.option;
+                    row.appendChild(option);
+                }}
+                row.addEventListener('click', () => openSearchResult(result));
+                row.addEventListener('mouseenter', () => prefetchAnalysis(result.file));
+                container.appendChild(row);
+            }});
+            if (results.length > SEARCH_MAX_RESULTS) {{
+                const more = document.createElement('div');
+                more.className = 'search-empty';
+                more.textContent = `+${{results.length - SEARCH_MAX_RESULTS}} perguntas: refine a busca`;
+                container.appendChild(more);
+            }}
+            container.firstChild.__result = results[0];
+        }}
+
+        function findMenuItem(file) {{
+            for (const item of menuConfig.items) {{
+                if (item.type === 'file' && item.file === file) return item;
+                const child = (item.children || []).find(c => c.file === file);
+                if (child) return child;
+            }}
+            return null;
+        }}
+
+        function analysisShown(file) {{
+            if (activeFile !== file) return false;
+            const frame = MASTER_MODE === 'runtime' ? runtimeFrame : framePool.get(file);
+            return !!frame && frame.style.display === 'block';
+        }}
+
+        function openSearchResult(result) {{
+            const item = findMenuItem(result.file);
+            if (!item) return;
+            pendingJump = {{ file: result.file, name: result.name, title: result.title }};
+            const element = Array.from(document.querySelectorAll('.menu-item, .submenu-item'))
+                .find(el => el.dataset.file === result.file);
+            if (element) updateActiveState(element);
+            if (isMobile) closeMobileSidebar();
+            if (analysisShown(result.file)) flushPendingJump(result.file);
+            else loadContent(item);
+        }}
+
+        // Chamado quando a análise fica visível (iframe carregado/em cache ou runtime pronto)
+        function flushPendingJump(file) {{
+            if (!pendingJump || pendingJump.file !== file) return;
+            const {{name, title}} = pendingJump;
+            pendingJump = null;
+            const frame = MASTER_MODE === 'runtime' ? runtimeFrame : framePool.get(file);
+            if (!frame) return;
+            frame.contentWindow.postMessage({{ source: 'dashboard-master', type: 'show-variable', data: {{ name }} }}, '*');
+            // Páginas antigas não tratam a mensagem: procura o título no documento (mesma origem)
+            try {{
+                const doc = frame.contentDocument;
+                if (!doc || doc.querySelector('[data-var]')) return;
+                const section = Array.from(doc.querySelectorAll('.section')).find(s => {{
+                    const heading = s.querySelector('.section-title');
+                    return heading && heading.textContent.includes(title);
+                }});
+                if (section) section.scrollIntoView({{ behavior: 'smooth', block: 'start' }});
+            }} catch (e) {{}}
+        }}
+
+        function bindQuestionSearch() {{
+            const input = document.getElementById('questionSearch');
+            const container = document.getElementById('searchResults');
+            if (!SEARCH_INDEX.docs.length) {{
+                input.parentNode.style.display = 'none';
+                return;
+            }}
+            input.addEventListener('input', () => renderSearchResults(input.value));
+            input.addEventListener('keydown', (e) => {{
+                if (e.key === 'Enter' && container.firstChild && container.firstChild.__result) {{
+                    openSearchResult(container.firstChild.__result);
+                }}
+                if (e.key === 'Escape') {{
+                    input.value = '';
+                    renderSearchResults('');
+                }}
+            }});
+        }}
+
+        function formatBytes(bytes) {{
+            if (bytes >= 1024 * 1024) return (bytes / 1024 / 1024).toLocaleString('pt-BR', {{ maximumFractionDigits: 1 }}) + ' MB';
+            return Math.round(bytes / 1024).toLocaleString('pt-BR') + ' KB';
+        }}
+
+        function formatDate(iso) {{
+            const [year, month, day] = iso.split('-');
+            return `${{day}}/${{month}}/${{year}}`;
+        }}
+
+        function renderSummaryCards() {{
+            const container = document.getElementById('analysisCards');
+            if (!container) return;
+            container.innerHTML = '';
+            const labels = [];
+            menuConfig.items.forEach(item => {{
+                if (item.type === 'file' && item.file) labels.push([item, item.title]);
+                (item.children || []).forEach(child => {{
+                    if (child.file) labels.push([child, `${{item.title}} ${{child.title}}`]);
+                }});
+            }});
+            labels.forEach(([item, label]) => {{
+                const summary = ANALYSIS_SUMMARIES[item.file];
+                if (!summary) return;
+                const card = document.createElement('div');
+                card.className = 'analysis-card';
+                const lines = [];
+                if (summary.respondents !== undefined) {{
+                    if (summary.weighted) lines.push(`N ponderado: ${{summary.weighted_respondents.toLocaleString('pt-BR')}}`);
+                    if (summary.period) {{
+                        lines.push(summary.period.start === summary.period.end
+                            ? `Coleta: ${{formatDate(summary.period.start)}}`
+                            : `Coleta: ${{formatDate(summary.period.start)}} a ${{formatDate(summary.period.end)}}`);
+                    }}
+                    lines.push(`${{summary.variables}} perguntas • ${{summary.filters}} filtros`);
+                    lines.push(`${{formatBytes(summary.bytes)}} • gerado em ${{summary.build_seconds.toLocaleString('pt-BR')}} s`);
+                    if (summary.created_at) lines.push(`Atualizado em ${{summary.created_at}}`);
+                }} else {{
+                    lines.push(formatBytes(summary.bytes));
+                    lines.push('Sem resumo: gere a análise novamente para ver N e período');
+                }}
+                const title = document.createElement('h4');
+                title.textContent = label;
+                card.appendChild(title);
+                if (summary.respondents !== undefined) {{
+                    const n = document.createElement('div');
+                    n.className = 'card-n';
+                    n.textContent = `${{summary.respondents.toLocaleString('pt-BR')}} respondentes`;
+                    card.appendChild(n);
+                }}
+                lines.forEach(text => {{
+                    const line = document.createElement('div');
+                    line.className = 'card-line';
+                    line.textContent = text;
+                    card.appendChild(line);
+                }});
+                card.addEventListener('click', () => {{
+                    const element = Array.from(document.querySelectorAll('.menu-item, .submenu-item'))
+                        .find(el => el.dataset.file === item.file);
+                    if (element) updateActiveState(element);
+                    loadContent(item);
+                }});
+                card.addEventListener('mouseenter', () => prefetchAnalysis(item.file));
+                container.appendChild(card);
+            }});
+        }}
+
         function renderMenu() {{
             const menuContainer = document.getElementById('sidebarMenu');
             menuContainer.innerHTML = '';
@@ -1110,6 +1955,7 @@ class DashboardManagerOverlay:
                 const submenuItem = document.createElement('div');
                 submenuItem.className = `submenu-item ${{child.overlay ? 'overlay-enabled' : ''}}`;
                 submenuItem.innerHTML = `<span class="text">${{child.title}}</span>`;
+                if (child.file) submenuItem.dataset.file = child.file;
 
                 submenuItem.addEventListener('click', (e) => {{
                     e.stopPropagation();
@@ -1120,6 +1966,7 @@ class DashboardManagerOverlay:
                         closeMobileSidebar();
                     }}
                 }});
+                if (child.file) bindPrefetch(submenuItem, child);
 
                 submenu.appendChild(submenuItem);
             }});
@@ -1130,6 +1977,8 @@ class DashboardManagerOverlay:
         function renderMenuItem(container, item) {{
             const menuItem = document.createElement('div');
             menuItem.className = 'menu-item';
+            menuItem.dataset.id = item.id;
+            if (item.file) menuItem.dataset.file = item.file;
             menuItem.innerHTML = `
                 <span class="icon">${{item.icon}}</span>
                 <span class="text">${{item.title}}</span>
@@ -1150,52 +1999,148 @@ class DashboardManagerOverlay:
                     closeMobileSidebar();
                 }}
             }});
+            if (item.type === 'file') bindPrefetch(menuItem, item);
 
             container.appendChild(menuItem);
         }}
 
+        function hideFrames() {{
+            framePool.forEach(frame => {{ frame.style.display = 'none'; }});
+            if (runtimeFrame) runtimeFrame.style.display = 'none';
+        }}
+
+        function showFrame(file) {{
+            const frame = framePool.get(file);
+            framePool.delete(file);
+            framePool.set(file, frame);  // reinsere no fim = mais recente
+            hideFrames();
+            frame.style.display = 'block';
+            currentAnalysisFrame = frame.contentWindow;
+        }}
+
+        function evictFrames() {{
+            while (framePool.size > IFRAME_POOL_SIZE) {{
+                const [file, frame] = framePool.entries().next().value;
+                framePool.delete(file);
+                frame.src = 'about:blank';  // libera o documento antes de remover
+                frame.remove();
+                console.log(`♻️ ${{file}} descartado do cache de análises`);
+            }}
+        }}
+
+        function postToRuntime(request) {{
+            runtimeFrame.contentWindow.postMessage({{ source: 'dashboard-master', type: 'load-analysis', data: request }}, '*');
+        }}
+
+        // Modo runtime: o iframe do runtime é criado uma vez; trocar de análise é
+        // pedir o módulo de dados (fica na fila até o runtime avisar que está pronto)
+        function loadInRuntime(item) {{
+            const loading = document.getElementById('loadingState');
+            if (!runtimeFrame) {{
+                runtimeFrame = document.createElement('iframe');
+                runtimeFrame.className = 'content-frame';
+                runtimeFrame.id = 'runtimeFrame';
+                runtimeFrame.src = RUNTIME_PAGE;
+                document.querySelector('.main-content').insertBefore(runtimeFrame, document.getElementById('welcomeState'));
+            }}
+            currentAnalysisFrame = runtimeFrame.contentWindow;
+            runtimeItem = item;
+            hideFrames();
+            loading.style.display = 'flex';
+            const request = {{ id: analysisId(item.file), module: dataModule(item.file) }};
+            if (runtimeReady) postToRuntime(request);
+            else pendingAnalysis = request;
+        }}
+
+        function showRuntimeAnalysis(page) {{
+            if (!runtimeItem || activeFile !== runtimeItem.file || page !== analysisId(runtimeItem.file)) return;
+            document.getElementById('loadingState').style.display = 'none';
+            runtimeFrame.style.display = 'block';
+            console.log(`✅ ${{runtimeItem.title}} carregado (runtime)`);
+            flushPendingJump(runtimeItem.file);
+            scheduleSiblingPrefetch(runtimeItem);
+        }}
+
+        function showMissingFile(file) {{
+            const missing = document.getElementById('missingFileState');
+            hideFrames();
+            document.getElementById('loadingState').style.display = 'none';
+            document.getElementById('welcomeState').style.display = 'none';
+            missing.style.display = 'flex';
+            missing.innerHTML = `
+                <div class="welcome-icon" style="color: #ef4444;">❌</div>
+                <h2 style="color: #ef4444;">Arquivo não encontrado</h2>
+                <p>O arquivo "${{file}}" não foi encontrado.</p>
+                <div style="background: #fef3c7; border: 1px solid #f59e0b; padding: 15px; border-radius: 8px; margin: 20px 0; color: #92400e;">
+                    <strong>💡 Dica:</strong> Use o <code>criar_dashboard_v2.py</code> 
+                    para gerar análises compatíveis.
+                </div>
+            `;
+        }}
+
         function loadContent(item) {{
-            const frame = document.getElementById('contentFrame');
             const welcome = document.getElementById('welcomeState');
             const loading = document.getElementById('loadingState');
 
             welcome.style.display = 'none';
-            frame.style.display = 'none';
+            document.getElementById('missingFileState').style.display = 'none';
+            activeFile = item.file;
+
+            if (MASTER_MODE === 'runtime') {{
+                loadInRuntime(item);
+                return;
+            }}
+
+            if (framePool.has(item.file)) {{
+                loading.style.display = 'none';
+                showFrame(item.file);
+                console.log(`⚡ ${{item.title}} (em cache)`);
+                flushPendingJump(item.file);
+                scheduleSiblingPrefetch(item);
+                return;
+            }}
+
+            hideFrames();
             loading.style.display = 'flex';
 
             setTimeout(() => {{
+                if (framePool.has(item.file)) return;
+                const frame = document.createElement('iframe');
+                frame.className = 'content-frame';
+                frame.style.display = 'none';
+                frame.dataset.file = item.file;
                 frame.src = item.file;
-                currentAnalysisFrame = frame.contentWindow;
+                document.querySelector('.main-content').insertBefore(frame, welcome);
+                framePool.set(item.file, frame);
+                evictFrames();
+                if (activeFile === item.file) currentAnalysisFrame = frame.contentWindow;
                 
                 frame.onload = () => {{
+                    if (activeFile !== item.file) return;  // outra análise foi escolhida enquanto carregava
                     loading.style.display = 'none';
-                    frame.style.display = 'block';
+                    showFrame(item.file);
                     console.log(`✅ ${{item.title}} carregado v2.0`);
+                    flushPendingJump(item.file);
+                    scheduleSiblingPrefetch(item);
                 }};
 
                 frame.onerror = () => {{
-                    loading.style.display = 'none';
-                    welcome.style.display = 'flex';
-                    welcome.innerHTML = `
-                        <div class="welcome-icon" style="color: #ef4444;">❌</div>
-                        <h2 style="color: #ef4444;">Arquivo não encontrado</h2>
-                        <p>O arquivo "${{item.file}}" não foi encontrado.</p>
-                        <div style="background: #fef3c7; border: 1px solid #f59e0b; padding: 15px; border-radius: 8px; margin: 20px 0; color: #92400e;">
-                            <strong>💡 Dica:</strong> Use o <code>criar_dashboard_v2.py</code> 
-                            para gerar análises compatíveis.
-                        </div>
-                    `;
+                    framePool.delete(item.file);
+                    frame.remove();
+                    if (activeFile === item.file) showMissingFile(item.file);
                 }};
             }}, 300);
         }}
 
         function showWelcome() {{
-            const frame = document.getElementById('contentFrame');
             const welcome = document.getElementById('welcomeState');
             const loading = document.getElementById('loadingState');
 
-            frame.style.display = 'none';
+            hideFrames();
+            activeFile = null;
             loading.style.display = 'none';
+            document.getElementById('missingFileState').style.display = 'none';
+            renderSummaryCards();
             welcome.style.display = 'flex';
             currentAnalysisFrame = null;
         }}
@@ -1233,14 +2178,45 @@ class DashboardManagerOverlay:
 
         window.addEventListener('resize', handleResize);
 
+        // Cache offline (service worker + asset-manifest.json), ligado no gerenciador.
+        // Desligado, remove o worker de uma publicação anterior.
+        const OFFLINE_CACHE = {offline_cache_js};
+        const SERVICE_WORKER = '{service_worker}';
+
+        function setupOfflineCache() {{
+            if (!('serviceWorker' in navigator) || !location.protocol.startsWith('http')) return;
+            if (OFFLINE_CACHE) {{
+                navigator.serviceWorker.register(SERVICE_WORKER)
+                    .catch(e => console.warn('⚠️ Service worker não registrado:', e));
+                return;
+            }}
+            navigator.serviceWorker.getRegistration().then(registration => {{
+                const worker = registration && (registration.active || registration.waiting || registration.installing);
+                if (worker && worker.scriptURL.endsWith('/' + SERVICE_WORKER)) registration.unregister();
+            }});
+        }}
+
         document.addEventListener('DOMContentLoaded', () => {{
+            setupOfflineCache();
             renderMenu();
+            renderSummaryCards();
+            bindQuestionSearch();
             loadFirstMenuItem();
             
             console.log('🎯 Dashboard Master v2.0 carregado!');
         }});
 
         function loadFirstMenuItem() {{
+            // Com cards de resumo, a tela inicial é o ponto de partida: abrir uma análise
+            // logo de cara esconderia os cards
+            if (document.getElementById('analysisCards').children.length) {{
+                showWelcome();
+                const home = menuConfig.items.find(item => item.type === 'action' && item.action === 'showWelcome');
+                const homeElement = home && document.querySelector(`[data-id="${{home.id}}"]`);
+                if (homeElement) updateActiveState(homeElement);
+                return;
+            }}
+
             // Procura o primeiro item que não é "home" (início)
             for (let item of menuConfig.items) {{
                 if (item.type === 'file' && item.file) {{
@@ -1269,12 +2245,12 @@ class DashboardManagerOverlay:
             }}
             
             // Fallback: se não encontrar nenhum item, esconde welcome e mostra tela vazia
-            const frame = document.getElementById('contentFrame');
             const welcome = document.getElementById('welcomeState');
             const loading = document.getElementById('loadingState');
             
             welcome.style.display = 'none';
-            frame.style.display = 'none';
+            document.getElementById('missingFileState').style.display = 'none';
+            hideFrames();
             loading.style.display = 'none';
         }}
 
@@ -1289,7 +2265,24 @@ class DashboardManagerOverlay:
         }}
 
         window.dashboardDebug = {{
-            stats: () => analysisStats,
+            stats: () => Object.assign({{}}, analysisStats, {{ perf: analysisPerf }}),
+            pool: () => MASTER_MODE === 'runtime' ? [RUNTIME_PAGE] : Array.from(framePool.keys()),
+            search: (query) => searchQuestions(query),
+            prefetch: () => ({{ files: Array.from(prefetched), bytes: prefetchedBytes, budget: PREFETCH_BUDGET_BYTES }}),
+            perf: () => {{
+                const rows = Object.values(analysisPerf).map(p => ({{
+                    página: p.page,
+                    registros: p.records,
+                    'dados (ms)': p.payload_ms,
+                    '1ª pintura (ms)': p.first_paint_ms,
+                    'render inicial (ms)': p.initial_render_ms,
+                    'filtro mediana (ms)': p.filter_median_ms,
+                    'filtro p95 (ms)': p.filter_p95_ms,
+                    renders: p.renders
+                }}));
+                console.table(rows);
+                return analysisPerf;
+            }},
             sendCommand: sendCommandToAnalysis,
             toggleSidebar: toggleSidebar,
             showWelcome: showWelcome
@@ -1322,11 +2315,31 @@ class DashboardManagerOverlay:
         else:
             logo_html = '<div class="logo-placeholder">🏢</div>'
         
+        base_dir = os.path.dirname(os.path.abspath(output_file))
+        master_mode = self.config.get("master_mode", "iframe")
+        if master_mode not in MASTER_MODES or (master_mode == "runtime" and not self.prepare_runtime(base_dir)):
+            master_mode = "iframe"
+        
+        question_index = self.build_question_index(base_dir)
+        summaries = self.collect_analysis_summaries(base_dir)
+        offline_cache = bool(self.config.get("offline_cache", False))
+        
         # Gera HTML
         html_content = html_template.format(
             title=self.config["title"],
             logo_html=logo_html,
-            menu_config_json=json.dumps(self.config, ensure_ascii=False)
+            menu_config_json=json.dumps(self.config, ensure_ascii=False),
+            iframe_pool_size=max(1, int(self.config.get("iframe_pool_size", DEFAULT_IFRAME_POOL_SIZE))),
+            prefetch_budget_bytes=max(0, int(self.config.get("prefetch_budget_kb", DEFAULT_PREFETCH_BUDGET_KB))) * 1024,
+            prefetch_sizes_json=json.dumps(
+                self.analysis_file_sizes(base_dir, data_modules=master_mode == "runtime"), ensure_ascii=False
+            ),
+            master_mode=master_mode,
+            runtime_page=RUNTIME_PAGE,
+            search_index_json=json.dumps(question_index, ensure_ascii=False).replace("</", "<\\/"),
+            analysis_summaries_json=json.dumps(summaries, ensure_ascii=False).replace("</", "<\\/"),
+            offline_cache_js="true" if offline_cache else "false",
+            service_worker=SERVICE_WORKER
         )
         
         try:
@@ -1338,9 +2351,322 @@ class DashboardManagerOverlay:
             print(f"   • Sidebar mínima para navegação")
             print(f"   • Máximo aproveitamento de espaço")
             print(f"   • {total_overlay} análises com overlay configuradas")
+            with_summary = sum(1 for summary in summaries.values() if "respondents" in summary)
+            print(f"   • Cartões de resumo: {with_summary}/{len(summaries)} análises com .summary.json")
+            print(f"   • Busca de perguntas: {len(question_index['docs'])} perguntas em {len(question_index['files'])} análises")
+            if master_mode == "runtime":
+                print(f"   • Runtime único ({RUNTIME_PAGE}): análises trocadas como módulos de dados")
+            if offline_cache:
+                manifest = self.write_offline_cache(base_dir, os.path.basename(output_file), master_mode)
+                print(f"   • Cache offline ({SERVICE_WORKER}, versão {manifest['version']}): "
+                      f"{len(manifest['precache'])} arquivos pré-carregados, {len(manifest['analyses'])} análises, "
+                      f"{len(manifest['libraries'])} bibliotecas")
         except Exception as e:
             print(f"❌ Erro ao gerar HTML: {e}")
 
+def analysis_id(file: str) -> str:
+    """2025_comunicacao.html -> 2025_comunicacao (mesma regra do JavaScript do master)"""
+    return re.sub(r"\.html?$", "", file, flags=re.IGNORECASE)
+
+def data_module_name(file: str) -> str:
+    """2025_comunicacao.html -> 2025_comunicacao.data.js"""
+    return analysis_id(file) + ".data.js"
+
+def read_data_literals(html: str, keys, base_dir: str = None) -> Dict[str, Any]:
+    """
+    Literais JSON (ver DATA_LITERALS) de uma página gerada, pela chave. Com base_dir,
+    páginas que usam o dicionário de rótulos do projeto saem completas, como no navegador.
+    """
+    payload = {}
+    for key in keys:
+        name = DATA_LITERALS[key]
+        match = re.search(rf"^\s*(?:const|let) {name} = (.*);\s*$", html, re.MULTILINE)
+        if not match:
+            raise ValueError(f"{name} não encontrado (página não gerada pelo gerador SPSS?)")
+        literal = match.group(1)
+        # Dashboards multi‑ondas embutem RECORDS como segmentos colunares
+        segments = re.fullmatch(r"expandWaveSegments\((.*)\)", literal)
+        payload[key] = expand_wave_segments(json.loads(segments.group(1))) if segments else json.loads(literal)
+    shared = re.search(r"^\s*applySharedLabels\((.*)\);\s*$", html, re.MULTILINE)
+    if base_dir and shared:
+        labels_file, *stripped = json.loads(f"[{shared.group(1)}]")
+        apply_shared_labels(payload, read_shared_labels(os.path.join(base_dir, labels_file)),
+                            stripped[0] if stripped else None)
+    return payload
+
+def read_shared_labels(path: str) -> Dict[str, Any]:
+    """Dicionário de rótulos do projeto (<projeto>.labels.<hash>.js)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        match = re.search(r"\] = (\{.*\});\s*$", f.read(), re.DOTALL)
+    if not match:
+        raise ValueError(f"{path}: dicionário de rótulos inválido")
+    return json.loads(match.group(1))
+
+def apply_shared_labels(payload: Dict[str, Any], shared: Dict[str, Any],
+                        stripped: Optional[Dict[str, List[str]]] = None):
+    """
+    Completa os literais com o dicionário, como applySharedLabels no JavaScript da
+    página: ordem e rótulos só nas chaves tiradas da página (stripped; sem a lista,
+    páginas antigas, o dicionário inteiro)
+    """
+    def pick(source: Dict[str, Any], key: str) -> Dict[str, Any]:
+        if stripped is None:
+            return source
+        return {k: source[k] for k in stripped.get(key, []) if k in source}
+
+    if "value_orders" in payload:
+        payload["value_orders"] = {**pick(shared["value_orders"], "value_orders"), **payload["value_orders"]}
+    if "code_to_label" in payload:
+        payload["code_to_label"] = {**pick(shared["code_to_label"], "code_to_label"), **payload["code_to_label"]}
+    for v in payload.get("vars_meta", []):
+        v.setdefault("title", shared["titles"].get(v["name"], v["name"]))
+    for f in payload.get("filters_meta", []):
+        f.setdefault("title", shared["titles"].get(f["name"], f["name"]))
+        if f.get("kind") != "range":
+            f.setdefault("values", shared["filter_values"].get(f["name"], []))
+
+def expand_wave_segments(segments) -> List[dict]:
+    """Registros por linha a partir dos segmentos das ondas (como expandWaveSegments no JavaScript)"""
+    records = []
+    for segment in segments:
+        columns = segment["columns"]
+        for i in range(segment["n"]):
+            record = {"__wave__": segment["label"]}
+            record.update((name, values[i]) for name, values in columns.items())
+            records.append(record)
+    return records
+
+def file_hash(path: str) -> str:
+    """Hash de conteúdo (12 primeiros hexadecimais do SHA-256) de um arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def render_service_worker(version: str, manifest_file: str, library_hosts: List[str]) -> str:
+    """sw.js do cache offline (ver DashboardManagerOverlay.build_asset_manifest)"""
+    template = """// Service worker do Dashboard Master (gerado por dashboard_manager_3.0.py)
+// - pré-cache: master, runtime e dicionários de rótulos;
+// - bibliotecas das CDNs: cache primeiro só com versão fixa na URL (xlsx@0.18.5,
+//   .../1.4.1/...); sem versão (npm/chart.js = a mais recente) ou com versão
+//   parcial, stale-while-revalidate;
+// - análises: stale-while-revalidate (responde do cache e atualiza em segundo plano).
+// Cada arquivo local é guardado com o hash de conteúdo do manifesto. Regenerar o
+// master muda MANIFEST_VERSION, o navegador instala este worker de novo e, na
+// ativação, saem do cache as entradas cujo hash mudou e as bibliotecas que não
+// estão mais em manifest.libraries.
+const MANIFEST_VERSION = '{version}';
+const MANIFEST_URL = '{manifest}';
+const LIBRARY_HOSTS = {hosts_json};
+const ASSET_CACHE = 'spss-assets';
+const LIB_CACHE = 'spss-libs';
+const HASH_HEADER = 'X-Asset-Hash';
+// Versão completa (x.y.z) no caminho: o conteúdo da URL não muda
+const PINNED_VERSION = /[@\\/]v?\\d+\\.\\d+\\.\\d+[\\w.-]*(\\/|$)/;
+
+let manifestPromise = null;
+
+function assetUrl(url) {{
+    return new URL(url, self.registration.scope).href;
+}}
+
+function indexManifest(manifest) {{
+    const assets = new Map();
+    manifest.precache.concat(manifest.analyses).forEach(entry => assets.set(assetUrl(entry.url), entry.hash));
+    // A raiz do site abre o master
+    if (assets.has(assetUrl(manifest.master))) assets.set(self.registration.scope, assets.get(assetUrl(manifest.master)));
+    return {{ manifest, assets }};
+}}
+
+// Manifesto desta versão: guardado no cache na instalação
+function loadManifest() {{
+    if (!manifestPromise) {{
+        manifestPromise = caches.open(ASSET_CACHE)
+            .then(cache => cache.match(assetUrl(MANIFEST_URL)))
+            .then(response => response || fetch(`${{MANIFEST_URL}}?v=${{MANIFEST_VERSION}}`, {{ cache: 'no-store' }}))
+            .then(response => response.json())
+            .then(indexManifest);
+        manifestPromise.catch(() => {{ manifestPromise = null; }});
+    }}
+    return manifestPromise;
+}}
+
+// Baixa um arquivo local e o guarda com o hash do manifesto
+async function store(cache, url, hash) {{
+    const response = await fetch(url, {{ cache: 'no-cache' }});
+    if (!response.ok) return response;
+    const headers = new Headers(response.headers);
+    headers.set(HASH_HEADER, hash);
+    const body = await response.clone().blob();
+    await cache.put(url, new Response(body, {{ status: response.status, statusText: response.statusText, headers }}));
+    return response;
+}}
+
+self.addEventListener('install', event => {{
+    event.waitUntil((async () => {{
+        const response = await fetch(`${{MANIFEST_URL}}?v=${{MANIFEST_VERSION}}`, {{ cache: 'no-store' }});
+        const manifest = await response.clone().json();
+        if (manifest.version !== MANIFEST_VERSION) throw new Error(`${{MANIFEST_URL}} de outra versão`);
+        const cache = await caches.open(ASSET_CACHE);
+        await cache.put(assetUrl(MANIFEST_URL), response);
+        manifestPromise = Promise.resolve(indexManifest(manifest));
+
+        // O que não mudou desde a versão anterior não é baixado de novo
+        await Promise.all(manifest.precache.map(async entry => {{
+            const url = assetUrl(entry.url);
+            const hit = await cache.match(url);
+            if (!hit || hit.headers.get(HASH_HEADER) !== entry.hash) await store(cache, url, entry.hash);
+        }}));
+        const libs = await caches.open(LIB_CACHE);
+        await Promise.allSettled(manifest.libraries.map(async url => {{
+            if (!(await libs.match(url))) await libs.put(url, await fetch(url, {{ mode: 'no-cors' }}));
+        }}));
+        await self.skipWaiting();
+    }})());
+}});
+
+self.addEventListener('activate', event => {{
+    event.waitUntil((async () => {{
+        const {{ manifest, assets }} = await loadManifest();
+        const cache = await caches.open(ASSET_CACHE);
+        const manifestUrl = assetUrl(MANIFEST_URL);
+        for (const request of await cache.keys()) {{
+            if (request.url === manifestUrl) continue;
+            const hit = await cache.match(request);
+            if (!hit || hit.headers.get(HASH_HEADER) !== assets.get(request.url)) await cache.delete(request);
+        }}
+        const libraries = new Set(manifest.libraries.map(url => new URL(url).href));
+        const libs = await caches.open(LIB_CACHE);
+        for (const request of await libs.keys()) {{
+            if (!libraries.has(request.url)) await libs.delete(request);
+        }}
+        await self.clients.claim();
+    }})());
+}});
+
+async function staleWhileRevalidate(event, url, hash) {{
+    const cache = await caches.open(ASSET_CACHE);
+    const hit = await cache.match(url);
+    const network = store(cache, url, hash).catch(() => null);
+    if (hit && hit.headers.get(HASH_HEADER) === hash) {{
+        event.waitUntil(network);
+        return hit;
+    }}
+    return (await network) || hit || Response.error();
+}}
+
+async function fetchLibrary(cache, request) {{
+    const response = await fetch(request);
+    if (response.ok || response.type === 'opaque') await cache.put(request, response.clone());
+    return response;
+}}
+
+async function cacheFirst(request) {{
+    const cache = await caches.open(LIB_CACHE);
+    const hit = await cache.match(request);
+    return hit || fetchLibrary(cache, request);
+}}
+
+// Biblioteca sem versão fixa: responde do cache e busca a atual para a próxima vez
+async function libraryStaleWhileRevalidate(event, request) {{
+    const cache = await caches.open(LIB_CACHE);
+    const hit = await cache.match(request);
+    const network = fetchLibrary(cache, request).catch(() => null);
+    if (hit) {{
+        event.waitUntil(network);
+        return hit;
+    }}
+    return (await network) || Response.error();
+}}
+
+self.addEventListener('fetch', event => {{
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (LIBRARY_HOSTS.includes(url.host)) {{
+        event.respondWith(PINNED_VERSION.test(url.pathname)
+            ? cacheFirst(request)
+            : libraryStaleWhileRevalidate(event, request));
+        return;
+    }}
+    if (url.origin !== self.location.origin) return;
+    const key = url.origin + url.pathname;
+    event.respondWith(loadManifest().then(
+        ({{ assets }}) => assets.has(key) ? staleWhileRevalidate(event, key, assets.get(key)) : fetch(request),
+        () => fetch(request)
+    ));
+}});
+"""
+    return template.format(version=version, manifest=manifest_file,
+                           hosts_json=json.dumps(library_hosts))
+
+DATA_MODULE_HASH_PATTERN = re.compile(r"\(html ([0-9a-f]{12})\)")
+
+def data_module_is_current(html_path: str, module_path: str) -> bool:
+    """
+    O módulo de dados corresponde ao HTML atual da análise? O cabeçalho dos
+    módulos (extraídos aqui ou gravados pelo gerador com --data-module) traz o
+    hash do HTML de origem. Módulos antigos, sem hash, são reextraídos uma vez
+    (a data do arquivo não prova nada: cp -p e rsync a preservam).
+    """
+    if not os.path.isfile(module_path):
+        return False
+    with open(module_path, 'r', encoding='utf-8') as f:
+        header = f.readline()
+    recorded = DATA_MODULE_HASH_PATTERN.search(header)
+    return bool(recorded) and recorded.group(1) == file_hash(html_path)
+
+def extract_data_module(html_path: str, module_path: str):
+    """Grava o módulo de dados de uma análise a partir dos literais JSON do seu HTML"""
+    with open(html_path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    payload = read_data_literals(html, DATA_LITERALS, os.path.dirname(html_path))
+    source = re.search(r"Arquivo:</strong>\s*([^<$]+)<", html)
+    module_id = analysis_id(os.path.basename(html_path))
+    payload["title"] = module_id
+    payload["file_source"] = source.group(1).strip() if source else os.path.basename(html_path)
+    waves = re.search(r"^\s*let WAVES = (\[.*?\]);", html, re.MULTILINE)
+    payload["waves"] = json.loads(waves.group(1)) if waves else []
+    with open(module_path, 'w', encoding='utf-8') as f:
+        f.write(f"// Dados da análise {json.dumps(module_id, ensure_ascii=False)} — extraídos de "
+                f"{os.path.basename(html_path)} (html {file_hash(html_path)})\n")
+        f.write(f"(window.SPSS_ANALYSES = window.SPSS_ANALYSES || {{}})[{json.dumps(module_id, ensure_ascii=False)}] = ")
+        f.write(json.dumps(payload, ensure_ascii=False) + ";\n")
+
+def search_tokens(text: str) -> List[str]:
+    """Minúsculas, sem acentos, quebrado em palavras alfanuméricas (mesma regra do JavaScript do master)"""
+    folded = ''.join(c for c in unicodedata.normalize('NFKD', str(text).lower()) if not unicodedata.combining(c))
+    return re.findall(r'[a-z0-9]+', folded)
+
+def load_search_entries(base_dir: str, file: str):
+    """
+    Variáveis ({name, title, options}) do índice de busca de uma análise:
+    <análise>.search.json se existir, senão VARS_META/RECORDS do próprio HTML.
+    None se a análise não estiver em base_dir.
+    """
+    index_path = os.path.join(base_dir, analysis_id(file) + ".search.json")
+    if os.path.isfile(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)["variables"]
+    html_path = os.path.join(base_dir, file)
+    if not os.path.isfile(html_path):
+        return None
+    with open(html_path, 'r', encoding='utf-8') as f:
+        data = read_data_literals(f.read(), ("vars_meta", "records"), base_dir)
+    variables = []
+    for v in data["vars_meta"]:
+        entry = {"name": v["name"], "title": v.get("title") or v["name"]}
+        if v.get("type") == "mr":
+            options = set()
+            for rec in data["records"]:
+                value = rec.get(v["name"])
+                if isinstance(value, list):
+                    options.update(value)
+            entry["options"] = sorted(options)
+        variables.append(entry)
+    return variables
+
 def main():
     print("🎯 GERENCIADOR DO DASHBOARD MASTER v2.0")
     print("=" * 60)
@@ -1362,7 +2688,9 @@ def main():
         print("11. 🎯 Aplicar template predefinido")
         print("12. 🏢 Atualizar logo do cliente")
         print("13. ✏️ Editor de menu (reordenar, editar)")
-        print("14. ❌ Sair")
+        print("14. 🧠 Cache e pré-carregamento de análises")
+        print("15. 📦 Publicar (arquivos pré-comprimidos)")
+        print("16. ❌ Sair")
         
         choice = input("\n👉 Escolha uma opção: ").strip()
         
@@ -1530,6 +2858,55 @@ def main():
             manager.menu_editor_interface()
         
         elif choice == "14":
+            print("\n🧠 CACHE E PRÉ-CARREGAMENTO DE ANÁLISES")
+            print("-" * 40)
+            current = manager.config.get("iframe_pool_size", DEFAULT_IFRAME_POOL_SIZE)
+            print(f"Análises mantidas carregadas: {current}")
+            print("\n💡 Voltar a uma análise em cache é instantâneo; cada uma ocupa")
+            print("   a memória de uma página aberta. Use 1 para o comportamento antigo.")
+            
+            value = input("\nNovo tamanho (Enter mantém o atual): ").strip()
+            if value:
+                if value.isdigit() and int(value) >= 1:
+                    manager.update_iframe_pool_size(int(value))
+                else:
+                    print("❌ Informe um número inteiro maior ou igual a 1")
+            
+            budget = manager.config.get("prefetch_budget_kb", DEFAULT_PREFETCH_BUDGET_KB)
+            print(f"\nOrçamento de pré-carregamento: {budget} KB")
+            print("💡 Análises são baixadas ao passar o mouse e, com o navegador ocioso,")
+            print("   as vizinhas do grupo aberto. 0 desativa.")
+            value = input("\nNovo orçamento em KB (Enter mantém o atual): ").strip()
+            if value:
+                if value.isdigit():
+                    manager.update_prefetch_budget(int(value))
+                else:
+                    print("❌ Informe um número inteiro (KB)")
+            
+            mode = manager.config.get("master_mode", "iframe")
+            print(f"\nModo do master: {mode}")
+            print("💡 iframe: cada análise é uma página completa.")
+            print(f"   runtime: um único {RUNTIME_PAGE} carrega as bibliotecas uma vez e troca")
+            print("   só os dados (<análise>.data.js, gerados com --data-module ou extraídos do HTML).")
+            value = input("\nNovo modo (iframe/runtime, Enter mantém o atual): ").strip().lower()
+            if value:
+                manager.update_master_mode(value)
+            
+            offline = manager.config.get("offline_cache", False)
+            print(f"\nCache offline: {'ligado' if offline else 'desligado'}")
+            print(f"💡 Grava {SERVICE_WORKER} e {ASSET_MANIFEST} junto do master: bibliotecas e análises")
+            print("   ficam no navegador e só são baixadas de novo quando mudam (requer http/https).")
+            value = input("\nLigar cache offline? (s/n, Enter mantém o atual): ").strip().lower()
+            if value in ("s", "n"):
+                manager.update_offline_cache(value == "s")
+        
+        elif choice == "15":
+            print("\n📦 PUBLICAR (ARQUIVOS PRÉ-COMPRIMIDOS)")
+            print("-" * 40)
+            master_name = input("Master já gerado (deixe vazio para 'index.html'): ").strip() or "index.html"
+            manager.publish_site(master_name)
+        
+        elif choice == "16":
             print("👋 Até logo!")
             break
         
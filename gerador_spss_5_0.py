@@ -4,9 +4,13 @@
 # ========== IMPORTS E CONSTANTES ==========
 
 import os, sys, json, re, pandas as pd
+import numpy as np
+import asyncio, bisect, copy, hashlib, logging, queue, random, threading, time, tracemalloc
 import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 try:
     import pyreadstat
@@ -24,8 +28,125 @@ except ImportError:
     print("🖥️ tkinter é necessário para a interface gráfica")
     sys.exit(1)
 
+# Opcional: exportação da tabela processada (--table parquet/arrow)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 # Constantes
 CHART_LABEL_MAX = 15
+HISTOGRAM_BINS = 10
+
+# Variáveis categóricas com muitas categorias (município, profissão...) mostram
+# só as TOP N no gráfico/tabela; o restante vira "Outros (k categorias)".
+HIGH_CARDINALITY_THRESHOLD = 30
+HIGH_CARDINALITY_TOP_N = 15
+
+# Etapas da geração (chave, texto exibido na janela de progresso)
+GENERATION_STAGES = [
+    ("read", "Lendo arquivo .sav"),
+    ("detect", "Detectando tipos de variáveis"),
+    ("records", "Montando registros"),
+    ("keywords", "Extraindo palavras‑chave"),
+    ("render", "Gerando HTML"),
+    ("write", "Gravando arquivo"),
+]
+PROGRESS_EVERY = 500  # registros entre dois avisos de progresso
+READ_CHUNK_ROWS = 50_000  # linhas por bloco na leitura cancelável do .sav (GUI)
+PREVIEW_DEFAULT_N = 500  # respondentes na prévia (--preview / botão Prévia)
+
+class GenerationCancelled(Exception):
+    """Geração interrompida pelo usuário (botão Cancelar da GUI)."""
+
+# Mensagens do processamento: DEBUG (detalhe por variável/valor/registro) só com --verbose
+log = logging.getLogger("gerador_spss")
+
+def setup_logging(verbose: bool = False) -> None:
+    """Console no formato dos prints de sempre; INFO por padrão, DEBUG com --verbose."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.handlers[:] = [handler]
+    log.setLevel(logging.DEBUG if verbose else logging.INFO)
+    log.propagate = False
+
+class StageProfiler:
+    """
+    Cronometra as etapas da geração para --profile: tempo de parede, tempo de
+    CPU e pico de memória Python (tracemalloc) de cada etapa. Desligado, nada
+    é medido. As etapas são sequenciais: begin() fecha a anterior (o pico de
+    memória é zerado a cada etapa).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages: List[dict] = []
+        self._current = None
+
+    def start(self, trace_memory: bool = True) -> None:
+        """trace_memory=False dispensa o tracemalloc (tempos sem a sobrecarga dele)."""
+        self.enabled = True
+        self.stages = []
+        if trace_memory:
+            tracemalloc.start()
+
+    def begin(self, name: str, **info) -> None:
+        if not self.enabled:
+            return
+        self.end()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._current = (name, info, time.perf_counter(), time.process_time())
+
+    def end(self) -> None:
+        if not self.enabled or self._current is None:
+            return
+        name, info, wall, cpu = self._current
+        wall_s, cpu_s = time.perf_counter() - wall, time.process_time() - cpu
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+        self.stages.append({
+            "stage": name,
+            "wall_s": round(wall_s, 4),
+            "cpu_s": round(cpu_s, 4),
+            "peak_mb": round(peak / 1024 / 1024, 2) if peak is not None else None,
+            "current_mb": round(current / 1024 / 1024, 2) if current is not None else None,
+            **info,
+        })
+        self._current = None
+
+    @contextmanager
+    def stage(self, name: str, **info):
+        self.begin(name, **info)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def report(self) -> dict:
+        return {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "total_wall_s": round(sum(st["wall_s"] for st in self.stages), 4),
+            "stages": self.stages,
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        for st in self.stages:
+            memory = f"{st['peak_mb']:>8.1f} MB pico" if st["peak_mb"] is not None else ""
+            log.info(f"⏱️ {st['stage']:<10} {st['wall_s']:>8.3f}s parede  {st['cpu_s']:>8.3f}s CPU  {memory}")
+        log.info(f"📝 Relatório de perfil: {path}")
+
+    def stop(self) -> None:
+        self.end()
+        self.enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+PROFILER = StageProfiler()
 
 # ========== FUNÇÕES DE UTILIDADE ==========
 
@@ -53,13 +174,36 @@ def fix_string(s: str) -> str:
         pass
     return s
 
-def read_sav_auto(path: str):
+def read_sav_auto(path: str, progress: Optional[Callable] = None):
+    """
+    Lê o .sav tentando as codificações comuns. Com progress (o mesmo da geração),
+    lê em blocos de READ_CHUNK_ROWS linhas e chama progress("read", lidas, total)
+    entre um bloco e outro: o Cancelar da GUI interrompe a leitura ali
+    (GenerationCancelled) em vez de esperar o arquivo inteiro.
+    """
     tries = [dict(encoding=None), dict(encoding="cp1252"), dict(encoding="latin1")]
     last_err = None
     for kw in tries:
         try:
-            df, meta = pyreadstat.read_sav(path, apply_value_formats=False, user_missing=True, **kw)
+            if progress is None:
+                df, meta = pyreadstat.read_sav(path, apply_value_formats=False, user_missing=True, **kw)
+                return df, meta
+            _, meta = pyreadstat.read_sav(path, metadataonly=True, user_missing=True, **kw)
+            total = meta.number_rows or 0
+            chunks = []
+            progress("read", 0, total)
+            for chunk, _ in pyreadstat.read_file_in_chunks(
+                    pyreadstat.read_sav, path, chunksize=READ_CHUNK_ROWS,
+                    apply_value_formats=False, user_missing=True, **kw):
+                chunks.append(chunk)
+                progress("read", sum(len(c) for c in chunks), total)
+            if not chunks:  # arquivo sem linhas
+                df, _ = pyreadstat.read_sav(path, apply_value_formats=False, user_missing=True, **kw)
+            else:
+                df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
             return df, meta
+        except GenerationCancelled:
+            raise
         except Exception as e:
             last_err = e
     raise RuntimeError(f"Falha ao ler o arquivo .sav: {last_err}")
@@ -538,7 +682,7 @@ def normalize_and_translate_labels(labels_dict: Dict) -> Dict:
         # Verificar se existe tradução
         if normalized_text in translations:
             normalized_labels[key] = translations[normalized_text]
-            print(f"   📝 Traduzindo: '{label}' → '{translations[normalized_text]}'")
+            log.debug("   📝 Traduzindo: '%s' → '%s'", label, translations[normalized_text])
         else:
             # Manter original se não houver tradução
             normalized_labels[key] = label
@@ -591,7 +735,7 @@ def detect_binary_indicators_improved(labels_dict: Dict) -> bool:
     # Verificar se os labels limpos correspondem a algum padrão binário
     for pattern in binary_patterns:
         if cleaned_labels == pattern or cleaned_labels.issubset(pattern):
-            print(f"   ✅ Padrão binário detectado: {cleaned_labels}")
+            log.debug(f"   ✅ Padrão binário detectado: {cleaned_labels}")
             return True
     
     return False
@@ -607,7 +751,7 @@ def detect_mr_groups_improved(selected_vars: List[str], meta, df) -> Tuple[Dict[
         - standalone_vars: lista de variáveis independentes
     """
     
-    print("\n🔍 === DETECTANDO GRUPOS MR (VERSÃO CORRIGIDA) ===")
+    log.debug("\n🔍 === DETECTANDO GRUPOS MR (VERSÃO CORRIGIDA) ===")
     
     # Mapear todas as variáveis com padrão BASE_N
     var_patterns = {}  # base -> [lista de variáveis]
@@ -615,7 +759,7 @@ def detect_mr_groups_improved(selected_vars: List[str], meta, df) -> Tuple[Dict[
     
     for var in selected_vars:
         if var not in df.columns:
-            print(f"⚠️ Variável {var} não encontrada no dataset")
+            log.warning(f"⚠️ Variável {var} não encontrada no dataset")
             continue
             
         # Testar padrões MR comuns
@@ -634,43 +778,43 @@ def detect_mr_groups_improved(selected_vars: List[str], meta, df) -> Tuple[Dict[
                     if base not in var_patterns:
                         var_patterns[base] = []
                     var_patterns[base].append(var)
-                    print(f"✅ {var} → Grupo {base}")
+                    log.debug(f"✅ {var} → Grupo {base}")
                     matched = True
                     break
         
         if not matched:
             standalone_vars.append(var)
-            print(f"📋 {var} → Variável independente")
+            log.debug(f"📋 {var} → Variável independente")
     
     # Identificar quais bases têm múltiplas variáveis (são realmente MR)
     mr_groups = {}
     for base, vars_list in var_patterns.items():
         if len(vars_list) >= 2:
-            print(f"\n🔗 Analisando possível grupo MR para base {base}: {vars_list}")
+            log.debug(f"\n🔗 Analisando possível grupo MR para base {base}: {vars_list}")
             
             # Determinar tipo MR (binary/categorical/rating_scale)
             mr_subtype = detect_mr_type_improved(vars_list, meta, df)
-            print(f"   Tipo detectado: {mr_subtype}")
+            log.debug(f"   Tipo detectado: {mr_subtype}")
             
             # Se for rating_scale, NÃO agrupar como MR
             if mr_subtype == "rating_scale":
-                print(f"   🎯 É bateria de escalas, tratando como variáveis individuais")
+                log.debug(f"   🎯 É bateria de escalas, tratando como variáveis individuais")
                 standalone_vars.extend(vars_list)
                 continue
             
             # Se chegou aqui, é MR verdadeira
-            print(f"   ✅ Confirmado como múltipla resposta")
+            log.debug(f"   ✅ Confirmado como múltipla resposta")
             
             # Obter título do grupo
             title = get_mr_group_title(base, vars_list, meta)
-            print(f"   Título: {title}")
+            log.debug(f"   Título: {title}")
             
             # Verificar se há variável "_other"
             other_var = f"{base}_other"
             group_other = None   # <-- CRUCIAL: garantir que SEMPRE exista
 
             if other_var in df.columns:
-                print(f"   Encontrada variável other: {other_var}")
+                log.debug(f"   Encontrada variável other: {other_var}")
                 group_other = other_var
                 if other_var not in standalone_vars:
                     standalone_vars.append(other_var)
@@ -686,11 +830,11 @@ def detect_mr_groups_improved(selected_vars: List[str], meta, df) -> Tuple[Dict[
         else:
             # Se tem só 1 variável, tratar como standalone
             standalone_vars.extend(vars_list)
-            print(f"📋 {base} tem só 1 variável, tratando como independente")
+            log.debug(f"📋 {base} tem só 1 variável, tratando como independente")
     
-    print(f"\n📊 RESULTADO:")
-    print(f"   Grupos MR criados: {len(mr_groups)}")
-    print(f"   Variáveis independentes: {len(standalone_vars)}")
+    log.info(f"\n📊 RESULTADO:")
+    log.info(f"   Grupos MR criados: {len(mr_groups)}")
+    log.info(f"   Variáveis independentes: {len(standalone_vars)}")
     
     # Identificar escalas que foram separadas
     scale_groups = 0
@@ -701,7 +845,7 @@ def detect_mr_groups_improved(selected_vars: List[str], meta, df) -> Tuple[Dict[
                 scale_groups += 1
     
     if scale_groups > 0:
-        print(f"   🎯 Baterias de escalas detectadas: {scale_groups} (tratadas como variáveis individuais)")
+        log.info(f"   🎯 Baterias de escalas detectadas: {scale_groups} (tratadas como variáveis individuais)")
     
     return mr_groups, standalone_vars
 
@@ -742,7 +886,7 @@ def detect_mr_type_improved(group_vars: List[str], meta, df) -> str:
         
         for pattern, scale_type in scale_patterns.items():
             if re.search(pattern, label_text):
-                print(f"   🎯 Detectado como ESCALA ({scale_type}), não MR")
+                log.debug(f"   🎯 Detectado como ESCALA ({scale_type}), não MR")
                 return "rating_scale"
         
         # Verificar se os values formam uma sequência numérica (escala)
@@ -760,7 +904,7 @@ def detect_mr_type_improved(group_vars: List[str], meta, df) -> str:
                 numeric_values.sort()
                 # Verificar se é sequencial (1,2,3,4,5 ou similar)
                 if numeric_values == list(range(min(numeric_values), max(numeric_values) + 1)):
-                    print(f"   🎯 Detectado como ESCALA NUMÉRICA ({min(numeric_values)}-{max(numeric_values)}), não MR")
+                    log.debug(f"   🎯 Detectado como ESCALA NUMÉRICA ({min(numeric_values)}-{max(numeric_values)}), não MR")
                     return "rating_scale"
         except:
             pass
@@ -779,14 +923,14 @@ def detect_mr_type_improved(group_vars: List[str], meta, df) -> str:
 
         # ➤ REGRA DEFINITIVA: Se contém palavras de escala → retornar "rating_scale"
         if any(kw in labels for kw in scale_keywords):
-            print("   🎯 Escala de avaliação detectada — NÃO é MR")
+            log.debug("   🎯 Escala de avaliação detectada — NÃO é MR")
             return "rating_scale"
 
     # 3. Só agora testar MR binária
     for var in group_vars:
         vmap = valabs.get(var, {})
         if vmap and detect_binary_indicators_improved(vmap):
-            print("   ✅ Detectado como MR BINÁRIA")
+            log.debug("   ✅ Detectado como MR BINÁRIA")
             return "binary"    
 
     # 3. Fallback: verificar dados reais (se tem 3+ variáveis com só 0/1)
@@ -804,17 +948,17 @@ def detect_mr_type_improved(group_vars: List[str], meta, df) -> str:
                         break
         
         if all_01:
-            print(f"   ✅ Detectado como MR BINÁRIA (pelos dados)")
+            log.debug(f"   ✅ Detectado como MR BINÁRIA (pelos dados)")
             return "binary"
     
     # 4. Verificar colchetes nos labels (padrão LimeSurvey)
     for var in group_vars:
         label = get_var_label(meta, var)
         if "[" in label and "]" in label:
-            print(f"   ✅ Detectado como MR BINÁRIA (padrão colchetes)")
+            log.debug(f"   ✅ Detectado como MR BINÁRIA (padrão colchetes)")
             return "binary"
     
-    print(f"   📊 Detectado como MR CATEGÓRICA")
+    log.debug(f"   📊 Detectado como MR CATEGÓRICA")
     return "categorical"
 
 def get_mr_group_title(base: str, vars_list: List[str], meta) -> str:
@@ -851,6 +995,29 @@ TIME_PREFIXES = (
     "TIME", "DTIME", "MTIME"
 )
 
+def _looks_textual(series) -> bool:
+    """Passo 3 de detect_physical_type: o conteúdo da coluna parece texto?"""
+    # dtype object geralmente indica texto
+    if series.dtype == object:
+        return True
+
+    # Verificar se 80% dos valores NÃO são numéricos → string
+    sample = series.dropna().astype(str).head(20)
+    nonnum = 0
+    for v in sample:
+        try:
+            float(v)
+        except:
+            nonnum += 1
+    if len(sample) > 0 and nonnum / len(sample) > 0.5:
+        return True
+
+    # Verificar presença de palavras → string
+    for v in sample:
+        if any(c.isalpha() for c in v):
+            return True
+    return False
+
 def detect_physical_type(meta, df, var_name: str) -> str:
     """
     Detecta o tipo REAL da variável (string, numeric, date),
@@ -876,29 +1043,15 @@ def detect_physical_type(meta, df, var_name: str) -> str:
         return "string"
 
     # ---------- 3) Inspeção do dataframe ----------
+    # (feita uma vez por arquivo em profile_columns, quando o perfil existe)
     if var_name in df.columns:
-        series = df[var_name]
-
-        # dtype object geralmente indica texto
-        if series.dtype == object:
-            return "string"
-
-        # Verificar se 80% dos valores NÃO são numéricos → string
-        sample = series.dropna().astype(str).head(20)
-        nonnum = 0
-        for v in sample:
-            try:
-                float(v)
-            except:
-                nonnum += 1
-        if len(sample) > 0 and nonnum / len(sample) > 0.5:
+        profile = (getattr(meta, "column_profiles", None) or {}).get(var_name)
+        if profile and "physical_type" in profile:
+            return profile["physical_type"]
+        looks_textual = profile["looks_textual"] if profile else _looks_textual(df[var_name])
+        if looks_textual:
             return "string"
 
-        # Verificar presença de palavras → string
-        for v in sample:
-            if any(c.isalpha() for c in v):
-                return "string"
-
     # ---------- 4) Detectar datas ----------
     DATE_PREFIXES = (
         "DATE","ADATE","SDATE","EDATE","JDATE",
@@ -928,16 +1081,139 @@ def detect_measure_type(meta, var_name: str, physical_type: str):
 
     return None
 
-def detect_variables_universal(selected_vars, meta, valabs, df):
+# ========== PERFIL DAS COLUNAS ==========
+
+PROFILE_FREE_TEXT_MIN_UNIQUE = 50  # texto com mais valores distintos que isso = resposta aberta
+
+def profile_columns(df, meta) -> Dict[str, dict]:
+    """
+    Perfil de todas as colunas numa passada: vazios, valores distintos e fração
+    que vira número vêm de reduções vetorizadas do pandas; formato, medida e
+    rótulos vêm do meta. O resultado fica em meta.column_profiles (cacheado
+    junto com o dataset) e é reaproveitado por detect_physical_type.
+    Não usa df.attrs: o pandas copia attrs a cada df[col].
+    """
+    cached = getattr(meta, "column_profiles", None)
+    if cached is not None:
+        return cached
+
+    n_rows = len(df)
+    null_counts = df.isna().sum()
+    unique_counts = df.nunique(dropna=True)
+    var_formats = getattr(meta, "variable_display_formats", {}) or {}
+    measures = getattr(meta, "variable_measure", {}) or {}
+    valabs = getattr(meta, "variable_value_labels", {}) or {}
+
+    profiles: Dict[str, dict] = {}
+    for col in df.columns:
+        series = df[col]
+        non_null = n_rows - int(null_counts[col])
+        if pd.api.types.is_numeric_dtype(series):
+            numeric_ratio = 1.0 if non_null else 0.0
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            numeric_ratio = 0.0
+        else:
+            parsed = pd.to_numeric(series, errors="coerce")
+            numeric_ratio = float(parsed.notna().sum()) / non_null if non_null else 0.0
+        profiles[col] = {
+            "name": col,
+            "rows": n_rows,
+            "missing": n_rows - non_null,
+            "missing_rate": (n_rows - non_null) / n_rows if n_rows else 0.0,
+            "unique": int(unique_counts[col]),
+            "numeric_ratio": numeric_ratio,
+            "format": str(var_formats.get(col, "")),
+            "spss_measure": measures.get(col),
+            "labelled": bool(valabs.get(col)),
+            "looks_textual": _looks_textual(series),
+        }
+    meta.column_profiles = profiles
+
+    # Tipo físico e medida pelas regras de sempre, agora lendo o perfil
+    for col, profile in profiles.items():
+        physical = detect_physical_type(meta, df, col)
+        profile["physical_type"] = physical
+        profile["measure"] = detect_measure_type(meta, col, physical)
+        profile["warning"] = _profile_warning(profile)
+    return profiles
+
+def _profile_warning(profile: dict) -> Optional[str]:
+    """Alerta para colunas que deixam o dashboard pesado se escolhidas sem querer."""
+    if profile["physical_type"] == "string" and profile["unique"] > PROFILE_FREE_TEXT_MIN_UNIQUE:
+        return "texto livre"
+    if (profile["physical_type"] == "numeric" and profile["measure"] != "scale"
+            and profile["unique"] > HIGH_CARDINALITY_THRESHOLD):
+        return f"{profile['unique']:,} categorias".replace(",", ".")
+    if profile["rows"] and profile["missing"] == profile["rows"]:
+        return "vazia"
+    return None
+
+def describe_profile(profile: dict) -> str:
+    """Resumo curto do perfil para as listas da GUI (tipo · distintos · vazios)."""
+    kind = profile["measure"] or {"string": "texto", "date": "data"}.get(profile["physical_type"], "numérica")
+    parts = [kind, f"{profile['unique']:,} dist.".replace(",", ".")]
+    if profile["missing_rate"] >= 0.005:
+        parts.append(f"{profile['missing_rate'] * 100:.0f}% vazio")
+    text = " · ".join(parts)
+    if profile["warning"]:
+        text = f"⚠️ {profile['warning']} · {text}"
+    return text
+
+def count_categories(vm: dict, mr_groups: Dict[str, Dict], df) -> int:
+    """Número de categorias distintas de uma variável categórica ou grupo MR."""
+    if vm.get("var_type") == "multiple_response":
+        group = mr_groups.get(vm["name"], {})
+        members = [c for c in group.get("members", []) if c in df.columns]
+        if group.get("mr_subtype") == "binary":
+            return len(members) + (1 if group.get("other_var") else 0)
+        if not members:
+            return 0
+        return int(pd.concat([df[c] for c in members], ignore_index=True).nunique())
+    col = vm.get("sheet_code")
+    if col in df.columns:
+        return int(df[col].nunique())
+    return 0
+
+def decide_category_display(vars_meta: List[dict], mr_groups: Dict[str, Dict], df,
+                            top_n_overrides: Optional[Dict[str, int]] = None):
+    """
+    Define, por variável, a política de exibição das categorias.
+
+    Nominais e MR com mais de HIGH_CARDINALITY_THRESHOLD categorias recebem
+    top_n = HIGH_CARDINALITY_TOP_N; o dashboard agrupa o restante em
+    "Outros (k categorias)" e oferece a tabela completa sob demanda.
+    top_n_overrides ({variável: N}) força o valor; N = 0 desativa o agrupamento.
+    """
+    overrides = top_n_overrides or {}
+    for vm in vars_meta:
+        vm["top_n"] = None
+        is_nominal = vm.get("var_type") == "categorical" and vm.get("measure") == "nominal"
+        if not (is_nominal or vm.get("var_type") == "multiple_response"):
+            continue
+        n_categories = count_categories(vm, mr_groups, df)
+        vm["n_categories"] = n_categories
+        override = overrides.get(vm["name"], overrides.get(vm.get("sheet_code")))
+        if override is not None:
+            vm["top_n"] = int(override) or None
+        elif n_categories > HIGH_CARDINALITY_THRESHOLD:
+            vm["top_n"] = HIGH_CARDINALITY_TOP_N
+        if vm["top_n"]:
+            log.info(f"   ✂️ {vm['name']}: {n_categories} categorias → TOP {vm['top_n']} + Outros")
+
+def detect_variables_universal(selected_vars, meta, valabs, df,
+                               top_n_overrides: Optional[Dict[str, int]] = None):
     """
     VERSÃO CORRIGIDA que preserva a ordem original do SPSS.
     
     Em vez de processar primeiro todos os grupos MR e depois todas as standalone,
     processa na ordem original do selected_vars, decidindo para cada posição
     se é um grupo MR ou uma variável standalone.
+
+    Também decide a política TOP N das variáveis de alta cardinalidade
+    (ver decide_category_display).
     """
-    print(f"\n🔍 === DETECÇÃO DE VARIÁVEIS - ORDEM ORIGINAL PRESERVADA ===")
-    print(f"📋 Variáveis selecionadas: {selected_vars[:5]}{'...' if len(selected_vars) > 5 else ''}")
+    log.debug(f"\n🔍 === DETECÇÃO DE VARIÁVEIS - ORDEM ORIGINAL PRESERVADA ===")
+    log.debug(f"📋 Variáveis selecionadas: {selected_vars[:5]}{'...' if len(selected_vars) > 5 else ''}")
     
     vars_meta = []
     processed_vars = set()  # Rastrear variáveis já processadas
@@ -945,11 +1221,11 @@ def detect_variables_universal(selected_vars, meta, valabs, df):
     # PASSO 1: Detectar grupos MR (usando apenas variáveis selecionadas para análise)
     mr_groups, standalone_vars = detect_mr_groups_improved(selected_vars, meta, df)
     
-    print(f"\n📊 Grupos MR detectados: {list(mr_groups.keys())}")
-    print(f"📋 Variáveis standalone: {len(standalone_vars)}")
+    log.debug(f"\n📊 Grupos MR detectados: {list(mr_groups.keys())}")
+    log.debug(f"📋 Variáveis standalone: {len(standalone_vars)}")
     
     # PASSO 2: Processar na ORDEM ORIGINAL intercalando MR e standalone
-    print(f"\n🔧 Processando na ordem original do SPSS:")
+    log.debug(f"\n🔧 Processando na ordem original do SPSS:")
     
     for i, var in enumerate(selected_vars):
         if var in processed_vars:
@@ -966,7 +1242,7 @@ def detect_variables_universal(selected_vars, meta, valabs, df):
             # Esta variável é a primeira do seu grupo MR - adicionar o grupo aqui
             group_name, group_info = mr_group_for_this_var
             
-            print(f"   {i+1:2d}. {group_name} (grupo MR - primeiro membro: {var})")
+            log.debug(f"   {i+1:2d}. {group_name} (grupo MR - primeiro membro: {var})")
             
             vars_meta.append({
                 "name": group_name,
@@ -986,14 +1262,14 @@ def detect_variables_universal(selected_vars, meta, valabs, df):
                     continue
                 processed_vars.add(member_var)
             
-            print(f"      ✅ Grupo MR adicionado ({group_info['mr_subtype']}) - {len(group_info['members'])} variáveis")
+            log.debug(f"      ✅ Grupo MR adicionado ({group_info['mr_subtype']}) - {len(group_info['members'])} variáveis")
             
         elif var in standalone_vars:
             # Esta é uma variável standalone - processar normalmente
-            print(f"   {i+1:2d}. {var} (standalone)")
+            log.debug(f"   {i+1:2d}. {var} (standalone)")
             
             if var not in df.columns:
-                print(f"      ⚠️ Pulando {var} (não existe no dataset)")
+                log.warning(f"      ⚠️ Pulando {var} (não existe no dataset)")
                 processed_vars.add(var)
                 continue
             
@@ -1012,7 +1288,7 @@ def detect_variables_universal(selected_vars, meta, valabs, df):
                     "mr_subtype": None,
                     "stats": None
                 })
-                print(f"      ✅ Adicionado como string")
+                log.debug(f"      ✅ Adicionado como string")
                 
             elif physical == "date":
                 vars_meta.append({
@@ -1026,7 +1302,7 @@ def detect_variables_universal(selected_vars, meta, valabs, df):
                     "mr_subtype": None,
                     "stats": None
                 })
-                print(f"      ✅ Adicionado como data")
+                log.debug(f"      ✅ Adicionado como data")
                 
             else:
                 # Numérico - detectar medida a partir do SPSS (sem inferência por value labels)
@@ -1045,7 +1321,7 @@ def detect_variables_universal(selected_vars, meta, valabs, df):
                         "mr_subtype": None,
                         "stats": None  # Será calculado depois com ponderação
                     })
-                    print(f"      ✅ Adicionado como Numérica (Escala) seguindo SPSS")
+                    log.debug(f"      ✅ Adicionado como Numérica (Escala) seguindo SPSS")
                 else:
                     # Categórica (Nominal ou Ordinal) seguindo APENAS o Measure do SPSS
                     human = "Categórica (Ordinal)" if measure == "ordinal" else "Categórica (Nominal)"
@@ -1060,50 +1336,145 @@ def detect_variables_universal(selected_vars, meta, valabs, df):
                         "mr_subtype": None,
                         "stats": None
                     })
-                    print(f"      ✅ Adicionado como {human} (Measure SPSS)")
+                    log.debug(f"      ✅ Adicionado como {human} (Measure SPSS)")
 
                 processed_vars.add(var)
         
         else:
             # Variável não foi classificada (não deveria acontecer normalmente)
-            print(f"   {i+1:2d}. {var} (⚠️ não classificada - pulando)")
+            log.warning(f"   {i+1:2d}. {var} (⚠️ não classificada - pulando)")
             processed_vars.add(var)
     
     # PASSO 3: Verificar se todas as variáveis foram processadas
-    print(f"\n🔍 Verificação final:")
+    log.info(f"\n🔍 Verificação final:")
     missing_vars = set(selected_vars) - processed_vars
     if missing_vars:
-        print(f"⚠️ Variáveis não processadas: {missing_vars}")
+        log.warning(f"⚠️ Variáveis não processadas: {missing_vars}")
     else:
-        print(f"✅ Todas as {len(selected_vars)} variáveis foram processadas")
+        log.info(f"✅ Todas as {len(selected_vars)} variáveis foram processadas")
     
-    print(f"\n📈 RESUMO FINAL:")
-    print(f"   Total de variáveis no dashboard: {len(vars_meta)}")
-    print(f"   Grupos MR detectados: {len(mr_groups)}")
-    print(f"   Variáveis standalone: {len(standalone_vars)}")
+    log.info(f"\n📈 RESUMO FINAL:")
+    log.info(f"   Total de variáveis no dashboard: {len(vars_meta)}")
+    log.info(f"   Grupos MR detectados: {len(mr_groups)}")
+    log.info(f"   Variáveis standalone: {len(standalone_vars)}")
     
     # Debug: mostrar ordem final CORRIGIDA
-    print(f"\n✅ ORDEM FINAL PRESERVADA (CORRIGIDA):")
+    log.debug(f"\n✅ ORDEM FINAL PRESERVADA (CORRIGIDA):")
     for i, vm in enumerate(vars_meta):
-        print(f"   {i+1:2d}. {vm['name']} ({vm.get('var_type', vm['type'])})")
+        log.debug(f"   {i+1:2d}. {vm['name']} ({vm.get('var_type', vm['type'])})")
+
+    decide_category_display(vars_meta, mr_groups, df, top_n_overrides)
     
     return vars_meta, mr_groups
 
 
-def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List[str], 
-                          file_source: str, client_name: str, weight_var: str = None):
+def build_range_filter(df, meta, var_name: str) -> Optional[dict]:
     """
-    Constrói:
-      - created_at: timestamp
-      - vars_meta: metadados das variáveis (incluindo grupos MR e stats)
-      - filters_meta: metadados dos filtros
-      - records: lista de dicionários prontos para o dashboard
-      
-    NOVO: Inclui automaticamente campos de data (submitdate, etc.) para cálculo de período de coleta
+    Prepara um filtro de intervalo para uma coluna de data ou escala.
+
+    Em vez de listar valores, emite os valores válidos ORDENADOS e a permutação
+    correspondente (posição do registro em RECORDS), para que o dashboard
+    converta um intervalo em máscara de respondentes com busca binária.
+    Datas viram 'YYYY-MM-DD' (a ordem de texto coincide com a cronológica).
     """
-    created_at = datetime.now().strftime("%d/%m/%Y %H:%M")
-    
-    # === DETECTAR E INCLUIR CAMPOS DE DATA AUTOMATICAMENTE ===
+    if var_name not in df.columns:
+        log.warning(f"⚠️ Filtro de intervalo '{var_name}' não encontrado. Ignorando.")
+        return None
+
+    series = df[var_name].reset_index(drop=True)
+    var_formats = getattr(meta, "variable_display_formats", {}) or {}
+    fmt = str(var_formats.get(var_name, "")).upper()
+
+    kind = None
+    if pd.api.types.is_datetime64_any_dtype(series) or any(fmt.startswith(pfx) for pfx in DATE_PREFIXES):
+        kind = "date"
+    elif pd.api.types.is_numeric_dtype(series):
+        kind = "numeric"
+    else:
+        # Texto: aceitar se (quase) tudo for data ou número
+        nonnull = series.dropna()
+        if len(nonnull) > 0:
+            if pd.to_datetime(nonnull, errors="coerce").notna().mean() >= 0.9:
+                kind = "date"
+            elif pd.to_numeric(nonnull, errors="coerce").notna().mean() >= 0.9:
+                kind = "numeric"
+
+    if kind == "date":
+        parsed = pd.to_datetime(series, errors="coerce")
+        keys = parsed.dt.strftime("%Y-%m-%d")
+    elif kind == "numeric":
+        parsed = pd.to_numeric(series, errors="coerce")
+        keys = parsed
+    else:
+        log.warning(f"⚠️ '{var_name}' não é data nem escala numérica. Ignorando filtro de intervalo.")
+        return None
+
+    valid = keys[parsed.notna()]
+    if valid.empty:
+        log.warning(f"⚠️ '{var_name}' não tem valores válidos. Ignorando filtro de intervalo.")
+        return None
+
+    ordered = valid.sort_values(kind="mergesort")
+    sorted_values = ordered.tolist()
+    log.info(f"📏 Filtro de intervalo {var_name} ({kind}): {sorted_values[0]} → {sorted_values[-1]}, {len(sorted_values)} valores")
+    return {
+        "name": var_name,
+        "title": get_var_label(meta, var_name) or var_name,
+        "kind": "range",
+        "value_type": kind,
+        "min": sorted_values[0],
+        "max": sorted_values[-1],
+        "sorted_values": sorted_values,
+        "order": [int(i) for i in ordered.index],
+    }
+
+def stratified_sample(df, strata_vars: List[str], n: int, seed: int = 42):
+    """
+    Amostra aleatória estratificada de n respondentes para a prévia.
+
+    Os estratos são as combinações das variáveis-filtro (vazios contam como
+    categoria); cada um recebe uma cota proporcional ao seu tamanho, e as
+    sobras vão primeiro para estratos que ficariam sem nenhum caso. A ordem
+    original das linhas é mantida e o índice é refeito (0..n-1), como o
+    restante do pipeline espera.
+    """
+    if n <= 0 or n >= len(df):
+        return df
+    rng = random.Random(seed)
+    strata_vars = [v for v in strata_vars if v in df.columns]
+    if not strata_vars:
+        picked = rng.sample(range(len(df)), n)
+    else:
+        groups = df.groupby(strata_vars, dropna=False, sort=False).indices
+        exact = {key: len(positions) * n / len(df) for key, positions in groups.items()}
+        quota = {key: int(value) for key, value in exact.items()}
+        leftover = n - sum(quota.values())
+        for key in sorted(exact, key=lambda k: (quota[k] > 0, quota[k] - exact[k]))[:leftover]:
+            quota[key] += 1
+        picked = []
+        for key, positions in groups.items():
+            picked.extend(rng.sample(list(positions), min(quota[key], len(positions))))
+    return df.iloc[sorted(picked)].reset_index(drop=True)
+
+def split_range_filters(df, meta, filter_vars: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Separa os filtros escolhidos na GUI: datas e escalas sem rótulos viram
+    filtros de intervalo; o resto continua como lista de valores.
+    """
+    measures = getattr(meta, "variable_measure", {}) or {}
+    var_formats = getattr(meta, "variable_display_formats", {}) or {}
+    valabs = getattr(meta, "variable_value_labels", {}) or {}
+    categorical, ranges = [], []
+    for fv in filter_vars:
+        fmt = str(var_formats.get(fv, "")).upper()
+        is_date = fv in df.columns and pd.api.types.is_datetime64_any_dtype(df[fv])
+        is_date = is_date or any(fmt.startswith(pfx) for pfx in DATE_PREFIXES)
+        is_scale = measures.get(fv) == "scale" and not valabs.get(fv)
+        (ranges if is_date or is_scale else categorical).append(fv)
+    return categorical, ranges
+
+def detect_date_fields(df) -> List[str]:
+    """Colunas com cara de data de envio/coleta (submitdate, data_*, ...)."""
     date_fields = []
     for col in df.columns:
         col_lower = col.lower()
@@ -1120,17 +1491,63 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
                         test_date = pd.to_datetime(val, errors='coerce')
                         if pd.notna(test_date) and test_date.year > 1900:
                             date_fields.append(col)
-                            print(f"📅 Campo de data detectado: {col}")
+                            log.info(f"📅 Campo de data detectado: {col}")
                             break
             except:
                 continue
+    return date_fields
+
+def session_cached(cache: Optional[dict], key, compute: Callable):
+    """
+    Memoiza compute() no cache de detecção da sessão da GUI (None = sem cache).
+    Devolve sempre uma cópia profunda: quem chama pode alterar o resultado
+    (stats, keywords...) sem contaminar a próxima geração.
+    """
+    if cache is None:
+        return compute()
+    if key in cache:
+        log.info(f"♻️ Reaproveitando da sessão: {key[0] if isinstance(key, tuple) else key}")
+    else:
+        cache[key] = compute()
+    return copy.deepcopy(cache[key])
+
+def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List[str], 
+                          file_source: str, client_name: str, weight_var: str = None,
+                          top_n_overrides: Optional[Dict[str, int]] = None,
+                          range_filter_vars: Optional[List[str]] = None,
+                          progress: Optional[Callable[..., None]] = None,
+                          detection_cache: Optional[dict] = None):
+    """
+    Constrói:
+      - created_at: timestamp
+      - vars_meta: metadados das variáveis (incluindo grupos MR e stats)
+      - filters_meta: metadados dos filtros (categóricos e, com kind="range", de intervalo)
+      - records: lista de dicionários prontos para o dashboard
+      
+    NOVO: Inclui automaticamente campos de data (submitdate, etc.) para cálculo de período de coleta
+
+    progress(stage, done, total), se informado, é chamado a cada etapa e a cada
+    PROGRESS_EVERY registros; pode levantar GenerationCancelled para interromper.
+    detection_cache (dict da sessão da GUI) guarda campos de data e a detecção de
+    variáveis entre gerações do mesmo arquivo.
+    """
+    def report(stage: str, done: int = 0, total: int = 0):
+        if progress:
+            progress(stage, done, total)
+
+    created_at = datetime.now().strftime("%d/%m/%Y %H:%M")
+    report("detect")
+    PROFILER.begin("detection", variables=len(selected_vars))
+    
+    # === DETECTAR E INCLUIR CAMPOS DE DATA AUTOMATICAMENTE ===
+    date_fields = session_cached(detection_cache, "date_fields", lambda: detect_date_fields(df))
     
     # Combinar variáveis selecionadas com campos de data (removendo duplicatas)
     all_vars_for_records = list(selected_vars)
     for date_field in date_fields:
         if date_field not in all_vars_for_records:
             all_vars_for_records.append(date_field)
-            print(f"✅ Incluído automaticamente para período de coleta: {date_field}")
+            log.info(f"✅ Incluído automaticamente para período de coleta: {date_field}")
     
     # Mapa de value labels por variável
     valabs = get_value_labels_map(meta)
@@ -1145,13 +1562,13 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
             # Validar pesos (devem ser positivos)
             weight_values = weight_values.abs()
             weight_values = weight_values.replace(0, 1.0)  # Zero vira 1
-            print(f"⚖️ Usando variável peso: {weight_var}")
-            print(f"   📊 Estatísticas do peso: Média={weight_values.mean():.3f}, Min={weight_values.min():.3f}, Max={weight_values.max():.3f}")
+            log.info(f"⚖️ Usando variável peso: {weight_var}")
+            log.info(f"   📊 Estatísticas do peso: Média={weight_values.mean():.3f}, Min={weight_values.min():.3f}, Max={weight_values.max():.3f}")
         except Exception as e:
-            print(f"⚠️ Erro ao processar peso {weight_var}: {e}. Prosseguindo sem ponderação.")
+            log.warning(f"⚠️ Erro ao processar peso {weight_var}: {e}. Prosseguindo sem ponderação.")
             weight_values = None
     elif weight_var:
-        print(f"⚠️ Variável peso '{weight_var}' não encontrada. Prosseguindo sem ponderação.")
+        log.warning(f"⚠️ Variável peso '{weight_var}' não encontrada. Prosseguindo sem ponderação.")
         
     # Função helper para aplicar pesos
     def apply_weight(base_value, index):
@@ -1188,22 +1605,29 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
             code_to_label[var_name] = string_mapping
     
     # Metadados das variáveis e grupos de múltipla resposta (FASE 1)
-    vars_meta, mr_groups = detect_variables_universal(selected_vars, meta, valabs, df)
+    detection_key = ("variáveis", tuple(selected_vars), tuple(sorted((top_n_overrides or {}).items())))
+    vars_meta, mr_groups = session_cached(
+        detection_cache, detection_key,
+        lambda: detect_variables_universal(selected_vars, meta, valabs, df, top_n_overrides)
+    )
     
     # ---------- PROCESSAMENTO DE FILTROS ----------
+    PROFILER.begin("filters", filters=len(filter_vars) + len(range_filter_vars or []))
     filters_meta = []
     for fv in filter_vars:
         if fv in df.columns:
             unique_vals = []
-            print(f"🔍 DEBUG FILTRO {fv}:")
+            log.debug("🔍 DEBUG FILTRO %s:", fv)
             
             # Debug: mostrar estrutura do valabs para esta variável
             var_valabs = valabs.get(fv, {})
             if var_valabs:
-                print(f"   📋 Valabs keys: {list(var_valabs.keys())} (types: {[type(k).__name__ for k in var_valabs.keys()]})")
-                print(f"   📋 Valabs values: {list(var_valabs.values())}")
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("   📋 Valabs keys: %s (types: %s)", list(var_valabs.keys()),
+                              [type(k).__name__ for k in var_valabs.keys()])
+                    log.debug("   📋 Valabs values: %s", list(var_valabs.values()))
             else:
-                print(f"   ⚠️ Nenhum value_labels encontrado para {fv}")
+                log.debug("   ⚠️ Nenhum value_labels encontrado para %s", fv)
             
             for val in df[fv].dropna().unique():
                 # Usar lookup robusto para pegar o label correto
@@ -1211,7 +1635,7 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
                 processed_val = str(label).replace(":", "").strip()
                 processed_val = _normalize_display_value(processed_val)
                 unique_vals.append(processed_val)
-                print(f"   {val} ({type(val).__name__}) → '{label}' → '{processed_val}'")
+                log.debug("   %s (%s) → '%s' → '%s'", val, type(val).__name__, label, processed_val)
             
             if unique_vals:
                 filters_meta.append({
@@ -1219,9 +1643,14 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
                     "title": get_var_label(meta, fv) or fv,
                     "values": safe_sorted_unique(unique_vals)
                 })
-                print(f"✅ Filtro {fv}: {len(unique_vals)} valores únicos")
-                print(f"   Final values: {unique_vals}")
-            print()
+                log.info(f"✅ Filtro {fv}: {len(unique_vals)} valores únicos")
+                log.debug("   Final values: %s", unique_vals)
+    
+    # ---------- FILTROS DE INTERVALO (datas / escalas) ----------
+    for rv in range_filter_vars or []:
+        range_filter = build_range_filter(df, meta, rv)
+        if range_filter:
+            filters_meta.append(range_filter)
     
     # ---------- HELPERS ESPECÍFICOS DA FASE 3 ----------
     def format_spss_date(v):
@@ -1318,10 +1747,10 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
                     "max": max(vals)
                 }
         except Exception as e:
-            print(f"⚠️ Erro em compute_stats: {e}")
-            print(f"   Tipo de values: {type(values)}")
+            log.warning(f"⚠️ Erro em compute_stats: {e}")
+            log.debug(f"   Tipo de values: {type(values)}")
             if values:
-                print(f"   Primeiro elemento: {type(values[0])} = {values[0]}")
+                log.debug(f"   Primeiro elemento: {type(values[0])} = {values[0]}")
             return None
     
     # Mapeia quais variáveis são scale numéricas
@@ -1334,7 +1763,11 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
     
     # ---------- PROCESSAMENTO DE REGISTROS ----------
     records = []
+    total_rows = len(df)
+    PROFILER.begin("records", rows=total_rows)
     for index, row in df.iterrows():
+        if len(records) % PROGRESS_EVERY == 0:
+            report("records", len(records), total_rows)
         rec: Dict[str, Any] = {}
         
         # Adicionar peso do registro (1.0 se não há ponderação)
@@ -1342,13 +1775,16 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
         rec["__weight__"] = current_weight  # Campo especial para ponderação
         
         # ----- Filtros -----
+        # Rastro valor→label só para os primeiros registros e só em modo DEBUG
+        debug_record = index < 3 and log.isEnabledFor(logging.DEBUG)
         filter_debug = {}
         for fv in filter_vars:
             if fv in df.columns:
                 val = row.get(fv)
                 if pd.isna(val):
                     rec[fv] = None
-                    filter_debug[fv] = f"NULL"
+                    if debug_record:
+                        filter_debug[fv] = "NULL"
                 else:
                     # Usar lookup robusto para pegar o label correto
                     label = safe_value_label_lookup(valabs, fv, val)
@@ -1356,11 +1792,12 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
                         str(label).replace(":", "").strip()
                     )
                     rec[fv] = processed_val
-                    filter_debug[fv] = f"{val}→{label}→{processed_val}"
+                    if debug_record:
+                        filter_debug[fv] = f"{val}→{label}→{processed_val}"
         
         # Debug para primeiros registros
-        if index < 3:
-            print(f"📋 Record {index}: {filter_debug}")
+        if debug_record:
+            log.debug("📋 Record %s: %s", index, filter_debug)
         
         # ----- Variáveis -----
         for vm in vars_meta:
@@ -1486,6 +1923,7 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
         records.append(rec)
     
     # ---------- CÁLCULO FINAL DE STATS PARA VARIÁVEIS SCALE ----------
+    PROFILER.begin("stats")
     for vm in vars_meta:
         if vm.get("var_type") == "numeric" and vm.get("measure") == "scale":
             name = vm["name"]
@@ -1494,6 +1932,9 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
 
     # ---------- EXTRAÇÃO DE PALAVRAS‑CHAVE PARA VARIÁVEIS STRING ----------
     # Para cada variável de texto, coletar todas as respostas válidas e gerar palavras‑chave frequentes.
+    report("records", total_rows, total_rows)
+    report("keywords")
+    PROFILER.begin("keywords")
     try:
         for vm in vars_meta:
             if vm.get("var_type") == "string":
@@ -1507,39 +1948,262 @@ def build_records_and_meta(df, meta, selected_vars: List[str], filter_vars: List
                     vm["keywords"] = []
     except Exception as e:
         # Em caso de erro, não interromper o fluxo; apenas registrar no console.
-        print(f"⚠️ Erro ao extrair palavras‑chave: {e}")
+        log.warning(f"⚠️ Erro ao extrair palavras‑chave: {e}")
+    PROFILER.end()
     
     return created_at, vars_meta, filters_meta, records, value_orders, code_to_label
 
 # ========== GERAÇÃO DE HTML ==========
 
+WAVE_FILTER = "__wave__"
+
+def align_wave_codes(mapping: Dict[str, str], merged_codes: Dict[str, str],
+                     label_codes: Dict[str, str]) -> Dict[str, str]:
+    """
+    Encaixa o código → rótulo de uma onda no mapa já juntado das ondas anteriores
+    (merged_codes e o inverso label_codes, atualizados aqui). Um rótulo conhecido
+    fica com o código que já tem; um rótulo novo fica com o próprio código se ele
+    estiver livre, senão ganha o próximo código livre. Retorna o recódigo da onda
+    ({código da onda: código juntado}) só com os códigos que mudam.
+    """
+    recode = {}
+    for code, text in mapping.items():
+        target = label_codes.get(text)
+        if target is None:
+            target = code
+            if target in merged_codes:
+                numeric = [int(c) for c in merged_codes if c.lstrip("-").isdigit()]
+                n = max(numeric, default=0) + 1
+                target = str(n) if code.lstrip("-").isdigit() else f"{code}_{n}"
+                while target in merged_codes:
+                    n += 1
+                    target = str(n) if code.lstrip("-").isdigit() else f"{code}_{n}"
+            label_codes[text] = target
+            merged_codes[target] = text
+        if target != code:
+            recode[code] = target
+    return recode
+
+def merge_waves(waves: List[Tuple[str, tuple]]):
+    """
+    Junta as saídas de build_records_and_meta de várias ondas da mesma pesquisa
+    num único dicionário de variáveis. As variáveis se alinham pelo nome e os
+    valores pelo rótulo: nominais e filtros já trazem o rótulo nos registros, e as
+    ordinais (que guardam o código) são recodificadas para um único mapa
+    código → rótulo (align_wave_codes), mesmo que uma onda tenha a escala
+    invertida ou códigos diferentes. Só um código sem rótulo numa onda, que já
+    tem outro significado nas anteriores, fica como está (com aviso). A onda vira
+    o filtro "__wave__". Metadados de texto (título, palavras‑chave) vêm da onda
+    mais recente, a última da lista.
+
+    waves: [(rótulo, (created_at, vars_meta, filters_meta, records, value_orders, code_to_label))]
+    Retorna a mesma tupla de build_records_and_meta, já com todas as ondas.
+    """
+    labels = [label for label, _ in waves]
+    vars_by_name: Dict[str, dict] = {}
+    var_order: List[str] = []
+    filters_by_name: Dict[str, dict] = {}
+    filter_order: List[str] = []
+    records: List[dict] = []
+    value_orders: Dict[str, list] = {}
+    code_to_label: Dict[str, dict] = {}
+    label_codes: Dict[str, dict] = {}  # inverso de code_to_label: rótulo → código juntado
+
+    for label, (_, w_vars, w_filters, w_records, w_orders, w_codes) in waves:
+        offset = len(records)
+        for vm in w_vars:
+            name = vm["name"]
+            if name not in vars_by_name:
+                var_order.append(name)
+                merged = dict(vm, waves=[label])
+            else:
+                previous = vars_by_name[name]
+                merged = dict(vm, waves=previous["waves"] + [label])
+                if previous.get("top_n") or vm.get("top_n"):
+                    merged["top_n"] = max(previous.get("top_n") or 0, vm.get("top_n") or 0)
+                # Estatísticas de uma onda não valem para o conjunto
+                merged["stats"] = None
+            vars_by_name[name] = merged
+
+        for fm in w_filters:
+            name = fm["name"]
+            if name not in filters_by_name:
+                filter_order.append(name)
+                if fm.get("kind") == "range":
+                    filters_by_name[name] = dict(fm, order=[i + offset for i in fm["order"]])
+                else:
+                    filters_by_name[name] = dict(fm, values=list(fm["values"]))
+                continue
+            merged = filters_by_name[name]
+            if fm.get("kind") == "range":
+                # Intercala as duas listas ordenadas, deslocando as posições da nova onda
+                pairs = sorted(
+                    list(zip(merged["sorted_values"], merged["order"]))
+                    + [(v, i + offset) for v, i in zip(fm["sorted_values"], fm["order"])],
+                    key=lambda pair: pair[0]
+                )
+                merged["sorted_values"] = [v for v, _ in pairs]
+                merged["order"] = [i for _, i in pairs]
+                merged["min"], merged["max"] = pairs[0][0], pairs[-1][0]
+            else:
+                merged["values"] = safe_sorted_unique(merged["values"] + list(fm["values"]))
+
+        # Ordinais guardam o código: alinhados pelo rótulo antes de juntar os registros
+        coded = {vm["name"] for vm in w_vars
+                 if vm.get("measure") == "ordinal" and vm.get("var_type") not in ("string", "date", "multiple_response")}
+        recodes = {}
+        for name, mapping in w_codes.items():
+            merged_codes = code_to_label.setdefault(name, {})
+            recode = align_wave_codes(mapping, merged_codes, label_codes.setdefault(name, {}))
+            if name not in coded:
+                continue
+            if recode:
+                recodes[name] = recode
+                log.info(f"🌊 {name}: códigos de {label} recodificados pelo rótulo ({len(recode)})")
+            unlabeled = sorted({str(rec[name]) for rec in w_records
+                                if rec.get(name) is not None and str(rec[name]) not in mapping
+                                and str(rec[name]) in merged_codes})
+            if unlabeled:
+                log.warning(f"⚠️ {name}: código(s) {', '.join(unlabeled)} sem rótulo em {label}, "
+                            f"mas com rótulo em outra onda; mantidos como estão")
+
+        for rec in w_records:
+            for name, recode in recodes.items():
+                value = rec.get(name)
+                if value is not None:
+                    rec[name] = recode.get(str(value), value)
+            rec[WAVE_FILTER] = label
+            records.append(rec)
+
+        for name, order in w_orders.items():
+            known = value_orders.setdefault(name, [])
+            known.extend(v for v in order if v not in known)
+
+    filters_meta = [{"name": WAVE_FILTER, "title": "Onda", "values": labels}]
+    filters_meta += [filters_by_name[name] for name in filter_order]
+
+    vars_meta = [vars_by_name[name] for name in var_order]
+    partial = [vm["name"] for vm in vars_meta if len(vm["waves"]) < len(labels)]
+    if partial:
+        log.info(f"🌊 Variáveis ausentes em alguma onda: {', '.join(partial)}")
+    created_at = datetime.now().strftime("%d/%m/%Y %H:%M")
+    return created_at, vars_meta, filters_meta, records, value_orders, code_to_label
+
+def wave_segments(records: List[dict], waves: List[str]) -> List[dict]:
+    """
+    Registros de um dashboard multi‑ondas em segmentos colunares, um por onda:
+    {"label", "n", "columns": {variável: [valores]}}. Sem repetir o nome de cada
+    variável em cada registro, o payload fica bem menor; o dashboard remonta os
+    registros (com "__wave__") ao carregar.
+    """
+    # Uma passada: registros agrupados pela onda, nomes das colunas em dict (ordem de inserção)
+    rows_by_wave: Dict[str, List[dict]] = {label: [] for label in waves}
+    names_by_wave: Dict[str, Dict[str, None]] = {label: {} for label in waves}
+    for rec in records:
+        label = rec.get(WAVE_FILTER)
+        if label not in rows_by_wave:
+            continue
+        rows_by_wave[label].append(rec)
+        names_by_wave[label].update(dict.fromkeys(rec))
+    segments = []
+    for label in waves:
+        rows = rows_by_wave[label]
+        names = [k for k in names_by_wave[label] if k != WAVE_FILTER]
+        segments.append({"label": label, "n": len(rows), "columns": {k: [rec.get(k) for rec in rows] for k in names}})
+    return segments
+
 def render_html_with_working_filters(file_source: str, created_at: str, client_name: str,
                                     vars_meta: List[dict], filters_meta: List[dict], 
-                                    records: List[dict], value_orders: dict, code_to_label: dict) -> str:
+                                    records: List[dict], value_orders: dict, code_to_label: dict,
+                                    preview: Optional[dict] = None, runtime: bool = False,
+                                    waves: Optional[List[str]] = None,
+                                    shared_labels: Optional[Tuple[str, dict]] = None,
+                                    server: Optional[dict] = None) -> str:
+    """
+    Monta o HTML do dashboard. preview ({"sample": n, "total": N, "strata": [...]})
+    marca a página como prévia: título e faixa fixa no topo.
+    waves (rótulos, ver merge_waves) gera o dashboard multi‑ondas: registros em
+    segmentos colunares e seções com a tendência entre as ondas.
+    shared_labels ((arquivo, dicionário), ver shared_label_dictionary) faz a página
+    referenciar o dicionário de rótulos do projeto e embutir só o que difere dele.
+    server ({"total": N, "endpoint": ...}, ver serve_dashboard) gera a página do
+    modo servidor: sem registros embutidos, agregados pedidos à API local.
+    runtime=True gera a página sem dados (runtime único do Dashboard Master): ela
+    espera o master pedir uma análise e carrega o módulo de dados correspondente
+    (ver render_data_module).
+    """
+
+    # Faixa de prévia (amostra): nunca confundir com o dashboard final
+    page_title = "Dashboard SPSS Universal"
+    if runtime:
+        page_title += " — runtime"
+    preview_banner = ""
+    if preview:
+        page_title = "[PRÉVIA] " + page_title
+        strata_text = ", ".join(preview.get("strata") or []) or "nenhum (amostra simples)"
+        sample_text = f'{preview["sample"]:,}'.replace(",", ".")
+        total_text = f'{preview["total"]:,}'.replace(",", ".")
+        preview_banner = (
+            f'<div class="preview-banner">👁️ PRÉVIA: amostra estratificada de '
+            f'{sample_text} de {total_text} respondentes (estratos: {strata_text}). '
+            f'Percentuais aproximados; gere o dashboard completo para os resultados finais.</div>'
+        )
+
+    # Dicionário de rótulos compartilhado: a página embute só as diferenças
+    shared_labels_head = ""
+    shared_labels_js = ""
+    if shared_labels:
+        labels_file, shared = shared_labels
+        vars_meta, filters_meta, value_orders, code_to_label, stripped = strip_shared_labels(
+            shared, vars_meta, filters_meta, value_orders, code_to_label
+        )
+        shared_labels_head = f'<script src="{labels_file}"></script>'
+        shared_labels_js = (f"applySharedLabels({json.dumps(labels_file, ensure_ascii=False)}, "
+                            f"{json.dumps(stripped, ensure_ascii=False)});")
+
+    # Modo servidor: registros ficam no gerador; intervalos só com valores distintos
+    server_js = "null"
+    if server:
+        records = []
+        filters_meta = [compact_range_filter(fm) if fm.get("kind") == "range" else fm for fm in filters_meta]
+        server_js = json.dumps(server, ensure_ascii=False)
 
     # JSON strings seguros para JavaScript
+    PROFILER.begin("json", records=len(records))
     vars_meta_json = json.dumps(vars_meta, ensure_ascii=False)
     filters_meta_json = json.dumps(filters_meta, ensure_ascii=False)
-    records_json = json.dumps(records, ensure_ascii=False)
+    if waves:
+        records_json = f"expandWaveSegments({json.dumps(wave_segments(records, waves), ensure_ascii=False)})"
+    else:
+        records_json = json.dumps(records, ensure_ascii=False)
+    waves_json = json.dumps(waves or [], ensure_ascii=False)
     value_orders_js = json.dumps(value_orders, ensure_ascii=False)
     code_to_label_js = json.dumps(code_to_label, ensure_ascii=False)
+    file_source_js = json.dumps(file_source, ensure_ascii=False)
+    runtime_js = "true" if runtime else "false"
 
-    return f"""<!DOCTYPE html>
+    PROFILER.begin("render")
+    html = f"""<!DOCTYPE html>
 <html lang="pt-BR">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Dashboard SPSS Universal</title>
+    <title>{page_title}</title>
     <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
     <script src="https://cdn.jsdelivr.net/npm/xlsx@0.18.5/dist/xlsx.full.min.js"></script>
     <script src="https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js"></script>
     <script src="https://cdnjs.cloudflare.com/ajax/libs/jspdf/2.5.1/jspdf.umd.min.js"></script>
+    {shared_labels_head}
 
+    <script>
+    // Telemetria: início dos dados embutidos (o fim é marcado depois de RECORDS)
+    try {{ performance.mark('spss:payload-start'); }} catch (e) {{}}
+    </script>
     <script>
     // Ordem original das categorias vinda do SPSS
-    const VARS_VALUE_ORDER = {value_orders_js};
+    let VARS_VALUE_ORDER = {value_orders_js};
     // Mapeamento código -> label para exibição
-    const CODE_TO_LABEL = {code_to_label_js};
+    let CODE_TO_LABEL = {code_to_label_js};
     
     // Função para formatação brasileira (vírgula decimal)
     function formatBR(number, decimals = 2) {{
@@ -1573,6 +2237,61 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             padding-top: 140px; /* Aumentado de 100px para 140px */
         }}
 
+        .preview-banner {{
+            position: sticky;
+            top: 0;
+            z-index: 1100;
+            background: repeating-linear-gradient(45deg, #fff3cd, #fff3cd 12px, #ffe8a1 12px, #ffe8a1 24px);
+            color: #7a5a00;
+            border-bottom: 2px solid #e0a800;
+            padding: 8px 16px;
+            font-weight: 600;
+            font-size: 13px;
+            text-align: center;
+        }}
+
+        .content.server-loading {{
+            opacity: 0.5;
+            pointer-events: none;
+            transition: opacity 0.2s;
+        }}
+
+        .perf-panel {{
+            position: fixed;
+            right: 12px;
+            bottom: 12px;
+            z-index: 2000;
+            width: 320px;
+            max-height: 60vh;
+            overflow: auto;
+            background: rgba(17, 24, 39, 0.94);
+            color: #e5e7eb;
+            border-radius: 8px;
+            padding: 12px 14px;
+            font: 12px/1.5 ui-monospace, SFMono-Regular, Menlo, Consolas, monospace;
+            box-shadow: 0 8px 24px rgba(0, 0, 0, 0.3);
+        }}
+
+        .perf-panel h4 {{
+            margin: 0 0 6px;
+            font-size: 12px;
+            color: #93c5fd;
+        }}
+
+        .perf-panel table {{
+            width: 100%;
+            border-collapse: collapse;
+        }}
+
+        .perf-panel td {{
+            padding: 1px 0;
+            border: none;
+        }}
+
+        .perf-panel td:last-child {{
+            text-align: right;
+        }}
+
         .filters-container {{
             background: white;
             border-radius: 0;
@@ -1715,8 +2434,7 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             border: 1px solid var(--border);
             border-radius: var(--radius);
             box-shadow: 0 4px 12px rgba(0,0,0,0.1);
-            max-height: 200px;
-            overflow-y: auto;
+            overflow: hidden; /* a lista de opções (virtual) tem rolagem própria */
             z-index: 1000;
             display: none;
             margin-top: 2px;
@@ -1753,6 +2471,52 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
         .dropdown-option label {{
             cursor: pointer;
             flex: 1;
+            overflow: hidden;
+            text-overflow: ellipsis;
+            white-space: nowrap;
+        }}
+
+        .dropdown-search {{
+            width: calc(100% - 16px);
+            margin: 8px;
+            padding: 6px 8px;
+            border: 1px solid var(--border);
+            border-radius: 4px;
+            font-size: 12px;
+        }}
+
+        .dropdown-options {{
+            border: none;
+            border-radius: 0;
+            background: white;
+        }}
+
+        .dropdown-options .virtual-row.dropdown-option {{
+            display: flex;
+            padding: 8px 12px;
+            border-bottom: none;
+        }}
+
+        .range-inputs {{
+            display: flex;
+            gap: 6px;
+        }}
+
+        .range-inputs input {{
+            flex: 1;
+            min-width: 0;
+            font-size: 12px;
+        }}
+
+        .range-info {{
+            font-size: 11px;
+            color: #6c757d;
+        }}
+
+        .facet-count {{
+            color: #6c757d;
+            font-size: 11px;
+            font-variant-numeric: tabular-nums;
         }}
 
         .arrow {{
@@ -1779,6 +2543,11 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             border: 1px solid var(--border);
         }}
 
+        .section.section-highlight {{
+            box-shadow: 0 0 0 3px var(--primary), var(--shadow);
+            transition: box-shadow 0.3s ease;
+        }}
+
         .section-header {{
             background: #f8f9fa;
             padding: 16px 20px;
@@ -1851,6 +2620,105 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             transition: width 0.8s ease;
         }}
 
+        /* Lista virtual: só as linhas visíveis existem no DOM */
+        .virtual-list {{
+            position: relative;
+            overflow-y: auto;
+            border: 1px solid var(--border);
+            border-radius: var(--radius);
+            background: #f8f9fa;
+        }}
+
+        .virtual-spacer {{
+            position: relative;
+            width: 100%;
+        }}
+
+        .virtual-row {{
+            position: absolute;
+            left: 0;
+            right: 0;
+            padding: 12px 16px;
+            border-bottom: 1px solid var(--border);
+            background: white;
+            font-size: 13px;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }}
+
+        /* Respostas abertas: texto inteiro, a linha cresce (altura medida pela lista) */
+        .virtual-row.variable-height {{
+            white-space: normal;
+            overflow-wrap: anywhere;
+            text-overflow: clip;
+            line-height: 1.45;
+        }}
+
+        .virtual-row.current-match {{
+            background: #fff8e1;
+        }}
+
+        .virtual-row mark {{
+            background: #ffe082;
+            padding: 0 1px;
+            border-radius: 2px;
+        }}
+
+        .virtual-row.virtual-table-row {{
+            display: grid;
+            grid-template-columns: 1fr 110px 80px;
+            gap: 8px;
+            padding: 10px 8px;
+        }}
+
+        .virtual-table-row span {{
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }}
+
+        .bucket-row {{
+            cursor: pointer;
+            font-style: italic;
+            color: var(--primary-dark);
+        }}
+
+        .expand-categories-btn {{
+            margin: 10px 0;
+            padding: 6px 12px;
+            border: 1px solid var(--border);
+            border-radius: var(--radius);
+            background: white;
+            color: var(--primary-dark);
+            font-size: 12px;
+            cursor: pointer;
+        }}
+
+        .response-search {{
+            display: flex;
+            gap: 6px;
+            align-items: center;
+            margin-bottom: 8px;
+            font-size: 12px;
+        }}
+
+        .response-search input {{
+            flex: 1;
+            padding: 5px 8px;
+            border: 1px solid var(--border);
+            border-radius: 4px;
+            font-size: 12px;
+        }}
+
+        .response-search button {{
+            padding: 4px 8px;
+            border: 1px solid var(--border);
+            border-radius: 4px;
+            background: white;
+            cursor: pointer;
+            font-size: 12px;
+        }}
+
         /* Responsivo */
         @media (max-width: 768px) {{
             body {{
@@ -1890,6 +2758,7 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
     </style>
 </head>
 <body>
+    {preview_banner}
     <div class="filters-container">
         <div class="filters-header">
             <h2 class="filter-title">🔍 Filtros de Seleção</h2>
@@ -1909,13 +2778,237 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
         <!-- Conteúdo gerado dinamicamente -->
     </div>
 
+    <!-- Painel de desempenho: Ctrl+Shift+D ou #debug na URL -->
+    <div class="perf-panel" id="perfPanel" hidden></div>
+
     <script>
         // DADOS GLOBAIS - JSONs seguros
-        const VARS_META = {vars_meta_json};
-        const FILTERS_META = {filters_meta_json};
-        const RECORDS = {records_json};
-        const FILTERS = FILTERS_META;
+        // (let: no runtime único do master, loadDataset troca a análise sem recarregar)
+        let VARS_META = {vars_meta_json};
+        let FILTERS_META = {filters_meta_json};
+        let RECORDS = {records_json};
+        let FILTERS = FILTERS_META.filter(f => f.kind !== 'range');
+        let RANGE_FILTERS = FILTERS_META.filter(f => f.kind === 'range');
+        let WAVES = {waves_json};  // rótulos das ondas (dashboard multi‑ondas); vazio = pesquisa única
+        let ANALYSIS_SOURCE = {file_source_js};
+        let ANALYSIS_ID = null;
+        const RUNTIME_MODE = {runtime_js};
         const CHART_LABEL_MAX = {CHART_LABEL_MAX};
+        const HISTOGRAM_BINS = {HISTOGRAM_BINS};
+        // Modo servidor (--serve): RECORDS fica vazio e os agregados vêm da API local
+        // ({{ total, endpoint }}); null = dados embutidos
+        const SERVER_MODE = {server_js};
+        {shared_labels_js}
+
+        // Multi‑ondas: cada onda chega como segmento colunar {{ label, n, columns: {{ variável: [valores] }} }};
+        // os registros são remontados uma vez, com a onda em __wave__
+        function expandWaveSegments(segments) {{
+            const records = [];
+            segments.forEach(segment => {{
+                const names = Object.keys(segment.columns);
+                for (let i = 0; i < segment.n; i++) {{
+                    const record = {{ __wave__: segment.label }};
+                    names.forEach(name => {{ record[name] = segment.columns[name][i]; }});
+                    records.push(record);
+                }}
+            }});
+            return records;
+        }}
+
+        // Dicionário de rótulos do projeto (<projeto>.labels.<hash>.js, um arquivo para
+        // todas as ondas): completa títulos, valores dos filtros, ordem e rótulos que
+        // a página não repetiu. stripped lista as chaves de ordem e rótulos tiradas da
+        // página; as demais chaves do dicionário (variáveis de outras ondas) ficam de fora
+        function applySharedLabels(file, stripped) {{
+            let shared = (window.SPSS_LABELS || {{}})[file];
+            if (!shared) {{
+                console.error(`❌ Dicionário de rótulos não encontrado: ${{file}}`);
+                document.addEventListener('DOMContentLoaded', () => {{
+                    const banner = document.createElement('div');
+                    banner.className = 'preview-banner';
+                    banner.textContent = `⚠️ Dicionário de rótulos ${{file}} não encontrado: publique-o na mesma pasta do dashboard.`;
+                    document.body.insertBefore(banner, document.body.firstChild);
+                }});
+                shared = {{ titles: {{}}, filter_values: {{}}, value_orders: {{}}, code_to_label: {{}} }};
+            }}
+            const pick = (source, keys) => {{
+                if (!keys) return source;  // páginas antigas, sem a lista: dicionário inteiro
+                const out = {{}};
+                keys.forEach(k => {{ if (k in source) out[k] = source[k]; }});
+                return out;
+            }};
+            stripped = stripped || {{}};
+            VARS_VALUE_ORDER = Object.assign({{}}, pick(shared.value_orders, stripped.value_orders), VARS_VALUE_ORDER);
+            CODE_TO_LABEL = Object.assign({{}}, pick(shared.code_to_label, stripped.code_to_label), CODE_TO_LABEL);
+            VARS_META.forEach(v => {{
+                if (v.title === undefined) v.title = shared.titles[v.name] || v.name;
+            }});
+            FILTERS_META.forEach(f => {{
+                if (f.title === undefined) f.title = shared.titles[f.name] || f.name;
+                if (f.kind !== 'range' && f.values === undefined) f.values = shared.filter_values[f.name] || [];
+            }});
+        }}
+
+        // TELEMETRIA DE DESEMPENHO
+        // Cada fase vira performance.mark/measure "spss:*" (aparece na aba Performance do
+        // navegador): dados embutidos, primeira pintura, cada renderAll e cada variável.
+        // O resumo fica no painel oculto e é enviado ao master via postMessage.
+        const PERF_RENDER_HISTORY = 50;
+        const PERF = {{
+            origin: 0,        // início da análise: carga da página ou, no runtime, o pedido do master
+            payloadMs: null,
+            firstPaintMs: null,
+            renders: [],      // {{ ms, paint_ms, records, cached, reason }}
+            variables: {{}},    // nome -> ms da última renderização
+            panelOpen: false
+        }};
+
+        function perfMark(name) {{
+            try {{ performance.mark('spss:' + name); }} catch (e) {{}}
+        }}
+
+        function perfMeasure(name, startMark, endMark) {{
+            try {{ performance.measure('spss:' + name, 'spss:' + startMark, 'spss:' + endMark); }} catch (e) {{}}
+        }}
+
+        perfMark('payload-end');
+        perfMeasure('payload', 'payload-start', 'payload-end');
+        try {{
+            const start = performance.getEntriesByName('spss:payload-start')[0];
+            if (start) PERF.payloadMs = performance.now() - start.startTime;
+        }} catch (e) {{}}
+
+        // Depois do próximo quadro pintado (rAF + tarefa seguinte)
+        function perfAfterPaint(callback) {{
+            if (typeof requestAnimationFrame !== 'function') {{
+                setTimeout(callback, 0);
+                return;
+            }}
+            requestAnimationFrame(() => setTimeout(callback, 0));
+        }}
+
+        function perfQuantile(sorted, q) {{
+            if (!sorted.length) return null;
+            return sorted[Math.min(sorted.length - 1, Math.floor(q * sorted.length))];
+        }}
+
+        function perfRound(ms) {{
+            return ms === null || ms === undefined ? null : Math.round(ms * 10) / 10;
+        }}
+
+        function perfPageName() {{
+            if (ANALYSIS_ID) return ANALYSIS_ID;
+            const file = (location.pathname || '').split('/').pop();
+            try {{ return decodeURIComponent(file) || document.title; }} catch (e) {{ return file || document.title; }}
+        }}
+
+        function perfSummary() {{
+            const initial = PERF.renders.find(r => r.reason === 'inicial');
+            const filterRenders = PERF.renders.filter(r => r.reason !== 'inicial');
+            const latencies = filterRenders.map(r => r.paint_ms !== null ? r.paint_ms : r.ms).sort((a, b) => a - b);
+            const last = filterRenders[filterRenders.length - 1];
+            return {{
+                page: perfPageName(),
+                records: totalRespondents(),
+                variables: VARS_META.length,
+                payload_ms: perfRound(PERF.payloadMs),
+                first_paint_ms: perfRound(PERF.firstPaintMs),
+                initial_render_ms: initial ? perfRound(initial.ms) : null,
+                renders: PERF.renders.length,
+                filter_last_ms: last ? perfRound(last.paint_ms !== null ? last.paint_ms : last.ms) : null,
+                filter_median_ms: perfRound(perfQuantile(latencies, 0.5)),
+                filter_p95_ms: perfRound(perfQuantile(latencies, 0.95)),
+                cache_hits: RESULT_CACHE_STATS.hits,
+                cache_misses: RESULT_CACHE_STATS.misses,
+                slowest_variables: Object.entries(PERF.variables)
+                    .sort((a, b) => b[1] - a[1])
+                    .slice(0, 5)
+                    .map(([name, ms]) => ({{ name: name, ms: perfRound(ms) }}))
+            }};
+        }}
+
+        // Mesmo canal do master (dashboard_manager): source 'spss-analysis-overlay'
+        function perfPost(type, data) {{
+            if (window.parent === window) return;
+            try {{
+                window.parent.postMessage({{ source: 'spss-analysis-overlay', type: type, data: data }}, '*');
+            }} catch (e) {{}}
+        }}
+
+        // Chamado ao fim de cada renderAll
+        function perfRecordRender(startedAt, records, cached) {{
+            perfMark('renderAll:end');
+            perfMeasure('renderAll', 'renderAll:start', 'renderAll:end');
+            const render = {{
+                ms: performance.now() - startedAt,
+                paint_ms: null,
+                records: records,
+                cached: cached,
+                reason: PERF.renders.length ? 'filtro' : 'inicial'
+            }};
+            PERF.renders.push(render);
+            if (PERF.renders.length > PERF_RENDER_HISTORY) PERF.renders.shift();
+
+            const analysis = ANALYSIS_ID;
+            perfAfterPaint(() => {{
+                if (analysis !== ANALYSIS_ID) return;  // runtime: outra análise já foi carregada
+                render.paint_ms = performance.now() - startedAt;
+                const summary = perfSummary();
+                if (render.reason === 'inicial') {{
+                    perfMark('first-paint');
+                    PERF.firstPaintMs = performance.now() - PERF.origin;
+                    summary.first_paint_ms = perfRound(PERF.firstPaintMs);
+                    perfPost('analysis-loaded', {{
+                        variables: VARS_META.length,
+                        filters: FILTERS.length + RANGE_FILTERS.length,
+                        records: totalRespondents(),
+                        page: summary.page,
+                        timings: summary
+                    }});
+                }} else {{
+                    perfPost('performance', {{
+                        page: summary.page,
+                        render_ms: perfRound(render.ms),
+                        paint_ms: perfRound(render.paint_ms),
+                        records: records,
+                        cached: cached,
+                        timings: summary
+                    }});
+                }}
+                if (PERF.panelOpen) updatePerfPanel();
+            }});
+        }}
+
+        function updatePerfPanel() {{
+            const panel = document.getElementById('perfPanel');
+            if (!panel) return;
+            const s = perfSummary();
+            const fmt = ms => ms === null ? '–' : formatBR(ms, 1) + ' ms';
+            const rows = [
+                ['Dados embutidos', fmt(s.payload_ms)],
+                ['Primeira pintura', fmt(s.first_paint_ms)],
+                ['Render inicial', fmt(s.initial_render_ms)],
+                ['Filtro (último)', fmt(s.filter_last_ms)],
+                ['Filtro (mediana)', fmt(s.filter_median_ms)],
+                ['Filtro (p95)', fmt(s.filter_p95_ms)],
+                ['Renderizações', String(s.renders)],
+                ['Cache (acertos/falhas)', s.cache_hits + ' / ' + s.cache_misses]
+            ];
+            let html = '<h4>⏱️ Desempenho — ' + escapeHtml(s.page) + '</h4><table>';
+            rows.forEach(([k, v]) => {{ html += '<tr><td>' + k + '</td><td>' + v + '</td></tr>'; }});
+            html += '</table><h4 style="margin-top:8px">Variáveis mais lentas</h4><table>';
+            s.slowest_variables.forEach(v => {{ html += '<tr><td>' + escapeHtml(v.name) + '</td><td>' + fmt(v.ms) + '</td></tr>'; }});
+            html += '</table>';
+            panel.innerHTML = html;
+        }}
+
+        function togglePerfPanel(force) {{
+            const panel = document.getElementById('perfPanel');
+            if (!panel) return;
+            PERF.panelOpen = force === undefined ? !PERF.panelOpen : !!force;
+            panel.hidden = !PERF.panelOpen;
+            if (PERF.panelOpen) updatePerfPanel();
+        }}
     // Função para quebrar rótulos longos em múltiplas linhas
     function wrapLabel(label, maxLen) {{
         if (label === null || label === undefined) return [''];
@@ -1944,27 +3037,640 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
         return lines;
     }}
 
+        // Escapa texto livre antes de montar HTML
+        function escapeHtml(text) {{
+            return String(text)
+                .replace(/&/g, '&amp;')
+                .replace(/</g, '&lt;')
+                .replace(/>/g, '&gt;')
+                .replace(/"/g, '&quot;');
+        }}
+
+        // Remove acentos caractere a caractere, preservando o comprimento do texto
+        // (as posições encontradas no texto dobrado valem para o texto original).
+        function foldForSearch(text) {{
+            const src = String(text || '');
+            let out = '';
+            for (let i = 0; i < src.length; i++) {{
+                const ch = src[i];
+                const folded = ch.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+                out += folded.length === 1 ? folded : ch.toLowerCase();
+            }}
+            return out;
+        }}
+
+        // Monta HTML com as ocorrências do termo (já dobrado) marcadas com <mark>
+        function highlightMatches(text, foldedText, foldedTerm) {{
+            if (!foldedTerm) return escapeHtml(text);
+            let html = '';
+            let last = 0;
+            let pos = foldedText.indexOf(foldedTerm);
+            while (pos !== -1) {{
+                html += escapeHtml(text.slice(last, pos)) +
+                    '<mark>' + escapeHtml(text.slice(pos, pos + foldedTerm.length)) + '</mark>';
+                last = pos + foldedTerm.length;
+                pos = foldedText.indexOf(foldedTerm, last);
+            }}
+            return html + escapeHtml(text.slice(last));
+        }}
+
+        // LISTA VIRTUAL
+        // Renderiza apenas as linhas da janela visível (+ overscan) reaproveitando
+        // um conjunto de elementos: o DOM não cresce com o número de itens.
+        // Com variableHeight, cada linha tem a altura do próprio conteúdo (respostas
+        // abertas longas quebram em várias linhas): a altura é medida ao renderizar,
+        // as posições são somas acumuladas e a primeira linha visível sai de uma busca
+        // binária. Linhas ainda não medidas valem rowHeight (estimativa).
+        const VIRTUAL_ROW_HEIGHT = 44;
+        const VIRTUAL_OVERSCAN = 6;
+
+        function createVirtualList(options) {{
+            const rowHeight = options.rowHeight || VIRTUAL_ROW_HEIGHT;
+            const height = options.height || 400;
+            const overscan = options.overscan !== undefined ? options.overscan : VIRTUAL_OVERSCAN;
+            const renderRow = options.renderRow;
+            const variableHeight = !!options.variableHeight;
+
+            const viewport = document.createElement('div');
+            viewport.className = 'virtual-list';
+            viewport.style.height = height + 'px';
+
+            const spacer = document.createElement('div');
+            spacer.className = 'virtual-spacer';
+            viewport.appendChild(spacer);
+
+            const poolSize = Math.ceil(height / rowHeight) + overscan * 2;
+            const pool = [];
+            let items = [];
+            let highlightIndex = -1;
+            let scheduled = false;
+            // Altura variável: heights[i] medida (ou estimada) e offsets[i] = topo da linha i
+            let heights = [];
+            let offsets = [0];
+            let dirtyFrom = 0;      // offsets válidos até este índice
+            let measuredWidth = 0;  // mudou a largura → as medidas anteriores não valem
+
+            function resetHeights() {{
+                heights = new Array(items.length).fill(rowHeight);
+                offsets = new Array(items.length + 1);
+                offsets[0] = 0;
+                dirtyFrom = 0;
+            }}
+
+            function updateOffsets() {{
+                for (let i = dirtyFrom; i < items.length; i++) offsets[i + 1] = offsets[i] + heights[i];
+                dirtyFrom = items.length;
+            }}
+
+            function rowTop(index) {{
+                return variableHeight ? offsets[index] : index * rowHeight;
+            }}
+
+            function totalHeight() {{
+                return variableHeight ? offsets[items.length] : items.length * rowHeight;
+            }}
+
+            // Maior índice com topo <= y (busca binária nos offsets)
+            function indexAt(y) {{
+                if (!variableHeight) return Math.floor(y / rowHeight);
+                let lo = 0, hi = items.length - 1;
+                while (lo < hi) {{
+                    const mid = (lo + hi + 1) >> 1;
+                    if (offsets[mid] <= y) lo = mid;
+                    else hi = mid - 1;
+                }}
+                return Math.max(0, lo);
+            }}
+
+            function createRow() {{
+                const row = document.createElement('div');
+                row.className = variableHeight ? 'virtual-row variable-height' : 'virtual-row';
+                if (!variableHeight) row.style.height = rowHeight + 'px';
+                spacer.appendChild(row);
+                pool.push(row);
+                return row;
+            }}
+
+            function ensurePool(count) {{
+                while (pool.length < Math.min(count, poolSize)) createRow();
+            }}
+
+            function update() {{
+                scheduled = false;
+                if (!variableHeight) {{
+                    const first = Math.max(0, Math.floor(viewport.scrollTop / rowHeight) - overscan);
+                    const last = Math.min(items.length, first + poolSize);
+                    ensurePool(items.length);
+                    for (let p = 0; p < pool.length; p++) {{
+                        const row = pool[p];
+                        const index = first + p;
+                        if (index < last) {{
+                            row.style.display = '';
+                            row.style.top = (index * rowHeight) + 'px';
+                            row.classList.toggle('current-match', index === highlightIndex);
+                            renderRow(row, items[index], index);
+                        }} else {{
+                            row.style.display = 'none';
+                        }}
+                    }}
+                    return;
+                }}
+
+                if (viewport.clientWidth && viewport.clientWidth !== measuredWidth) {{
+                    measuredWidth = viewport.clientWidth;
+                    resetHeights();
+                }}
+                updateOffsets();
+                const anchor = items.length ? indexAt(viewport.scrollTop) : 0;
+                const anchorTop = offsets[anchor];
+                const first = Math.max(0, anchor - overscan);
+
+                // Renderiza até passar do fim da janela (+ overscan linhas), medindo cada linha
+                const bottom = viewport.scrollTop + height;
+                const rendered = [];
+                let changed = false;
+                let after = 0;
+                for (let index = first; index < items.length && after <= overscan; index++) {{
+                    const row = pool[rendered.length] || createRow();
+                    row.style.display = '';
+                    row.style.top = offsets[index] + 'px';
+                    row.classList.toggle('current-match', index === highlightIndex);
+                    renderRow(row, items[index], index);
+                    rendered.push(row);
+                    const measured = row.offsetHeight;
+                    if (measured > 0 && measured !== heights[index]) {{
+                        heights[index] = measured;
+                        changed = true;
+                    }}
+                    // Só o topo da próxima linha agora; o resto dos offsets depois do laço
+                    offsets[index + 1] = offsets[index] + heights[index];
+                    if (offsets[index + 1] >= bottom) after++;
+                }}
+                for (let p = rendered.length; p < pool.length; p++) pool[p].style.display = 'none';
+
+                if (changed) {{
+                    dirtyFrom = first + rendered.length;
+                    updateOffsets();
+                    spacer.style.height = totalHeight() + 'px';
+                    // Mantém a linha do topo no lugar quando as de cima mudaram de altura
+                    const shift = offsets[anchor] - anchorTop;
+                    if (shift) {{
+                        viewport.scrollTop += shift;
+                        schedule();  // a janela andou: completa as linhas do novo fim
+                    }}
+                }}
+            }}
+
+            function schedule() {{
+                if (scheduled) return;
+                scheduled = true;
+                requestAnimationFrame(update);
+            }}
+
+            viewport.addEventListener('scroll', schedule);
+
+            return {{
+                element: viewport,
+                setItems(newItems) {{
+                    items = newItems;
+                    highlightIndex = -1;
+                    if (variableHeight) {{
+                        resetHeights();
+                        updateOffsets();
+                    }}
+                    spacer.style.height = totalHeight() + 'px';
+                    viewport.scrollTop = 0;
+                    update();
+                }},
+                scrollToIndex(index) {{
+                    highlightIndex = index;
+                    const top = rowTop(index);
+                    const rowBottom = variableHeight ? offsets[index + 1] : top + rowHeight;
+                    if (top < viewport.scrollTop || rowBottom > viewport.scrollTop + height) {{
+                        viewport.scrollTop = Math.max(0, top - Math.floor(height / 2));
+                    }}
+                    update();
+                }},
+                refresh: update,
+                size: () => items.length
+            }};
+        }}
+
 
         // Estados globais
         let charts = {{}};
 
         // INICIALIZAÇÃO
         document.addEventListener('DOMContentLoaded', function() {{
+            if (RUNTIME_MODE) {{
+                document.getElementById('content').innerHTML =
+                    '<p style="color: #999; font-style: italic; text-align: center;">Selecione uma análise no menu</p>';
+                if (window.parent !== window) {{
+                    window.parent.postMessage({{ source: 'spss-analysis-overlay', type: 'runtime-ready', data: {{}} }}, '*');
+                }}
+                return;
+            }}
             console.log('🌍 Dashboard SPSS Universal carregado');
-            console.log('📊 ' + VARS_META.length + ' variáveis, ' + FILTERS.length + ' filtros, ' + RECORDS.length + ' registros');
+            console.log('📊 ' + VARS_META.length + ' variáveis, ' + FILTERS.length + ' filtros, ' + totalRespondents() + ' registros');
             
             buildFilters();
             renderAll();
+            if (/[#?&]debug\b/.test(location.hash + location.search)) togglePerfPanel(true);
+        }});
+
+        // TROCA DE ANÁLISE (runtime único do master)
+        // Os módulos de dados (<análise>.data.js) registram-se em window.SPSS_ANALYSES.
+        // Trocar de análise substitui os dados e zera índices, seleções, cache de
+        // resultados, telemetria e gráficos — sem recarregar o documento nem as bibliotecas.
+        const RUNTIME_DATASETS_MAX = 4;
+        const runtimeLoaded = [];  // ids em ordem de uso (o primeiro é o menos recente)
+
+        function loadDataset(id, ds) {{
+            if (window.Chart && Chart.instances) {{
+                Object.values(Chart.instances).forEach(chart => chart.destroy());
+            }}
+            VARS_VALUE_ORDER = ds.value_orders || {{}};
+            CODE_TO_LABEL = ds.code_to_label || {{}};
+            VARS_META = ds.vars_meta || [];
+            FILTERS_META = ds.filters_meta || [];
+            RECORDS = ds.records || [];
+            FILTERS = FILTERS_META.filter(f => f.kind !== 'range');
+            RANGE_FILTERS = FILTERS_META.filter(f => f.kind === 'range');
+            WAVES = ds.waves || [];
+            ANALYSIS_SOURCE = ds.file_source || id;
+            ANALYSIS_ID = id;
+            [FILTER_SELECTION, FILTER_INDEX, RANGE_INDEX].forEach(o => Object.keys(o).forEach(k => delete o[k]));
+            facetCountsCache = null;
+            currentResults = null;
+            RESULT_CACHE.clear();
+            RESULT_CACHE_STATS.hits = 0;
+            RESULT_CACHE_STATS.misses = 0;
+            PERF.firstPaintMs = null;
+            PERF.renders = [];
+            PERF.variables = {{}};
+            document.title = (ds.title || id) + ' — Dashboard SPSS Universal';
+            console.log('🔀 Análise ' + id + ': ' + VARS_META.length + ' variáveis, ' + RECORDS.length + ' registros');
+            buildFilters();
+            renderAll();
+        }}
+
+        function loadAnalysisModule(id, src) {{
+            const registry = window.SPSS_ANALYSES = window.SPSS_ANALYSES || {{}};
+            const startedAt = performance.now();
+            const ready = () => {{
+                const index = runtimeLoaded.indexOf(id);
+                if (index >= 0) runtimeLoaded.splice(index, 1);
+                runtimeLoaded.push(id);
+                // Mantém só os módulos usados mais recentemente na memória
+                while (runtimeLoaded.length > RUNTIME_DATASETS_MAX) {{
+                    const old = runtimeLoaded.shift();
+                    delete registry[old];
+                    document.querySelectorAll('script[data-analysis="' + old + '"]').forEach(el => el.remove());
+                }}
+                PERF.origin = startedAt;
+                PERF.payloadMs = performance.now() - startedAt;
+                loadDataset(id, registry[id]);
+            }};
+            if (registry[id]) {{
+                ready();
+                return;
+            }}
+            const script = document.createElement('script');
+            script.src = src;
+            script.dataset.analysis = id;
+            script.onload = () => {{
+                if (registry[id]) ready();
+                else console.error('❌ ' + src + ' não registrou a análise ' + id);
+            }};
+            script.onerror = () => {{
+                script.remove();
+                perfPost('analysis-error', {{ page: id, module: src }});
+                document.getElementById('content').innerHTML =
+                    '<p style="color: #ef4444; text-align: center;">❌ Módulo de dados não encontrado: ' + escapeHtml(src) + '</p>';
+            }};
+            document.head.appendChild(script);
+        }}
+
+        // Leva à seção de uma variável (busca de perguntas do master)
+        function showVariable(name) {{
+            const section = Array.from(document.getElementById('content').children).find(el => el.dataset && el.dataset.var === name);
+            if (!section) return false;
+            section.scrollIntoView({{ behavior: 'smooth', block: 'start' }});
+            section.classList.add('section-highlight');
+            setTimeout(() => section.classList.remove('section-highlight'), 2000);
+            return true;
+        }}
+
+        // Pedidos do master: {{ source: 'dashboard-master', type: 'load-analysis' | 'show-variable', data }}
+        window.addEventListener('message', (event) => {{
+            const msg = event.data;
+            if (!msg || msg.source !== 'dashboard-master' || !msg.data) return;
+            if (msg.type === 'show-variable') showVariable(msg.data.name);
+            else if (RUNTIME_MODE && msg.type === 'load-analysis') loadAnalysisModule(msg.data.id, msg.data.module);
         }});
 
         // FILTROS - USANDO f em vez de filter para evitar conflitos
+        // A seleção fica em memória (FILTER_SELECTION) e não em checkboxes, para que a
+        // lista de opções possa ser virtualizada. FILTER_INDEX guarda, por filtro, o código
+        // de cada registro, um índice ordenado de tokens para a busca por prefixo e o
+        // vetor "passa/não passa" usado para filtrar e contar facetas sem varrer RECORDS
+        // uma vez por opção.
+        const FILTER_SELECTION = {{}};
+        const FILTER_INDEX = {{}};
+        let FILTER_FAIL_COUNT = new Uint8Array(0);   // nº de filtros que cada registro não satisfaz
+        let facetCountsCache = null;
+        const FILTER_ROW_HEIGHT = 34;
+
+        function buildFilterIndex() {{
+            FILTER_FAIL_COUNT = new Uint8Array(RECORDS.length);
+            FILTERS.forEach(f => {{
+                const valueIds = new Map();
+                f.values.forEach((value, id) => valueIds.set(String(value).trim(), id));
+
+                const codes = new Int32Array(RECORDS.length);
+                for (let i = 0; i < RECORDS.length; i++) {{
+                    const v = RECORDS[i][f.name];
+                    const id = (v === null || v === undefined) ? undefined : valueIds.get(String(v).trim());
+                    codes[i] = id === undefined ? -1 : id;
+                }}
+
+                // Índice de tokens sem acento, ordenado, para busca por prefixo (busca binária)
+                const tokens = [];
+                f.values.forEach((value, id) => {{
+                    foldForSearch(value).split(/[^0-9a-z]+/).forEach(token => {{
+                        if (token) tokens.push([token, id]);
+                    }});
+                }});
+                tokens.sort((a, b) => a[0] < b[0] ? -1 : (a[0] > b[0] ? 1 : a[1] - b[1]));
+
+                FILTER_INDEX[f.name] = {{
+                    codes: codes,
+                    tokens: tokens,
+                    selectedMask: new Uint8Array(f.values.length),
+                    pass: new Uint8Array(RECORDS.length).fill(1)
+                }};
+                FILTER_SELECTION[f.name] = new Set();
+            }});
+        }}
+
+        // Atualiza incrementalmente o vetor "passa" de UM filtro e o contador de falhas
+        function setFilterSelection(filterName, values) {{
+            const f = FILTERS.find(x => x.name === filterName);
+            const idx = FILTER_INDEX[filterName];
+            if (!f || !idx) return;
+            const selection = new Set(values);
+            FILTER_SELECTION[filterName] = selection;
+            idx.selectedMask.fill(0);
+            f.values.forEach((value, id) => {{
+                if (selection.has(value)) idx.selectedMask[id] = 1;
+            }});
+            const all = selection.size === 0;
+            const {{ codes, pass, selectedMask }} = idx;
+            for (let i = 0; i < codes.length; i++) {{
+                const now = (all || (codes[i] >= 0 && selectedMask[codes[i]] === 1)) ? 1 : 0;
+                if (now !== pass[i]) {{
+                    FILTER_FAIL_COUNT[i] += now ? -1 : 1;
+                    pass[i] = now;
+                }}
+            }}
+            facetCountsCache = null;
+        }}
+
+        // FILTROS DE INTERVALO (datas / escalas)
+        // Cada filtro traz os valores válidos ordenados e a permutação dos registros;
+        // o intervalo escolhido vira uma fatia [a, b) dessa permutação via busca binária.
+        const RANGE_INDEX = {{}};
+
+        function lowerBound(values, target) {{
+            let lo = 0, hi = values.length;
+            while (lo < hi) {{
+                const mid = (lo + hi) >> 1;
+                if (values[mid] < target) lo = mid + 1; else hi = mid;
+            }}
+            return lo;
+        }}
+
+        function upperBound(values, target) {{
+            let lo = 0, hi = values.length;
+            while (lo < hi) {{
+                const mid = (lo + hi) >> 1;
+                if (values[mid] <= target) lo = mid + 1; else hi = mid;
+            }}
+            return lo;
+        }}
+
+        function setPass(pass, i, now) {{
+            if (now !== pass[i]) {{
+                FILTER_FAIL_COUNT[i] += now ? -1 : 1;
+                pass[i] = now;
+            }}
+        }}
+
+        function buildRangeIndex() {{
+            RANGE_FILTERS.forEach(rf => {{
+                RANGE_INDEX[rf.name] = {{
+                    pass: new Uint8Array(RECORDS.length).fill(1),
+                    active: false,
+                    a: 0,
+                    b: rf.sorted_values.length,
+                    from: null,
+                    to: null
+                }};
+            }});
+        }}
+
+        // from/to: número ou 'YYYY-MM-DD'; null = sem limite naquele lado
+        function setRangeSelection(filterName, from, to) {{
+            const rf = RANGE_FILTERS.find(x => x.name === filterName);
+            const idx = RANGE_INDEX[filterName];
+            if (!rf || !idx) return 0;
+            const values = rf.sorted_values;
+            const active = (from !== null && from > rf.min) || (to !== null && to < rf.max);
+            const a = active && from !== null ? lowerBound(values, from) : 0;
+            const b = active && to !== null ? upperBound(values, to) : values.length;
+
+            if (SERVER_MODE) {{
+                // Sem registros na página: o intervalo só entra na consulta à API
+            }} else if (active !== idx.active) {{
+                // Ativar/desativar muda também os registros sem valor: recalcula o vetor todo
+                const next = new Uint8Array(RECORDS.length);
+                if (!active) next.fill(1);
+                else for (let p = a; p < b; p++) next[rf.order[p]] = 1;
+                for (let i = 0; i < next.length; i++) setPass(idx.pass, i, next[i]);
+            }} else if (active) {{
+                // Só as posições que saíram ou entraram na fatia mudam
+                for (let p = idx.a; p < idx.b; p++) {{
+                    if (p < a || p >= b) setPass(idx.pass, rf.order[p], 0);
+                }}
+                for (let p = a; p < b; p++) {{
+                    if (p < idx.a || p >= idx.b) setPass(idx.pass, rf.order[p], 1);
+                }}
+            }}
+            Object.assign(idx, {{ active: active, a: a, b: b, from: active ? from : null, to: active ? to : null }});
+            facetCountsCache = null;
+            // Modo servidor: valores distintos + acumulados (cumulative[k] = nº de valores antes do k‑ésimo)
+            return rf.cumulative ? rf.cumulative[b] - rf.cumulative[a] : b - a;
+        }}
+
+        function getSelectedRanges() {{
+            const ranges = {{}};
+            RANGE_FILTERS.forEach(rf => {{
+                const idx = RANGE_INDEX[rf.name];
+                if (idx && idx.active) ranges[rf.name] = [idx.from, idx.to];
+            }});
+            return ranges;
+        }}
+
+        function formatRangeValue(rf, value) {{
+            if (value === null || value === undefined) return '';
+            if (rf.value_type === 'date') return String(value).split('-').reverse().join('/');
+            return Number.isInteger(value) ? String(value) : formatBR(value, 2);
+        }}
+
+        function buildRangeFilter(container, rf) {{
+            const filterGroup = document.createElement('div');
+            filterGroup.className = 'filter-group range-filter';
+
+            const label = document.createElement('label');
+            label.className = 'filter-label';
+            label.textContent = rf.title;
+            filterGroup.appendChild(label);
+
+            const inputs = document.createElement('div');
+            inputs.className = 'range-inputs';
+            const fromInput = document.createElement('input');
+            const toInput = document.createElement('input');
+            const info = document.createElement('div');
+            info.className = 'range-info';
+
+            if (rf.value_type === 'date') {{
+                [fromInput, toInput].forEach(input => {{
+                    input.type = 'date';
+                    input.min = rf.min;
+                    input.max = rf.max;
+                }});
+                fromInput.value = rf.min;
+                toInput.value = rf.max;
+            }} else {{
+                const integral = rf.sorted_values.every(Number.isInteger);
+                const step = integral ? 1 : ((rf.max - rf.min) / 100 || 1);
+                [fromInput, toInput].forEach(input => {{
+                    input.type = 'range';
+                    input.min = rf.min;
+                    input.max = rf.max;
+                    input.step = step;
+                }});
+                fromInput.value = rf.min;
+                toInput.value = rf.max;
+            }}
+
+            function readValue(input) {{
+                if (input.value === '' || input.value === undefined) return null;
+                return rf.value_type === 'date' ? input.value : Number(input.value);
+            }}
+
+            function onChange(changed) {{
+                let from = readValue(fromInput);
+                let to = readValue(toInput);
+                if (from !== null && to !== null && from > to) {{
+                    // não deixa o intervalo se inverter
+                    if (changed === fromInput) {{ to = from; toInput.value = from; }}
+                    else {{ from = to; fromInput.value = to; }}
+                }}
+                const selected = setRangeSelection(rf.name, from, to);
+                info.textContent = formatRangeValue(rf, from === null ? rf.min : from) + ' – ' +
+                    formatRangeValue(rf, to === null ? rf.max : to) + ' • ' +
+                    formatNumberBR(selected) + ' respondentes';
+                refreshOpenDropdown();
+            }}
+
+            fromInput.addEventListener('input', () => onChange(fromInput));
+            toInput.addEventListener('input', () => onChange(toInput));
+            fromInput.addEventListener('change', () => onChange(fromInput));
+            toInput.addEventListener('change', () => onChange(toInput));
+
+            filterGroup.resetRange = () => {{
+                fromInput.value = rf.min;
+                toInput.value = rf.max;
+                onChange(null);
+            }};
+
+            inputs.appendChild(fromInput);
+            inputs.appendChild(toInput);
+            filterGroup.appendChild(inputs);
+            filterGroup.appendChild(info);
+            container.appendChild(filterGroup);
+            onChange(null);
+        }}
+
+        function toggleFilterValue(filterName, value) {{
+            const selection = new Set(FILTER_SELECTION[filterName]);
+            if (selection.has(value)) selection.delete(value); else selection.add(value);
+            setFilterSelection(filterName, selection);
+            updateDropdownText(filterName);
+        }}
+
+        // Contagem ponderada de cada opção sob os DEMAIS filtros ativos.
+        // Uma única passada: registros que passam em tudo contam para todos os filtros;
+        // registros que falham em exatamente um filtro contam só para aquele filtro.
+        function computeFacetCounts() {{
+            if (SERVER_MODE) {{
+                // Contagens da última resposta da API (estado aplicado por último)
+                if (SERVER_FACETS) return SERVER_FACETS;
+                const empty = {{}};
+                FILTERS.forEach(f => empty[f.name] = new Float64Array(f.values.length));
+                return empty;
+            }}
+            if (facetCountsCache) return facetCountsCache;
+            const counts = {{}};
+            const names = FILTERS.map(f => f.name);
+            names.forEach((name, k) => counts[name] = new Float64Array(FILTERS[k].values.length));
+            for (let i = 0; i < RECORDS.length; i++) {{
+                const fails = FILTER_FAIL_COUNT[i];
+                if (fails > 1) continue;
+                const w = RECORDS[i].__weight__ || 1.0;
+                for (let k = 0; k < names.length; k++) {{
+                    const idx = FILTER_INDEX[names[k]];
+                    if (fails === 1 && idx.pass[i] === 1) continue;
+                    const code = idx.codes[i];
+                    if (code >= 0) counts[names[k]][code] += w;
+                }}
+            }}
+            facetCountsCache = counts;
+            return counts;
+        }}
+
+        // Busca por prefixo de token: cada palavra digitada deve iniciar algum token do valor
+        function searchFilterValues(filterName, query) {{
+            const f = FILTERS.find(x => x.name === filterName);
+            const terms = foldForSearch(query).split(/[^0-9a-z]+/).filter(Boolean);
+            if (terms.length === 0) return f.values.map((_, id) => id);
+            const tokens = FILTER_INDEX[filterName].tokens;
+            let result = null;
+            terms.forEach(term => {{
+                let lo = 0, hi = tokens.length;
+                while (lo < hi) {{
+                    const mid = (lo + hi) >> 1;
+                    if (tokens[mid][0] < term) lo = mid + 1; else hi = mid;
+                }}
+                const found = new Set();
+                for (let i = lo; i < tokens.length && tokens[i][0].startsWith(term); i++) {{
+                    found.add(tokens[i][1]);
+                }}
+                result = result === null ? found : new Set([...result].filter(id => found.has(id)));
+            }});
+            return Array.from(result).sort((a, b) => a - b);
+        }}
+
         function buildFilters() {{
             const container = document.getElementById('filtersGrid');
             if (!container) return;
             
             container.innerHTML = '';
+            buildFilterIndex();
+            buildRangeIndex();
             
-            if (FILTERS.length === 0) {{
+            if (FILTERS.length === 0 && RANGE_FILTERS.length === 0) {{
                 container.innerHTML = '<p style="color: #999; font-style: italic;">Nenhum filtro disponível</p>';
                 return;
             }}
@@ -1984,29 +3690,97 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                 const dropdownButton = document.createElement('div');
                 dropdownButton.className = 'dropdown-button';
                 dropdownButton.onclick = () => toggleDropdown(f.name);
-                dropdownButton.innerHTML = '<span id="' + f.name + 'Text">Todos</span><span class="arrow">▼</span>';
+                const buttonText = document.createElement('span');
+                buttonText.id = f.name + 'Text';
+                buttonText.textContent = 'Todos';
+                const arrow = document.createElement('span');
+                arrow.className = 'arrow';
+                arrow.textContent = '▼';
+                dropdownButton.appendChild(buttonText);
+                dropdownButton.appendChild(arrow);
                 
                 const dropdownContent = document.createElement('div');
                 dropdownContent.className = 'dropdown-content';
                 dropdownContent.id = f.name + 'Content';
+
+                const search = document.createElement('input');
+                search.type = 'search';
+                search.className = 'dropdown-search';
+                search.placeholder = 'Buscar (' + f.values.length + ' opções)...';
+                dropdownContent.appendChild(search);
                 
                 const selectAllOption = document.createElement('div');
                 selectAllOption.className = 'dropdown-option select-all';
-                selectAllOption.innerHTML = '<input type="checkbox" onchange="selectAllOptions(\\'' + f.name + '\\')"><label>Selecionar Todos</label>';
+                const selectAllCheckbox = document.createElement('input');
+                selectAllCheckbox.type = 'checkbox';
+                const selectAllLabel = document.createElement('label');
+                selectAllLabel.textContent = 'Selecionar Todos';
+                selectAllOption.appendChild(selectAllCheckbox);
+                selectAllOption.appendChild(selectAllLabel);
                 dropdownContent.appendChild(selectAllOption);
-                
-                f.values.forEach(value => {{
-                    const option = document.createElement('div');
-                    option.className = 'dropdown-option';
-                    option.innerHTML = '<input type="checkbox" value="' + value + '" onchange="updateDropdownText(\\'' + f.name + '\\')"><label>' + value + '</label>';
-                    dropdownContent.appendChild(option);
+
+                let visibleIds = f.values.map((_, id) => id);
+                const optionList = createVirtualList({{
+                    height: Math.min(200, Math.max(1, f.values.length) * FILTER_ROW_HEIGHT),
+                    rowHeight: FILTER_ROW_HEIGHT,
+                    overscan: 4,
+                    renderRow(row, id) {{
+                        const value = f.values[id];
+                        const counts = computeFacetCounts()[f.name];
+                        const checked = FILTER_SELECTION[f.name].has(value);
+                        row.classList.add('dropdown-option');
+                        row.innerHTML = '<input type="checkbox"' + (checked ? ' checked' : '') + '>' +
+                            '<label>' + escapeHtml(value) + '</label>' +
+                            '<span class="facet-count">' + formatNumberBR(Math.round(counts[id])) + '</span>';
+                        row.onclick = (e) => {{
+                            e.preventDefault();
+                            toggleFilterValue(f.name, value);
+                            refreshOpenDropdown();
+                        }};
+                    }}
+                }});
+                optionList.element.classList.add('dropdown-options');
+                dropdownContent.appendChild(optionList.element);
+
+                // "Selecionar Todos" age sobre o resultado da busca atual
+                selectAllCheckbox.onchange = () => {{
+                    const selection = new Set(FILTER_SELECTION[f.name]);
+                    visibleIds.forEach(id => {{
+                        if (selectAllCheckbox.checked) selection.add(f.values[id]);
+                        else selection.delete(f.values[id]);
+                    }});
+                    setFilterSelection(f.name, selection);
+                    updateDropdownText(f.name);
+                    optionList.refresh();
+                }};
+
+                let searchTimer = null;
+                search.addEventListener('input', () => {{
+                    clearTimeout(searchTimer);
+                    searchTimer = setTimeout(() => {{
+                        visibleIds = searchFilterValues(f.name, search.value);
+                        selectAllCheckbox.checked = false;
+                        optionList.setItems(visibleIds);
+                    }}, 60);
                 }});
+
+                dropdownContent.refreshOptions = () => optionList.refresh();
+                optionList.setItems(visibleIds);
                 
                 dropdownContainer.appendChild(dropdownButton);
                 dropdownContainer.appendChild(dropdownContent);
                 filterGroup.appendChild(dropdownContainer);
                 container.appendChild(filterGroup);
             }});
+
+            RANGE_FILTERS.forEach(rf => buildRangeFilter(container, rf));
+        }}
+
+        // Atualiza as contagens das facetas do dropdown aberto
+        function refreshOpenDropdown() {{
+            document.querySelectorAll('.dropdown-content.show').forEach(content => {{
+                if (content.refreshOptions) content.refreshOptions();
+            }});
         }}
 
         function toggleDropdown(filterId) {{
@@ -2022,42 +3796,29 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             
             content.classList.toggle('show');
             button.classList.toggle('open');
-        }}
-
-        function selectAllOptions(filterId) {{
-            const content = document.getElementById(filterId + 'Content');
-            const selectAllCheckbox = content.querySelector('.select-all input');
-            const checkboxes = content.querySelectorAll('.dropdown-option:not(.select-all) input');
-            
-            checkboxes.forEach(cb => cb.checked = selectAllCheckbox.checked);
-            updateDropdownText(filterId);
+            if (content.classList.contains('show') && content.refreshOptions) content.refreshOptions();
         }}
 
         function updateDropdownText(filterId) {{
-            const content = document.getElementById(filterId + 'Content');
+            const f = FILTERS.find(x => x.name === filterId);
             const textElement = document.getElementById(filterId + 'Text');
-            const checkboxes = content.querySelectorAll('.dropdown-option:not(.select-all) input');
-            const checkedBoxes = content.querySelectorAll('.dropdown-option:not(.select-all) input:checked');
+            const selection = FILTER_SELECTION[filterId] || new Set();
             
-            if (checkedBoxes.length === 0) {{
+            if (selection.size === 0) {{
                 textElement.textContent = 'Todos';
-            }} else if (checkedBoxes.length === 1) {{
-                textElement.textContent = checkedBoxes[0].nextElementSibling.textContent;
-            }} else if (checkedBoxes.length === checkboxes.length) {{
+            }} else if (selection.size === 1) {{
+                textElement.textContent = Array.from(selection)[0];
+            }} else if (f && selection.size === f.values.length) {{
                 textElement.textContent = 'Todos';
             }} else {{
-                textElement.textContent = checkedBoxes.length + ' selecionados';
+                textElement.textContent = selection.size + ' selecionados';
             }}
         }}
 
         function getSelectedFilters() {{
             const selectedFilters = {{}};
             FILTERS.forEach(f => {{
-                const content = document.getElementById(f.name + 'Content');
-                if (content) {{
-                    const checkedBoxes = content.querySelectorAll('.dropdown-option:not(.select-all) input:checked');
-                    selectedFilters[f.name] = Array.from(checkedBoxes).map(cb => cb.value);
-                }}
+                selectedFilters[f.name] = Array.from(FILTER_SELECTION[f.name] || []);
             }});
             return selectedFilters;
         }}
@@ -2069,53 +3830,173 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
         }}
 
         function clearFilters() {{
-            document.querySelectorAll('.dropdown-content input[type="checkbox"]').forEach(cb => cb.checked = false);
             FILTERS.forEach(f => {{
+                setFilterSelection(f.name, []);
                 const textElement = document.getElementById(f.name + 'Text');
                 if (textElement) textElement.textContent = 'Todos';
             }});
+            document.querySelectorAll('.dropdown-content .select-all input').forEach(cb => cb.checked = false);
+            document.querySelectorAll('.range-filter').forEach(group => group.resetRange());
             document.querySelectorAll('.dropdown-content').forEach(d => d.classList.remove('show'));
             document.querySelectorAll('.dropdown-button').forEach(b => b.classList.remove('open'));
             renderAll();
         }}
 
+        // Registros que satisfazem todos os filtros (contador de falhas = 0)
         function getFilteredRecords() {{
-            const selectedFilters = getSelectedFilters();
-            return RECORDS.filter(record => {{
-                return Object.keys(selectedFilters).every(filterName => {{
-                    const filterValues = selectedFilters[filterName];
-                    if (filterValues.length === 0) return true;
-                    const recordValue = record[filterName];
-                    if (recordValue === null || recordValue === undefined) return false;
-                    
-                    // Normalizar valores para comparação
-                    const normalizedRecordValue = String(recordValue).trim();
-                    const normalizedFilterValues = filterValues.map(v => String(v).trim());
-                    
-                    return normalizedFilterValues.includes(normalizedRecordValue);
-                }});
+            const filtered = [];
+            for (let i = 0; i < RECORDS.length; i++) {{
+                if (FILTER_FAIL_COUNT[i] === 0) filtered.push(RECORDS[i]);
+            }}
+            return filtered;
+        }}
+
+        // CACHE DE RESULTADOS POR ESTADO DE FILTRO (LRU)
+        // Chave = seleção canônica dos filtros; valor = agregados de cada variável.
+        // Voltar a um estado já visto (ex.: "Todos" ↔ Região A) não reprocessa os registros.
+        const RESULT_CACHE_MAX = 12;
+        const RESULT_CACHE = new Map();
+        const RESULT_CACHE_STATS = {{ hits: 0, misses: 0 }};
+        let currentResults = null;
+
+        function filterStateKey() {{
+            const selected = getSelectedFilters();
+            const parts = Object.keys(selected)
+                .filter(name => selected[name].length > 0)
+                .sort()
+                .map(name => [name, selected[name].slice().sort()]);
+            const ranges = getSelectedRanges();
+            Object.keys(ranges).sort().forEach(name => parts.push(['~' + name, ranges[name]]));
+            return JSON.stringify(parts);
+        }}
+
+        function lookupResultCache(key) {{
+            let entry = RESULT_CACHE.get(key);
+            if (entry) {{
+                RESULT_CACHE_STATS.hits++;
+                RESULT_CACHE.delete(key);  // reinsere no fim = mais recente
+            }} else {{
+                RESULT_CACHE_STATS.misses++;
+                entry = {{ count: null, results: {{}} }};
+                if (RESULT_CACHE.size >= RESULT_CACHE_MAX) {{
+                    RESULT_CACHE.delete(RESULT_CACHE.keys().next().value);
+                }}
+            }}
+            RESULT_CACHE.set(key, entry);
+            return entry;
+        }}
+
+        // Devolve o agregado da variável no estado atual, calculando só se ainda não existir
+        function cachedResult(varMeta, compute) {{
+            if (!currentResults) return compute();
+            if (!(varMeta.name in currentResults.results)) {{
+                currentResults.results[varMeta.name] = compute();
+            }}
+            return currentResults.results[varMeta.name];
+        }}
+
+        // MODO SERVIDOR
+        // Cada estado de filtro novo vira um POST para a API local; a resposta traz a base,
+        // as facetas dos filtros e os agregados brutos de cada variável, finalizados aqui
+        // com as mesmas regras de ordenação dos agregadores locais.
+        let SERVER_FACETS = null;
+        let serverRequest = 0;
+
+        function totalRespondents() {{
+            return SERVER_MODE ? SERVER_MODE.total : RECORDS.length;
+        }}
+
+        function finishServerResult(varMeta, raw) {{
+            switch (raw.kind) {{
+                case 'categorical': return orderCategorical(varMeta, raw);
+                case 'date': return orderDate(raw);
+                case 'scale': return Object.assign(histogramResult(raw.histogram), {{ stats: raw.stats }});
+                case 'string': return Object.assign(stringResult(raw.responses), {{ keywords: raw.keywords }});
+            }}
+            return raw;
+        }}
+
+        function requestServerResults(stateKey, startedAt) {{
+            const request = ++serverRequest;
+            const content = document.getElementById('content');
+            content.classList.add('server-loading');
+            const selected = getSelectedFilters();
+            const query = {{ filters: {{}}, ranges: getSelectedRanges() }};
+            Object.keys(selected).forEach(name => {{
+                if (selected[name].length > 0) query.filters[name] = selected[name];
             }});
+            fetch(SERVER_MODE.endpoint, {{
+                method: 'POST',
+                headers: {{ 'Content-Type': 'application/json' }},
+                body: JSON.stringify(query)
+            }})
+                .then(response => {{
+                    if (!response.ok) throw new Error('HTTP ' + response.status);
+                    return response.json();
+                }})
+                .then(data => {{
+                    if (request !== serverRequest) return;  // outra troca de filtro já foi pedida
+                    content.classList.remove('server-loading');
+                    const entry = lookupResultCache(stateKey);
+                    entry.count = data.count;
+                    entry.facets = data.facets;
+                    VARS_META.forEach(varMeta => {{
+                        const raw = data.variables[varMeta.name];
+                        if (raw) entry.results[varMeta.name] = finishServerResult(varMeta, raw);
+                    }});
+                    renderEntry(entry, startedAt, false);
+                }})
+                .catch(error => {{
+                    if (request !== serverRequest) return;
+                    content.classList.remove('server-loading');
+                    console.error('❌ Servidor de agregação:', error);
+                    content.innerHTML = '<p style="color: #c62828; text-align: center;">⚠️ Servidor de agregação indisponível (' +
+                        escapeHtml(error.message) + '). Verifique se o gerador continua rodando com --serve.</p>';
+                }});
         }}
 
         // RENDERIZAÇÃO
         function renderAll() {{
-            const filteredRecords = getFilteredRecords();
+            const startedAt = performance.now();
+            const hitsBefore = RESULT_CACHE_STATS.hits;
+            perfMark('renderAll:start');
+            const stateKey = filterStateKey();
+            if (SERVER_MODE && !RESULT_CACHE.has(stateKey)) {{
+                requestServerResults(stateKey, startedAt);
+                return;
+            }}
+            const entry = lookupResultCache(stateKey);
+            renderEntry(entry, startedAt, RESULT_CACHE_STATS.hits > hitsBefore);
+        }}
+
+        function renderEntry(entry, startedAt, cacheHit) {{
+            if (SERVER_MODE) SERVER_FACETS = entry.facets;
+            let filteredRecords = null;
+            const getRecords = () => filteredRecords || (filteredRecords = getFilteredRecords());
+            if (entry.count === null) entry.count = getRecords().length;
+
             const content = document.getElementById('content');
             content.innerHTML = '';
             
-            console.log('🔄 Renderizando com ' + filteredRecords.length + ' registros filtrados');
+            console.log('🔄 Renderizando com ' + entry.count + ' registros filtrados');
+            console.log(`🗃️ Cache de resultados: ${{RESULT_CACHE_STATS.hits}} acertos / ${{RESULT_CACHE_STATS.misses}} falhas (${{RESULT_CACHE.size}}/${{RESULT_CACHE_MAX}} estados)`);
             console.log('📋 Ordem das variáveis sendo processadas:', VARS_META.map(v => v.name));
             
-            VARS_META.forEach((varMeta, index) => {{
-                const section = createSection(varMeta, filteredRecords);
-                content.appendChild(section);
-            }});
+            currentResults = entry;
+            try {{
+                VARS_META.forEach((varMeta, index) => {{
+                    const section = createSection(varMeta, getRecords);
+                    content.appendChild(section);
+                }});
+            }} finally {{
+                currentResults = null;
+            }}
+            perfRecordRender(startedAt, entry.count, cacheHit);
         }}
 
 
-        function renderStringVariable(varMeta, records) {{
-            const container = document.createElement('div');
-
+        // Respostas abertas normalizadas, em ordem alfabética, com a versão sem acentos
+        function aggregateString(varMeta, records) {{
             // Normaliza texto: tira espaços, ignora '99' e aplica capitalização simples
             function normalizeText(text) {{
                 if (text === null || text === undefined) return '';
@@ -2125,78 +4006,135 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             }}
 
             // Coleta e normaliza as respostas
-            let validResponses = records
+            return stringResult(records
                 .map(r => normalizeText(r[varMeta.name]))
-                .filter(v => v !== '');
+                .filter(v => v !== ''));
+        }}
+
+        function stringResult(validResponses) {{
+            // ✅ REGRA CORRETA: Textual = Ordem alfabética
+            validResponses.sort((a, b) => a.localeCompare(b, 'pt-BR'));
+
+            // Versão sem acentos de cada resposta, calculada uma única vez
+            // para filtro, destaque e busca.
+            return {{ validResponses: validResponses, foldedResponses: validResponses.map(foldForSearch) }};
+        }}
+
+        function renderStringVariable(varMeta, getRecords) {{
+            const container = document.createElement('div');
+            container.className = 'string-response-block virtual-export';
 
+            const responses = cachedResult(varMeta, () => aggregateString(varMeta, getRecords()));
+            const {{ validResponses, foldedResponses }} = responses;
             if (validResponses.length === 0) {{
                 container.innerHTML = '<p style="color: #999; font-style: italic;">Nenhuma resposta encontrada</p>';
                 return container;
             }}
 
-            // ✅ DEBUG: Verificar ordem das respostas
-            console.log(`📝 ${{varMeta.name}}: Respostas de texto encontradas:`, validResponses.slice(0, 5));
-
-            // ✅ REGRA CORRETA: Textual = Ordem alfabética
-            validResponses.sort((a, b) => a.localeCompare(b, 'pt-BR'));
+            // Itens da lista = índices em validResponses (a numeração original é preservada
+            // quando um filtro de palavra‑chave está ativo)
+            let visibleIndexes = validResponses.map((_, i) => i);
+            let highlightTerm = '';
+            let matchPositions = [];
+            let currentMatch = -1;
 
-            // --------- BLOCO VISUAL (lista normal como antes) ----------
+            // --------- BLOCO VISUAL (lista virtual) ----------
             const summary = document.createElement('p');
             summary.innerHTML = '<strong>Total de respostas:</strong> ' + validResponses.length;
             summary.style.marginBottom = '15px';
 
-            const responseList = document.createElement('div');
-            responseList.style.cssText =
-                'max-height: 400px; overflow-y: auto; border: 1px solid var(--border); ' +
-                'border-radius: var(--radius); background: #f8f9fa;';
-
-            validResponses.forEach((response, index) => {{
-                const responseItem = document.createElement('div');
-                responseItem.style.cssText =
-                    'padding: 12px 16px; border-bottom: 1px solid var(--border); ' +
-                    'background: white; margin-bottom: 1px; font-size: 13px;';
-                responseItem.innerHTML =
-                    '<strong>' + (index + 1) + '.</strong> ' + String(response);
-                responseList.appendChild(responseItem);
+            const responseList = createVirtualList({{
+                height: 400,
+                variableHeight: true,
+                renderRow(row, responseIndex) {{
+                    const text = validResponses[responseIndex];
+                    row.title = text;
+                    row.innerHTML = '<strong>' + (responseIndex + 1) + '.</strong> ' +
+                        highlightMatches(text, foldedResponses[responseIndex], highlightTerm);
+                }}
             }});
 
-            // --------- TABELA OCULTA PARA EXPORTAÇÃO (USADA PELO EXCEL) ----------
-            const exportTable = document.createElement('table');
-            exportTable.className = 'export-text-table';
-            exportTable.style.display = 'none'; // invisível para o usuário
-
-            const thead = document.createElement('thead');
-            const headRow = document.createElement('tr');
-            ['Nº', 'Resposta'].forEach(h => {{
-                const th = document.createElement('th');
-                th.innerText = h;
-                headRow.appendChild(th);
-            }});
-            thead.appendChild(headRow);
+            // --------- BUSCA COM DESTAQUE E NAVEGAÇÃO ENTRE OCORRÊNCIAS ----------
+            const searchBar = document.createElement('div');
+            searchBar.className = 'response-search';
+            const searchInput = document.createElement('input');
+            searchInput.type = 'search';
+            searchInput.placeholder = 'Buscar nas respostas...';
+            const matchInfo = document.createElement('span');
+            matchInfo.style.color = '#6c757d';
+            const prevBtn = document.createElement('button');
+            prevBtn.textContent = '▲';
+            prevBtn.title = 'Ocorrência anterior';
+            const nextBtn = document.createElement('button');
+            nextBtn.textContent = '▼';
+            nextBtn.title = 'Próxima ocorrência';
+            searchBar.appendChild(searchInput);
+            searchBar.appendChild(matchInfo);
+            searchBar.appendChild(prevBtn);
+            searchBar.appendChild(nextBtn);
+
+            function updateMatchInfo() {{
+                if (!highlightTerm) {{
+                    matchInfo.textContent = '';
+                }} else if (matchPositions.length === 0) {{
+                    matchInfo.textContent = 'Nenhuma ocorrência';
+                }} else if (currentMatch < 0) {{
+                    matchInfo.textContent = matchPositions.length + ' ocorrências';
+                }} else {{
+                    matchInfo.textContent = (currentMatch + 1) + ' de ' + matchPositions.length;
+                }}
+            }}
 
-            const tbody = document.createElement('tbody');
-            validResponses.forEach((resp, idx) => {{
-                const tr = document.createElement('tr');
+            // Recalcula as posições (na lista visível) que contêm o termo destacado
+            function refreshMatches() {{
+                matchPositions = [];
+                if (highlightTerm) {{
+                    for (let pos = 0; pos < visibleIndexes.length; pos++) {{
+                        if (foldedResponses[visibleIndexes[pos]].includes(highlightTerm)) {{
+                            matchPositions.push(pos);
+                        }}
+                    }}
+                }}
+                currentMatch = -1;
+            }}
 
-                const tdIndex = document.createElement('td');
-                tdIndex.innerText = (idx + 1).toString();
-                tr.appendChild(tdIndex);
+            function goToMatch(step) {{
+                if (matchPositions.length === 0) {{
+                    updateMatchInfo();
+                    return;
+                }}
+                currentMatch = (currentMatch + step + matchPositions.length) % matchPositions.length;
+                responseList.scrollToIndex(matchPositions[currentMatch]);
+                updateMatchInfo();
+            }}
 
-                const tdResp = document.createElement('td');
-                tdResp.innerText = resp;
-                tr.appendChild(tdResp);
+            function setHighlightTerm(term) {{
+                highlightTerm = foldForSearch(term.trim());
+                refreshMatches();
+                responseList.refresh();
+                goToMatch(1);
+            }}
 
-                tbody.appendChild(tr);
+            let searchTimer = null;
+            searchInput.addEventListener('input', () => {{
+                clearTimeout(searchTimer);
+                searchTimer = setTimeout(() => setHighlightTerm(searchInput.value), 120);
             }});
-
-            exportTable.appendChild(thead);
-            exportTable.appendChild(tbody);
+            searchInput.addEventListener('keydown', (e) => {{
+                if (e.key === 'Enter') {{
+                    e.preventDefault();
+                    goToMatch(e.shiftKey ? -1 : 1);
+                }}
+            }});
+            prevBtn.onclick = () => goToMatch(-1);
+            nextBtn.onclick = () => goToMatch(1);
 
             // Conteúdo principal: adiciona sumário e lista de respostas
             container.appendChild(summary);
 
             // --------- PALAVRAS‑CHAVE E FILTRO ---------
-            const keywords = varMeta.keywords || [];
+            // (modo servidor: extraídas das respostas do recorte; senão, do total)
+            const keywords = responses.keywords || varMeta.keywords || [];
             if (keywords && keywords.length > 0) {{
                 const filterContainer = document.createElement('div');
                 filterContainer.style.cssText = 'margin-bottom: 8px; display: flex; flex-wrap: wrap; gap: 4px; align-items: center;';
@@ -2206,31 +4144,22 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                 filterTitle.textContent = 'Palavras‑chave:';
                 filterContainer.appendChild(filterTitle);
 
-                // Função auxiliar para normalizar texto para comparação: converte para minúsculas
-                // e remove acentos.  Isso garante que "informacoes" corresponda a "informação".
-                function normalizeForComparison(str) {{
-                    if (!str) return '';
-                    return String(str).toLowerCase()
-                        .normalize('NFD')
-                        .replace(/[\u0300-\u036f]/g, '');
-                }}
-
                 // Função para aplicar filtro nas respostas.
-                // Normaliza tanto o termo pesquisado quanto o texto de cada resposta para
-                // garantir correspondência sem acentuação.
+                // Compara a raiz sem acentos com as respostas já dobradas, de modo que
+                // "informacoes" corresponda a "informação"; a raiz também fica destacada.
                 function applyKeywordFilter(kw) {{
-                    const normKw = kw ? normalizeForComparison(kw) : null;
-                    const items = responseList.children;
-                    for (let i = 0; i < items.length; i++) {{
-                        const item = items[i];
-                        const text = item.textContent || '';
-                        const normText = normalizeForComparison(text);
-                        if (!normKw || normText.includes(normKw)) {{
-                            item.style.display = '';
-                        }} else {{
-                            item.style.display = 'none';
+                    const normKw = kw ? foldForSearch(kw) : null;
+                    visibleIndexes = [];
+                    for (let i = 0; i < foldedResponses.length; i++) {{
+                        if (!normKw || foldedResponses[i].includes(normKw)) {{
+                            visibleIndexes.push(i);
                         }}
                     }}
+                    searchInput.value = kw || '';
+                    highlightTerm = normKw || '';
+                    responseList.setItems(visibleIndexes);
+                    refreshMatches();
+                    updateMatchInfo();
                 }}
 
                 keywords.forEach(k => {{
@@ -2254,18 +4183,21 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                 container.appendChild(filterContainer);
             }}
 
-            container.appendChild(responseList);
-
-            // adiciona a tabela escondida ao container
-            container.appendChild(exportTable);
+            container.appendChild(searchBar);
+            container.appendChild(responseList.element);
+            responseList.setItems(visibleIndexes);
 
+            // --------- LINHAS PARA EXPORTAÇÃO (USADAS PELO EXCEL) ----------
+            // Geradas sob demanda em vez de uma tabela oculta com uma linha por resposta.
+            container.exportRows = () => [['Nº', 'Resposta']].concat(
+                validResponses.map((resp, idx) => [(idx + 1).toString(), resp])
+            );
 
             return container;
         }}
 
-        function renderNumericScaleVariable(varMeta, records) {{
-            const container = document.createElement('div');
-
+        // Histograma ponderado de 10 faixas entre o mínimo e o máximo filtrados
+        function aggregateNumericScale(varMeta, records) {{
             // Coletar valores com seus pesos para histograma ponderado
             const weightedValues = [];
             records.forEach(r => {{
@@ -2276,14 +4208,55 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                 }}
             }});
 
-            if (weightedValues.length === 0) {{
-                container.innerHTML = '<p style="color: #999; font-style: italic;">Nenhum valor numérico válido encontrado</p>';
-                return container;
-            }}
-
-            const stats = varMeta.stats || {{}};
-            const summary = document.createElement('p');
-            let statsText = '<strong>Estatísticas</strong>: ';
+            if (weightedValues.length === 0) return histogramResult(null);
+
+            // Extrair apenas os valores para calcular min/max
+            const values = weightedValues.map(wv => wv.value);
+            const minVal = Math.min(...values);
+            const maxVal = Math.max(...values);
+            const binCount = HISTOGRAM_BINS;
+            const range = maxVal - minVal || 1;
+            const binSize = range / binCount;
+
+            const bins = new Array(binCount).fill(0);
+
+            // Distribuir valores ponderados nos bins
+            weightedValues.forEach(wv => {{
+                let idx = Math.floor((wv.value - minVal) / binSize);
+                if (idx < 0) idx = 0;
+                if (idx >= binCount) idx = binCount - 1;
+                bins[idx] += wv.weight;  // Usar peso em vez de 1
+            }});
+
+            const totalCases = weightedValues.reduce((sum, wv) => sum + wv.weight, 0);
+            return histogramResult({{ min: minVal, max: maxVal, bins: bins, totalCases: totalCases }});
+        }}
+
+        // Rótulos das faixas do histograma ({{ min, max, bins, totalCases }} ou null = sem valores)
+        function histogramResult(histogram) {{
+            if (!histogram) return {{ bins: [], labels: [], totalCases: 0 }};
+            const {{ min, max, bins, totalCases }} = histogram;
+            const binSize = (max - min || 1) / bins.length;
+            const labels = bins.map((_, i) => {{
+                const start = min + i * binSize;
+                const end = (i === bins.length - 1) ? max : (start + binSize);
+                return `${{formatBR(start, 1)}} – ${{formatBR(end, 1)}}`;
+            }});
+            return {{ bins: bins, labels: labels, totalCases: totalCases }};
+        }}
+
+        function renderNumericScaleVariable(varMeta, getRecords) {{
+            const container = document.createElement('div');
+            const histogram = cachedResult(varMeta, () => aggregateNumericScale(varMeta, getRecords()));
+            const {{ bins, labels, totalCases }} = histogram;
+            if (bins.length === 0) {{
+                container.innerHTML = '<p style="color: #999; font-style: italic;">Nenhum valor numérico válido encontrado</p>';
+                return container;
+            }}
+
+            const stats = histogram.stats || varMeta.stats || {{}};
+            const summary = document.createElement('p');
+            let statsText = '<strong>Estatísticas</strong>: ';
 
             if (stats && typeof stats === 'object') {{
                 const parts = [];
@@ -2308,32 +4281,6 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             chartContainer.appendChild(canvas);
             const ctx = canvas.getContext('2d');
 
-            // Extrair apenas os valores para calcular min/max
-            const values = weightedValues.map(wv => wv.value);
-            const minVal = Math.min(...values);
-            const maxVal = Math.max(...values);
-            const binCount = 10;
-            const range = maxVal - minVal || 1;
-            const binSize = range / binCount;
-
-            const bins = new Array(binCount).fill(0);
-            const labels = [];
-
-            for (let i = 0; i < binCount; i++) {{
-                const start = minVal + i * binSize;
-                const end = (i === binCount - 1) ? maxVal : (start + binSize);
-                labels.push(`${{formatBR(start, 1)}} – ${{formatBR(end, 1)}}`);
-            }}
-
-            // Distribuir valores ponderados nos bins
-            weightedValues.forEach(wv => {{
-                let idx = Math.floor((wv.value - minVal) / binSize);
-                if (idx < 0) idx = 0;
-                if (idx >= binCount) idx = binCount - 1;
-                bins[idx] += wv.weight;  // Usar peso em vez de 1
-            }});
-
-            const totalCases = weightedValues.reduce((sum, wv) => sum + wv.weight, 0);
             const percentages = bins.map(count => totalCases > 0 ? (count / totalCases * 100) : 0);
             
             // ✅ AJUSTE DINÂMICO: Eixo Y se adapta ao valor máximo
@@ -2394,9 +4341,7 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             return container;
         }}
 
-        function renderDateVariable(varMeta, records) {{
-            const container = document.createElement('div');
-
+        function countDate(varMeta, records) {{
             const freq = {{}};
             let validCount = 0;
 
@@ -2409,16 +4354,28 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                     freq[key] = (freq[key] || 0) + weight;
                 }}
             }});
+            return {{ freq: freq, validCount: validCount }};
+        }}
 
+        function aggregateDate(varMeta, records) {{
+            return orderDate(countDate(varMeta, records));
+        }}
+
+        function orderDate({{ freq, validCount }}) {{
             const entries = Object.entries(freq);
+            // ✅ REGRA CORRETA: Datas ordenadas cronologicamente
+            entries.sort((a, b) => new Date(a[0]) - new Date(b[0]));
+            return {{ entries: entries, validCount: validCount }};
+        }}
+
+        function renderDateVariable(varMeta, getRecords) {{
+            const container = document.createElement('div');
+            const {{ entries, validCount }} = cachedResult(varMeta, () => aggregateDate(varMeta, getRecords()));
             if (entries.length === 0) {{
                 container.innerHTML = '<p style="color: #999; font-style: italic;">Nenhuma data válida encontrada</p>';
                 return container;
             }}
 
-            // ✅ REGRA CORRETA: Datas ordenadas cronologicamente
-            entries.sort((a, b) => new Date(a[0]) - new Date(b[0]));
-
             const labels = entries.map(([d]) => d);
             const counts = entries.map(([, c]) => c);
             const percentages = counts.map(count => validCount > 0 ? (count / validCount * 100) : 0);
@@ -2493,8 +4450,10 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             return container;
         }}
 
-        function renderCategoricalVariable(varMeta, records) {{
-            const container = document.createElement('div');
+        // Frequências ponderadas e ordenação das categorias (resultado guardado no cache)
+        // Contagem ponderada das categorias, na ordem em que aparecem
+        // (no modo servidor a API devolve este mesmo formato)
+        function countCategorical(varMeta, records) {{
             const freq = {{}};
             let validCount = 0;
 
@@ -2521,12 +4480,15 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                     }}
                 }}
             }});
+            return {{ freq: freq, validCount: validCount }};
+        }}
 
+        function aggregateCategorical(varMeta, records) {{
+            return orderCategorical(varMeta, countCategorical(varMeta, records));
+        }}
+
+        function orderCategorical(varMeta, {{ freq, validCount }}) {{
             const entries = Object.entries(freq);
-            if (entries.length === 0) {{
-                container.innerHTML = '<p style="color:#999;font-style:italic;">Nenhum dado disponível</p>';
-                return container;
-            }}
 
             // ✅ DEBUG: Verificar ordem das categorias
             console.log(`📊 ${{varMeta.name}}: Categorias encontradas:`, entries.map(([label]) => label));
@@ -2563,16 +4525,41 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                 console.log(`📊 ${{varMeta.name}}: Nominal ordenado por frequência (maior→menor)`);
             }}
 
-            // Aplicar labels descritivos APÓS ordenação
-            const labels = entries.map(([label]) => {{
+            return {{ entries: entries, validCount: validCount }};
+        }}
+
+        function renderCategoricalVariable(varMeta, getRecords) {{
+            const container = document.createElement('div');
+            const {{ entries, validCount }} = cachedResult(varMeta, () => aggregateCategorical(varMeta, getRecords()));
+            if (entries.length === 0) {{
+                container.innerHTML = '<p style="color:#999;font-style:italic;">Nenhum dado disponível</p>';
+                return container;
+            }}
+
+            // Label descritivo (CODE_TO_LABEL) quando disponível
+            function displayLabelFor(label) {{
                 if (CODE_TO_LABEL[varMeta.name] && CODE_TO_LABEL[varMeta.name][label]) {{
-                    const descLabel = CODE_TO_LABEL[varMeta.name][label];
-                    console.log(`✅ ${{varMeta.name}}: "${{label}}" → "${{descLabel}}"`);
-                    return descLabel;
+                    return CODE_TO_LABEL[varMeta.name][label];
                 }}
                 return label;
-            }});
-            const counts = entries.map(([,count]) => count);
+            }}
+
+            // ✂️ TOP N (decidido no Python para variáveis de alta cardinalidade):
+            // as categorias além do limite viram uma única barra "Outros (k categorias)".
+            const topN = varMeta.top_n || 0;
+            let chartEntries = entries;
+            if (topN > 0 && entries.length > topN + 1) {{
+                const tail = entries.slice(topN);
+                chartEntries = entries.slice(0, topN).concat([[
+                    'Outros (' + tail.length + ' categorias)',
+                    tail.reduce((sum, [, count]) => sum + count, 0)
+                ]]);
+            }}
+            const isBucketed = chartEntries !== entries;
+
+            // Aplicar labels descritivos APÓS ordenação
+            const labels = chartEntries.map(([label]) => displayLabelFor(label));
+            const counts = chartEntries.map(([,count]) => count);
             const percentages = counts.map(count => validCount > 0 ? (count / validCount * 100) : 0);
             
             // ✅ AJUSTE DINÂMICO: Eixo Y se adapta ao valor máximo
@@ -2638,17 +4625,18 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             header.innerHTML = '<th>Categoria</th><th>Frequência</th><th>%</th>';
             table.appendChild(header);
 
-            entries.forEach(([label, count]) => {{
-                const pct = validCount > 0 ? formatBR(count / validCount * 100, 1) : '0,0';
-                
-                // Usar label descritivo se disponível
-                let displayLabel = label;
-                if (CODE_TO_LABEL[varMeta.name] && CODE_TO_LABEL[varMeta.name][label]) {{
-                    displayLabel = CODE_TO_LABEL[varMeta.name][label];
-                }}
-                
+            function percentText(count) {{
+                return validCount > 0 ? formatBR(count / validCount * 100, 1) : '0,0';
+            }}
+
+            chartEntries.forEach(([label, count], index) => {{
                 const row = document.createElement('tr');
-                row.innerHTML = `<td>${{displayLabel}}</td><td>${{Math.round(count)}}</td><td>${{pct}}%</td>`;
+                row.innerHTML = `<td>${{escapeHtml(displayLabelFor(label))}}</td><td>${{Math.round(count)}}</td><td>${{percentText(count)}}%</td>`;
+                if (isBucketed && index === chartEntries.length - 1) {{
+                    row.className = 'bucket-row';
+                    row.title = 'Clique para ver todas as categorias';
+                    row.onclick = () => toggleFullTable();
+                }}
                 table.appendChild(row);
             }});
 
@@ -2669,12 +4657,198 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             // container.appendChild(summary);
             container.appendChild(table);
 
+            // ----- Tabela completa (virtualizada, criada só quando expandida) -----
+            let fullTable = null;
+            let expandBtn = null;
+            function toggleFullTable() {{
+                if (!fullTable) {{
+                    fullTable = createVirtualList({{
+                        height: 360,
+                        renderRow(row, entry) {{
+                            const [label, count] = entry;
+                            row.classList.add('virtual-table-row');
+                            const text = displayLabelFor(label);
+                            row.title = text;
+                            row.innerHTML = `<span>${{escapeHtml(text)}}</span><span>${{Math.round(count)}}</span><span>${{percentText(count)}}%</span>`;
+                        }}
+                    }});
+                    container.appendChild(fullTable.element);
+                    fullTable.setItems(entries);
+                    fullTable.element.style.display = 'none';
+                }}
+                const show = fullTable.element.style.display === 'none';
+                fullTable.element.style.display = show ? '' : 'none';
+                if (show) fullTable.refresh();
+                expandBtn.textContent = show
+                    ? '▲ Ocultar lista completa'
+                    : '▼ Ver todas as ' + entries.length + ' categorias';
+            }}
+
+            if (isBucketed) {{
+                expandBtn = document.createElement('button');
+                expandBtn.className = 'expand-categories-btn';
+                expandBtn.textContent = '▼ Ver todas as ' + entries.length + ' categorias';
+                expandBtn.onclick = () => toggleFullTable();
+                container.appendChild(expandBtn);
+
+                // Excel recebe todas as categorias, não só as TOP N
+                container.classList.add('virtual-export');
+                container.exportRows = () => [['Categoria', 'Frequência', '%']]
+                    .concat(entries.map(([label, count]) => [displayLabelFor(label), String(Math.round(count)), percentText(count) + '%']))
+                    .concat([['Total', String(totalCount), '100,0%']]);
+            }}
+
+            return container;
+        }}
+
+        // TENDÊNCIA ENTRE ONDAS (dashboard multi‑ondas)
+        // Calculada sobre os registros do estado de filtro atual e guardada no mesmo
+        // cache de resultados (chave "<variável>@ondas").
+        const TREND_MAX_SERIES = 8;
+        const TREND_COLORS = ['#4A90E2', '#F5A623', '#7ED321', '#D0021B', '#9013FE', '#50E3C2', '#8B572A', '#417505'];
+
+        function isScaleVariable(varMeta) {{
+            return (varMeta.var_type || varMeta.type) === 'numeric' && varMeta.measure === 'scale';
+        }}
+
+        function aggregateTrend(varMeta, records) {{
+            const byWave = {{}};
+            WAVES.forEach(wave => {{ byWave[wave] = []; }});
+            records.forEach(r => {{ if (r.__wave__ in byWave) byWave[r.__wave__].push(r); }});
+
+            if (isScaleVariable(varMeta)) {{
+                return {{
+                    scale: true,
+                    waves: WAVES.map(wave => {{
+                        let sum = 0, base = 0;
+                        byWave[wave].forEach(r => {{
+                            const value = r[varMeta.name];
+                            if (value === null || value === undefined || value === '' || isNaN(value)) return;
+                            const weight = r.__weight__ || 1.0;
+                            sum += Number(value) * weight;
+                            base += weight;
+                        }});
+                        return {{ wave: wave, base: base, mean: base > 0 ? sum / base : null }};
+                    }})
+                }};
+            }}
+
+            // Ordem das categorias = a do conjunto (mesmas regras do gráfico de barras)
+            const pooled = aggregateCategorical(varMeta, records);
+            return {{
+                scale: false,
+                categories: pooled.entries.map(([label]) => label),
+                waves: WAVES.map(wave => {{
+                    const {{ entries, validCount }} = aggregateCategorical(varMeta, byWave[wave]);
+                    return {{ wave: wave, base: validCount, freq: Object.fromEntries(entries) }};
+                }})
+            }};
+        }}
+
+        function renderTrendVariable(varMeta, getRecords) {{
+            const container = document.createElement('div');
+            const trend = cachedResult({{ name: varMeta.name + '@ondas' }}, () => aggregateTrend(varMeta, getRecords()));
+            const displayLabelFor = label => (CODE_TO_LABEL[varMeta.name] && CODE_TO_LABEL[varMeta.name][label]) || label;
+            const percent = (w, label) => w.base > 0 ? (w.freq[label] || 0) / w.base * 100 : null;
+
+            if (trend.waves.every(w => w.base === 0)) {{
+                container.innerHTML = '<p style="color:#999;font-style:italic;">Nenhum dado disponível</p>';
+                return container;
+            }}
+
+            let datasets;
+            if (trend.scale) {{
+                datasets = [{{
+                    label: 'Média',
+                    data: trend.waves.map(w => w.mean),
+                    borderColor: TREND_COLORS[0],
+                    backgroundColor: TREND_COLORS[0],
+                    tension: 0.2
+                }}];
+            }} else {{
+                datasets = trend.categories.slice(0, TREND_MAX_SERIES).map((label, i) => ({{
+                    label: wrapLabel(displayLabelFor(label), CHART_LABEL_MAX),
+                    data: trend.waves.map(w => percent(w, label)),
+                    borderColor: TREND_COLORS[i % TREND_COLORS.length],
+                    backgroundColor: TREND_COLORS[i % TREND_COLORS.length],
+                    tension: 0.2
+                }}));
+            }}
+
+            // ----- Gráfico de linhas (uma linha por categoria) -----
+            const chartContainer = document.createElement('div');
+            chartContainer.className = 'chart-container';
+            const canvas = document.createElement('canvas');
+            chartContainer.appendChild(canvas);
+            new Chart(canvas.getContext('2d'), {{
+                type: 'line',
+                data: {{ labels: WAVES, datasets: datasets }},
+                options: {{
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    spanGaps: true,
+                    plugins: {{
+                        legend: {{ display: !trend.scale, position: 'bottom' }},
+                        tooltip: {{
+                            callbacks: {{
+                                label: function(context) {{
+                                    const value = context.parsed.y;
+                                    return trend.scale
+                                        ? `Média: ${{formatBR(value, 2)}}`
+                                        : `${{context.dataset.label}}: ${{formatBR(value, 1)}}%`;
+                                }}
+                            }}
+                        }}
+                    }},
+                    scales: {{
+                        y: {{
+                            beginAtZero: true,
+                            ticks: {{ callback: value => trend.scale ? value : value + '%' }}
+                        }}
+                    }}
+                }}
+            }});
+
+            // ----- Tabela: categorias × ondas -----
+            const table = document.createElement('table');
+            table.className = 'table-categorical';
+            const header = document.createElement('tr');
+            header.innerHTML = '<th>' + (trend.scale ? 'Onda' : 'Categoria') + '</th>' +
+                (trend.scale ? '<th>Base</th><th>Média</th>' : WAVES.map(w => `<th>${{escapeHtml(w)}}</th>`).join(''));
+            table.appendChild(header);
+
+            if (trend.scale) {{
+                trend.waves.forEach(w => {{
+                    const row = document.createElement('tr');
+                    row.innerHTML = `<td>${{escapeHtml(w.wave)}}</td><td>${{Math.round(w.base)}}</td><td>${{w.mean === null ? '—' : formatBR(w.mean, 2)}}</td>`;
+                    table.appendChild(row);
+                }});
+            }} else {{
+                trend.categories.forEach(label => {{
+                    const row = document.createElement('tr');
+                    row.innerHTML = `<td>${{escapeHtml(displayLabelFor(label))}}</td>` + trend.waves.map(w => {{
+                        const pct = percent(w, label);
+                        return `<td>${{pct === null ? '—' : formatBR(pct, 1) + '%'}}</td>`;
+                    }}).join('');
+                    table.appendChild(row);
+                }});
+                const baseRow = document.createElement('tr');
+                baseRow.style.fontWeight = 'bold';
+                baseRow.style.borderTop = '2px solid #ddd';
+                baseRow.style.backgroundColor = '#f8f9fa';
+                baseRow.innerHTML = '<td>Base</td>' + trend.waves.map(w => `<td>${{Math.round(w.base)}}</td>`).join('');
+                table.appendChild(baseRow);
+            }}
+
+            container.appendChild(chartContainer);
+            container.appendChild(table);
             return container;
         }}
 
-        function createSection(varMeta, records) {{
+        function createSection(varMeta, getRecords) {{
             const section = document.createElement('div');
             section.className = 'section';
+            section.dataset.var = varMeta.name;
             
             const header = document.createElement('div');
             header.className = 'section-header';
@@ -2703,6 +4877,9 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             const subtitle = document.createElement('div');
             subtitle.className = 'section-subtitle';
             subtitle.textContent = varMeta.spss_type || '';
+            if (WAVES.length > 1 && varMeta.waves && varMeta.waves.length < WAVES.length) {{
+                subtitle.textContent += ' • só nas ondas ' + varMeta.waves.join(', ');
+            }}
             
             header.appendChild(title);
             header.appendChild(subtitle);
@@ -2710,19 +4887,27 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             const content = document.createElement('div');
             content.className = 'section-content';
             
-            // Escolha do renderizador
-            if (varType === 'string') {{
-                content.appendChild(renderStringVariable(varMeta, records));
+            // Escolha do renderizador (cronometrado por variável)
+            const startedAt = performance.now();
+            perfMark('var:' + varMeta.name + ':start');
+            if (WAVES.length > 1 && varType !== 'string' && varType !== 'date') {{
+                content.appendChild(renderTrendVariable(varMeta, getRecords));
+            }} else if (varType === 'string') {{
+                content.appendChild(renderStringVariable(varMeta, getRecords));
             }} else if (varType === 'multiple_response' || varMeta.type === 'mr') {{
-                content.appendChild(renderCategoricalVariable(varMeta, records));
+                content.appendChild(renderCategoricalVariable(varMeta, getRecords));
             }} else if (varType === 'date') {{
-                content.appendChild(renderDateVariable(varMeta, records));
+                content.appendChild(renderDateVariable(varMeta, getRecords));
             }} else if (varType === 'numeric' && measure === 'scale') {{
-                content.appendChild(renderNumericScaleVariable(varMeta, records));
+                content.appendChild(renderNumericScaleVariable(varMeta, getRecords));
             }} else {{
                 // numeric nominal/ordinal ou qualquer categórico
-                content.appendChild(renderCategoricalVariable(varMeta, records));
+                content.appendChild(renderCategoricalVariable(varMeta, getRecords));
             }}
+            perfMark('var:' + varMeta.name + ':end');
+            perfMeasure('var:' + varMeta.name, 'var:' + varMeta.name + ':start', 'var:' + varMeta.name + ':end');
+            try {{ performance.clearMarks('spss:var:' + varMeta.name + ':start'); performance.clearMarks('spss:var:' + varMeta.name + ':end'); }} catch (e) {{}}
+            PERF.variables[varMeta.name] = performance.now() - startedAt;
             section.appendChild(header);
             section.appendChild(content);            
             return section;
@@ -2738,6 +4923,11 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
         }});
 
         document.addEventListener('keydown', function(event) {{
+            if (event.ctrlKey && event.shiftKey && (event.key === 'D' || event.key === 'd')) {{
+                event.preventDefault();
+                togglePerfPanel();
+                return;
+            }}
             if (event.key === 'Escape') {{
                 document.querySelectorAll('.dropdown-content').forEach(d => d.classList.remove('show'));
                 document.querySelectorAll('.dropdown-button').forEach(b => b.classList.remove('open'));
@@ -2756,20 +4946,26 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             sections.forEach(section => {{
                 const titleEl = section.querySelector('.section-title');
                 const table = section.querySelector('table');
+                // Blocos virtualizados fornecem as linhas diretamente (não há tabela completa no DOM)
+                const exportable = section.querySelector('.virtual-export');
 
-                if (!table) return;
+                if (!table && !(exportable && exportable.exportRows)) return;
 
                 const title = titleEl ? titleEl.innerText.trim() : "Variável";
 
                 // Extrair linhas
-                const rows = [];
-                table.querySelectorAll('tr').forEach(tr => {{
-                    const row = [];
-                    tr.querySelectorAll('th, td').forEach(cell => {{
-                        row.push(cell.innerText.trim());
+                let rows = [];
+                if (exportable && exportable.exportRows) {{
+                    rows = exportable.exportRows();
+                }} else {{
+                    table.querySelectorAll('tr').forEach(tr => {{
+                        const row = [];
+                        tr.querySelectorAll('th, td').forEach(cell => {{
+                            row.push(cell.innerText.trim());
+                        }});
+                        rows.push(row);
                     }});
-                    rows.push(row);
-                }});
+                }}
 
                 // Criar aba
                 const ws = XLSX.utils.aoa_to_sheet([
@@ -2817,6 +5013,13 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                     }}
                 }}
             }});
+
+            const selectedRanges = getSelectedRanges();
+            Object.keys(selectedRanges).forEach(filterName => {{
+                const rf = RANGE_FILTERS.find(f => f.name === filterName);
+                const [from, to] = selectedRanges[filterName];
+                activeFilters.push(`${{rf.title}}: ${{formatRangeValue(rf, from === null ? rf.min : from)}} a ${{formatRangeValue(rf, to === null ? rf.max : to)}}`);
+            }});
             
             return activeFilters.length > 0 ? activeFilters : ['Nenhum filtro aplicado'];
         }}
@@ -2832,7 +5035,7 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
             }});
             
             // Extrair informações dos dados globais
-            const totalRecords = RECORDS.length;
+            const totalRecords = totalRespondents();
             const totalVars = VARS_META.length;
             const activeFilters = getActiveFiltersDescription();
             
@@ -2854,7 +5057,7 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                 
                 <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; font-size: 16px;">
                     <div>
-                        <p style="margin: 5px 0;"><strong>📂 Arquivo:</strong> {file_source}</p>
+                        <p style="margin: 5px 0;"><strong>📂 Arquivo:</strong> ${{escapeHtml(ANALYSIS_SOURCE)}}</p>
                         <p style="margin: 5px 0;"><strong>📅 Gerado em:</strong> ${{dateStr}}</p>
                     </div>
                     <div>
@@ -2915,7 +5118,7 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                 // Informações do cabeçalho
                 const now = new Date();
                 const dateStr = now.toLocaleString('pt-BR');
-                const totalRecords = RECORDS.length;
+                const totalRecords = totalRespondents();
                 const totalVars = VARS_META.length;
                 const activeFilters = getActiveFiltersDescription();
                 
@@ -2963,7 +5166,7 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
                     <h1 style="color: #4A90E2; text-align: center; margin-bottom: 20px;">📋 DASHBOARD DE ANÁLISE - PESQUISA SPSS</h1>
                     <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; font-size: 14px;">
                         <div>
-                            <div style="margin: 4px 0;"><strong>📂 Arquivo:</strong> {file_source}</div>
+                            <div style="margin: 4px 0;"><strong>📂 Arquivo:</strong> ${{escapeHtml(ANALYSIS_SOURCE)}}</div>
                             <div style="margin: 4px 0;"><strong>📅 Gerado em:</strong> ${{dateStr}}</div>
                             <div style="margin: 4px 0;"><strong>📅 Período de coleta:</strong> ${{periodoColeta}}</div>
                         </div>
@@ -3098,251 +5301,1177 @@ def render_html_with_working_filters(file_source: str, created_at: str, client_n
     </script>
 </body>
 </html>"""
+    PROFILER.end()
+    return html
 
-# ========== INTERFACE GRÁFICA CORRIGIDA ==========
 
-def run_gui() -> int:
-    """Interface gráfica CORRIGIDA - exportselection=False é a chave"""
+def render_data_module(analysis_id: str, file_source: str, created_at: str, client_name: str,
+                       vars_meta: List[dict], filters_meta: List[dict], records: List[dict],
+                       value_orders: dict, code_to_label: dict, title: str = "",
+                       waves: Optional[List[str]] = None, html_hash: str = "") -> str:
+    """
+    Módulo só de dados (<análise>.data.js) para o runtime único do Dashboard Master:
+    registra a análise em window.SPSS_ANALYSES; a página do runtime (gerada com
+    runtime=True) aplica os dados com loadDataset sem recarregar bibliotecas.
+    html_hash (SHA-256[:12] do HTML gerado junto) vai no cabeçalho: o master
+    reextrai o módulo quando o HTML da análise muda sem um novo módulo.
+    """
+    payload = {
+        "title": title or client_name or os.path.splitext(file_source)[0],
+        "file_source": file_source,
+        "created_at": created_at,
+        "vars_meta": vars_meta,
+        "filters_meta": filters_meta,
+        "records": records,
+        "value_orders": value_orders,
+        "code_to_label": code_to_label,
+        "waves": waves or [],
+    }
+    return (
+        f"// Dados da análise {json.dumps(analysis_id, ensure_ascii=False)} — runtime único do Dashboard Master"
+        f"{f' (html {html_hash})' if html_hash else ''}\n"
+        f"(window.SPSS_ANALYSES = window.SPSS_ANALYSES || {{}})[{json.dumps(analysis_id, ensure_ascii=False)}] = "
+        f"{json.dumps(payload, ensure_ascii=False)};\n"
+    )
+
+
+def build_dashboard_search_index(vars_meta: List[dict], records: List[dict]) -> dict:
+    """
+    Índice de busca da página para o Dashboard Master: nome, título e, nas MR, os
+    rótulos das opções de cada variável. O master junta os índices de todas as
+    análises num só, sem precisar abrir nenhuma delas.
+    """
+    variables = []
+    for v in vars_meta:
+        entry = {"name": v["name"], "title": v.get("title") or v["name"]}
+        if v.get("type") == "mr":
+            options = set()
+            for rec in records:
+                value = rec.get(v["name"])
+                if isinstance(value, list):
+                    options.update(value)
+            entry["options"] = sorted(options)
+        variables.append(entry)
+    return {"variables": variables}
+
+def write_search_index(out_path: str, vars_meta: List[dict], records: List[dict]) -> str:
+    """Grava <saída>.search.json ao lado do HTML e devolve o caminho"""
+    index_path = os.path.splitext(out_path)[0] + ".search.json"
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(build_dashboard_search_index(vars_meta, records), f, ensure_ascii=False, separators=(",", ":"))
+    return index_path
+
+def build_analysis_summary(file_source: str, created_at: str, vars_meta: List[dict],
+                           filters_meta: List[dict], records: List[dict],
+                           payload_bytes: int, build_seconds: float) -> dict:
+    """
+    Resumo da análise para os cartões do Dashboard Master: N, N ponderado, período
+    de coleta (mesmos campos de data que o cabeçalho do PDF usa), nº de variáveis,
+    tamanho da página e tempo de geração.
+    """
+    weighted = sum(float(rec.get("__weight__", 1.0) or 0.0) for rec in records)
+    dates = []
+    date_keys = [k for k in (records[0] if records else {})
+                 if any(part in k.lower() for part in ("submit", "date", "data"))]
+    for rec in records:
+        for key in date_keys:
+            value = rec.get(key)
+            if isinstance(value, str):
+                try:
+                    dates.append(datetime.fromisoformat(value))
+                except ValueError:
+                    continue
+    return {
+        "file_source": file_source,
+        "created_at": created_at,
+        "respondents": len(records),
+        "weighted_respondents": round(weighted, 1),
+        "weighted": any(rec.get("__weight__", 1.0) != 1.0 for rec in records),
+        "period": {"start": min(dates).date().isoformat(), "end": max(dates).date().isoformat()} if dates else None,
+        "variables": len(vars_meta),
+        "filters": len(filters_meta),
+        "payload_bytes": payload_bytes,
+        "build_seconds": round(build_seconds, 2),
+    }
+
+def write_analysis_summary(out_path: str, summary: dict) -> str:
+    """Grava <saída>.summary.json ao lado do HTML e devolve o caminho"""
+    summary_path = os.path.splitext(out_path)[0] + ".summary.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary_path
+
+TABLE_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def _dictionary_array(values: List[Optional[str]], categories: Optional[List[str]] = None,
+                      ordered: bool = False) -> "pa.DictionaryArray":
+    """Categórica dicionarizada: categorias dadas primeiro, as demais na ordem em que aparecem."""
+    dictionary = list(categories or [])
+    ids = {value: i for i, value in enumerate(dictionary)}
+    indices = []
+    for value in values:
+        if value is None:
+            indices.append(None)
+            continue
+        if value not in ids:
+            ids[value] = len(dictionary)
+            dictionary.append(value)
+        indices.append(ids[value])
+    return pa.DictionaryArray.from_arrays(
+        pa.array(indices, pa.int32()), pa.array(dictionary, pa.string()), ordered=ordered
+    )
+
+def _timestamp_or_text(values: list) -> Tuple["pa.Array", str]:
+    """Campos de data extras (ISO do build_records_and_meta) em timestamp; se não forem, texto."""
     try:
-        # 1. SELEÇÃO DO ARQUIVO
-        root = tk.Tk()
-        root.withdraw()
-        
-        in_path = filedialog.askopenfilename(
-            title="Selecione o arquivo .sav (SPSS)",
-            filetypes=[("SPSS files", "*.sav"), ("All files", "*.*")]
-        )
-        
-        if not in_path:
-            print("❌ Nenhum arquivo selecionado.")
-            return 1
-        
-        print(f"📂 Carregando: {os.path.basename(in_path)}")
-        
+        parsed = [datetime.fromisoformat(v) if v else None for v in values]
+        return pa.array(parsed, pa.timestamp("us")), "timestamp"
+    except (TypeError, ValueError):
+        return pa.array([None if v is None else str(v) for v in values], pa.string()), "string"
+
+def build_respondent_table(vars_meta: List[dict], filters_meta: List[dict], records: List[dict],
+                           value_orders: dict, code_to_label: dict) -> Tuple["pa.Table", Dict[str, str]]:
+    """
+    Tabela de respondentes processada (saída de build_records_and_meta) em Arrow,
+    uma linha por registro, para outras ferramentas não relerem o .sav:
+      - __weight__ em float64;
+      - filtros categóricos e variáveis categóricas dicionarizados, com o rótulo
+        que o dashboard exibe (code_to_label aplicado; ordinais na ordem SPSS de
+        value_orders, marcados como ordenados);
+      - MR como lista das opções marcadas (lista de dicionarizado);
+      - escalas em float64, datas das variáveis em date32, demais campos de data
+        (submitdate...) em timestamp, respostas abertas em texto.
+    Retorna (tabela, tipo de cada coluna) — os tipos vão para o sidecar.
+    """
+    columns: Dict[str, "pa.Array"] = {}
+    kinds: Dict[str, str] = {}
+
+    def column(name: str) -> list:
+        return [rec.get(name) for rec in records]
+
+    def text(value) -> Optional[str]:
+        return None if value is None else (value if isinstance(value, str) else js_string(value))
+
+    def labelled(name: str, values: list) -> List[Optional[str]]:
+        # Mesmo rótulo do displayLabelFor da página (ordinais guardam o código nos registros)
+        labels = code_to_label.get(name) or {}
+        return [None if v is None else labels.get(v, v) for v in map(text, values)]
+
+    weights = np.array([rec.get("__weight__", 1.0) for rec in records], dtype=float)
+    columns["__weight__"] = pa.array(weights, pa.float64())
+    kinds["__weight__"] = "weight"
+
+    var_names = {vm["name"] for vm in vars_meta}
+    for fm in filters_meta:
+        name = fm["name"]
+        if fm.get("kind") == "range" or name in var_names or not records or name not in records[0]:
+            continue
+        columns[name] = _dictionary_array([text(v) for v in column(name)], [str(v) for v in fm["values"]])
+        kinds[name] = "filter"
+
+    for vm in vars_meta:
+        name = vm["name"]
+        values = column(name)
+        var_type = vm.get("var_type") or vm.get("type") or "single"
+        if var_type == "multiple_response" or vm.get("type") == "mr":
+            offsets, options = [0], []
+            for v in values:
+                options.extend(labelled(name, v if isinstance(v, list) else [] if v is None else [v]))
+                offsets.append(len(options))
+            columns[name] = pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), _dictionary_array(options))
+            kinds[name] = "multiple_response"
+        elif var_type == "string":
+            columns[name] = pa.array([text(v) for v in values], pa.string())
+            kinds[name] = "string"
+        elif var_type == "date":
+            columns[name] = pa.array(
+                [datetime.strptime(v, "%Y-%m-%d").date() if v else None for v in values], pa.date32()
+            )
+            kinds[name] = "date"
+        elif var_type == "numeric" and vm.get("measure") == "scale":
+            numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+            columns[name] = pa.array(numbers, pa.float64(), from_pandas=True)
+            kinds[name] = "scale"
+        else:
+            ordinal = vm.get("measure") == "ordinal"
+            order = [text(v) for v in value_orders.get(name, [])] if ordinal else None
+            columns[name] = _dictionary_array(labelled(name, values), order, ordered=ordinal)
+            kinds[name] = "categorical"
+
+    # Demais campos dos registros: datas de coleta (submitdate...) e a onda
+    for name in (records[0] if records else {}):
+        if name in columns:
+            continue
+        if name == WAVE_FILTER:
+            columns[name] = _dictionary_array(column(name))
+            kinds[name] = "filter"
+        else:
+            columns[name], kinds[name] = _timestamp_or_text(column(name))
+
+    return pa.table(columns), kinds
+
+def write_respondent_table(out_path: str, fmt: str, file_source: str, created_at: str, client_name: str,
+                           vars_meta: List[dict], filters_meta: List[dict], records: List[dict],
+                           value_orders: dict, code_to_label: dict,
+                           waves: Optional[List[str]] = None) -> Tuple[str, str]:
+    """
+    Grava <saída>.parquet ou <saída>.arrow (Arrow IPC sem compressão, para abrir
+    com pa.memory_map + pa.ipc.open_file sem cópia) e <saída>.vars_meta.json com
+    os metadados (variáveis, filtros, ordem dos valores, código → rótulo e o tipo
+    de cada coluna). Devolve (tabela, sidecar).
+    """
+    if pa is None:
+        raise RuntimeError("exportar a tabela requer pyarrow (pip install pyarrow --break-system-packages)")
+    base = os.path.splitext(out_path)[0]
+    table_path = base + TABLE_FORMATS[fmt]
+    sidecar_path = base + ".vars_meta.json"
+
+    table, kinds = build_respondent_table(vars_meta, filters_meta, records, value_orders, code_to_label)
+    table = table.replace_schema_metadata({
+        "spss_dashboard": json.dumps({
+            "file_source": file_source,
+            "created_at": created_at,
+            "vars_meta": os.path.basename(sidecar_path),
+        }, ensure_ascii=False),
+    })
+    if fmt == "parquet":
+        pq.write_table(table, table_path)
+    else:
+        with pa.OSFile(table_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    sidecar = {
+        "file_source": file_source,
+        "created_at": created_at,
+        "client_name": client_name,
+        "table": os.path.basename(table_path),
+        "format": fmt,
+        "rows": table.num_rows,
+        "columns": kinds,
+        "waves": waves or [],
+        "vars_meta": vars_meta,
+        # Filtros de intervalo sem os valores ordenados/permutação (a coluna já está na tabela)
+        "filters_meta": [
+            {k: v for k, v in fm.items() if k not in ("sorted_values", "order")} for fm in filters_meta
+        ],
+        "value_orders": value_orders,
+        "code_to_label": code_to_label,
+    }
+    with open(sidecar_path, "w", encoding="utf-8") as f:
+        json.dump(sidecar, f, ensure_ascii=False, indent=2)
+    return table_path, sidecar_path
+
+def build_label_dictionary(vars_meta: List[dict], filters_meta: List[dict],
+                           value_orders: dict, code_to_label: dict) -> dict:
+    """
+    Dicionário de rótulos de um questionário: títulos das variáveis e filtros,
+    valores dos filtros categóricos, ordem dos valores e código → rótulo — a parte
+    que se repete entre as ondas e os públicos de um mesmo projeto.
+    """
+    return {
+        "titles": {item["name"]: item.get("title") or item["name"] for item in list(vars_meta) + list(filters_meta)},
+        "filter_values": {f["name"]: f["values"] for f in filters_meta if f.get("kind") != "range"},
+        "value_orders": value_orders,
+        "code_to_label": code_to_label,
+    }
+
+def read_label_dictionary(path: str) -> dict:
+    """Dicionário gravado por shared_label_dictionary"""
+    with open(path, "r", encoding="utf-8") as f:
+        match = re.search(r"\] = (\{.*\});\s*$", f.read(), re.DOTALL)
+    if not match:
+        raise ValueError(f"{path}: dicionário de rótulos inválido")
+    return json.loads(match.group(1))
+
+def shared_label_dictionary(out_dir: str, project: str, dictionary: dict) -> Tuple[str, dict]:
+    """
+    Dicionário de rótulos do projeto em out_dir: <projeto>.labels.<hash>.js.
+    Se já existe, o mais recente é reaproveitado sem alteração: o dicionário é o da
+    primeira página gravada, e cada página seguinte guarda embutido o que difere
+    dele (strip_shared_labels), como rótulos mudados ou variáveis novas. Senão é
+    gravado a partir do dicionário desta página. O hash do conteúdo no nome deixa
+    o navegador guardar o arquivo em cache uma vez para todas as ondas; apagar o
+    arquivo faz a próxima página gravar um novo. Retorna (nome do arquivo, dicionário).
+    """
+    out_dir = out_dir or "."
+    pattern = re.compile(rf"^{re.escape(project)}\.labels\.[0-9a-f]+\.js$")
+    existing = sorted((f for f in os.listdir(out_dir) if pattern.match(f)),
+                      key=lambda f: os.path.getmtime(os.path.join(out_dir, f)))
+    if existing:
+        return existing[-1], read_label_dictionary(os.path.join(out_dir, existing[-1]))
+
+    payload = json.dumps(dictionary, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    labels_file = f"{project}.labels.{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]}.js"
+    with open(os.path.join(out_dir, labels_file), "w", encoding="utf-8") as f:
+        f.write(f"// Dicionário de rótulos do projeto {json.dumps(project, ensure_ascii=False)} — compartilhado pelos dashboards\n")
+        f.write(f"(window.SPSS_LABELS = window.SPSS_LABELS || {{}})[{json.dumps(labels_file, ensure_ascii=False)}] = {payload};\n")
+    return labels_file, dictionary
+
+def strip_shared_labels(shared: dict, vars_meta: List[dict], filters_meta: List[dict],
+                        value_orders: dict, code_to_label: dict):
+    """
+    Cópias de vars_meta, filters_meta, value_orders e code_to_label sem o que já
+    está no dicionário compartilhado, e as chaves tiradas de value_orders e
+    code_to_label ({"value_orders": [...], "code_to_label": [...]}): applySharedLabels,
+    no JavaScript, completa só essas, sem trazer variáveis que a página não tem.
+    """
+    titles = shared["titles"]
+    filter_values = shared["filter_values"]
+    vars_out = [{k: v for k, v in vm.items() if not (k == "title" and v == titles.get(vm["name"]))}
+                for vm in vars_meta]
+    filters_out = []
+    for fm in filters_meta:
+        fm = {k: v for k, v in fm.items() if not (k == "title" and v == titles.get(fm["name"]))}
+        if fm.get("kind") != "range" and fm.get("values") == filter_values.get(fm["name"]):
+            del fm["values"]
+        filters_out.append(fm)
+    orders_out = {k: v for k, v in value_orders.items() if shared["value_orders"].get(k) != v}
+    labels_out = {k: v for k, v in code_to_label.items() if shared["code_to_label"].get(k) != v}
+    stripped = {"value_orders": sorted(set(value_orders) - set(orders_out)),
+                "code_to_label": sorted(set(code_to_label) - set(labels_out))}
+    return vars_out, filters_out, orders_out, labels_out, stripped
+
+
+def render_runtime_html() -> str:
+    """Página do runtime único (sem dados), embutida pelo Dashboard Master no modo runtime."""
+    return render_html_with_working_filters("", "", "", [], [], [], {}, {}, runtime=True)
+
+# ========== MODO SERVIDOR (API LOCAL DE AGREGAÇÃO) ==========
+# Para pesquisas grandes demais para embutir: as colunas ficam na memória do
+# gerador e a página (sem RECORDS) pede os agregados de cada estado de filtro
+# a uma API HTTP em localhost. Nada sai da máquina.
+
+SERVER_HOST = "127.0.0.1"
+SERVER_DEFAULT_PORT = 8765
+SERVER_ENDPOINT = "api/aggregate"
+SERVER_CACHE_MAX = 64
+SERVER_MAX_BODY = 1024 * 1024
+
+def js_string(value) -> str:
+    """String(v) do JavaScript para valores de registro (5.0 → "5", True → "true")."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def normalize_response(text) -> str:
+    """Mesma normalização das respostas abertas na página (normalizeText)."""
+    if text is None:
+        return ""
+    t = str(text).strip()
+    if not t or t == "99":
+        return ""
+    return t[:1].upper() + t[1:].lower()
+
+def weighted_stats(values: np.ndarray, weights: np.ndarray) -> Optional[dict]:
+    """Versão vetorizada do compute_stats de build_records_and_meta (mesma mediana aproximada)."""
+    total_weight = float(weights.sum())
+    if values.size == 0 or total_weight == 0:
+        return None
+    mean = float((values * weights).sum() / total_weight)
+    expanded = np.sort(np.repeat(values, np.maximum(1, np.rint(weights)).astype(np.int64)))
+    return {
+        "n": int(round(total_weight)),
+        "mean": mean,
+        "median": float(np.median(expanded)),
+        "stddev": float(np.sqrt((weights * (values - mean) ** 2).sum() / total_weight)),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+
+def compact_range_filter(range_filter: dict) -> dict:
+    """
+    Filtro de intervalo da página do modo servidor: valores distintos e contagens
+    acumuladas (cumulative[k] = nº de valores antes do k‑ésimo) no lugar da
+    permutação dos registros, que a página não tem.
+    """
+    distinct, cumulative = [], []
+    for i, value in enumerate(range_filter["sorted_values"]):
+        if not distinct or value != distinct[-1]:
+            distinct.append(value)
+            cumulative.append(i)
+    cumulative.append(len(range_filter["sorted_values"]))
+    compact = {k: v for k, v in range_filter.items() if k not in ("sorted_values", "order")}
+    compact.update(sorted_values=distinct, cumulative=cumulative)
+    return compact
+
+class ColumnStore:
+    """
+    Colunas de build_records_and_meta em vetores NumPy, para a API do modo servidor.
+
+    Cada variável vira códigos de categoria (MR explodida em pares registro/item),
+    valores numéricos ou respostas já normalizadas; cada filtro, um vetor de códigos
+    (categórico) ou os valores ordenados + permutação (intervalo). Uma consulta vira
+    máscaras booleanas e somas ponderadas com np.bincount, seguindo as mesmas regras
+    dos agregadores da página; as respostas ficam num cache LRU por consulta.
+    """
+
+    def __init__(self, vars_meta: List[dict], filters_meta: List[dict], records: List[dict],
+                 cache_size: int = SERVER_CACHE_MAX):
+        self.vars_meta = vars_meta
+        self.total = len(records)
+        # r.__weight__ || 1.0: peso ausente, zero ou NaN conta como 1
+        weights = np.array([r.get("__weight__") for r in records], dtype=float)
+        weights[np.isnan(weights) | (weights == 0)] = 1.0
+        self.weights = weights
+
+        self.filters: Dict[str, dict] = {}
+        self.ranges: Dict[str, dict] = {}
+        for fm in filters_meta:
+            if fm.get("kind") == "range":
+                self.ranges[fm["name"]] = {
+                    "values": fm["sorted_values"],
+                    "order": np.asarray(fm["order"], dtype=np.int64),
+                    "value_type": fm.get("value_type"),
+                }
+                continue
+            ids = {str(value).strip(): i for i, value in enumerate(fm["values"])}
+            codes = np.full(self.total, -1, dtype=np.int64)
+            for i, r in enumerate(records):
+                v = r.get(fm["name"])
+                if v is not None:
+                    codes[i] = ids.get(js_string(v).strip(), -1)
+            self.filters[fm["name"]] = {"values": fm["values"], "codes": codes}
+
+        self.columns = {vm["name"]: self._build_column(vm, records) for vm in vars_meta}
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @staticmethod
+    def variable_kind(vm: dict) -> str:
+        """Tipo de agregado da variável, na mesma ordem de decisão do createSection."""
+        var_type = vm.get("var_type") or vm.get("type") or "single"
+        if var_type == "string":
+            return "string"
+        if var_type == "multiple_response" or vm.get("type") == "mr":
+            return "categorical"
+        if var_type == "date":
+            return "date"
+        if var_type == "numeric" and vm.get("measure") == "scale":
+            return "scale"
+        return "categorical"
+
+    def _build_column(self, vm: dict, records: List[dict]) -> dict:
+        name = vm["name"]
+        kind = self.variable_kind(vm)
+        values = [r.get(name) for r in records]
+        if kind == "scale":
+            numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+            return {"kind": kind, "values": numbers}
+        if kind == "string":
+            normalized = np.array([normalize_response(v) for v in values], dtype=object)
+            return {
+                "kind": kind,
+                "responses": normalized,
+                "valid": normalized != "",
+                "texts": np.array([v if v else "" for v in values], dtype=object),
+            }
+        # Categórica/data: chave = String(v) (aparada nas categóricas), em pares registro/código
+        trim = kind == "categorical"
+        labels: List[str] = []
+        label_ids: Dict[str, int] = {}
+        rows: List[int] = []
+        codes: List[int] = []
+        for i, v in enumerate(values):
+            for item in (v if isinstance(v, list) else [v]):
+                if item is None:
+                    continue
+                key = js_string(item)
+                if not key.strip():
+                    continue
+                if trim:
+                    key = key.strip()
+                code = label_ids.get(key)
+                if code is None:
+                    code = label_ids[key] = len(labels)
+                    labels.append(key)
+                rows.append(i)
+                codes.append(code)
+        return {
+            "kind": kind,
+            "labels": labels,
+            "rows": np.array(rows, dtype=np.int64),
+            "codes": np.array(codes, dtype=np.int64),
+        }
+
+    # ----- Consulta -----
+
+    def check_query(self, query) -> dict:
+        """
+        Valida o corpo de uma consulta: filters = {filtro: [valores (texto)]} e
+        ranges = {filtro: [mínimo, máximo]}, com números (datas: "AAAA-MM-DD") ou
+        null. Levanta ValueError (resposta 400) antes de a consulta virar chave do cache.
+        """
+        if not isinstance(query, dict):
+            raise ValueError("a consulta deve ser um objeto JSON")
+        filters = query.get("filters") or {}
+        if not isinstance(filters, dict):
+            raise ValueError("filters deve ser um objeto {filtro: [valores]}")
+        for name, selected in filters.items():
+            if name not in self.filters:
+                raise ValueError(f"filtro desconhecido: {name}")
+            if not isinstance(selected, list) or not all(isinstance(v, str) for v in selected):
+                raise ValueError(f"filtro {name}: esperada uma lista de valores (texto)")
+        ranges = query.get("ranges") or {}
+        if not isinstance(ranges, dict):
+            raise ValueError("ranges deve ser um objeto {filtro: [mínimo, máximo]}")
+        for name, bounds in ranges.items():
+            rf = self.ranges.get(name)
+            if rf is None:
+                raise ValueError(f"filtro de intervalo desconhecido: {name}")
+            if rf["value_type"] == "date":
+                valid = lambda b: isinstance(b, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", b)
+                expected = "datas AAAA-MM-DD"
+            else:
+                valid = lambda b: isinstance(b, (int, float)) and not isinstance(b, bool) and np.isfinite(b)
+                expected = "números"
+            if not isinstance(bounds, list) or len(bounds) != 2 or not all(b is None or valid(b) for b in bounds):
+                raise ValueError(f"intervalo {name}: esperado [mínimo, máximo] com {expected} ou null")
+        return {"filters": filters, "ranges": ranges}
+
+    def _masks(self, query: dict) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """Vetor "passa" de cada filtro categórico e de cada intervalo ativo."""
+        passes: Dict[str, np.ndarray] = {}
+        for name, selected in (query.get("filters") or {}).items():
+            f = self.filters.get(name)
+            if f is None:
+                raise ValueError(f"filtro desconhecido: {name}")
+            chosen = set(selected)
+            if not chosen:
+                continue
+            ids = [i for i, value in enumerate(f["values"]) if value in chosen]
+            passes[name] = np.isin(f["codes"], ids)
+        range_passes: Dict[str, np.ndarray] = {}
+        for name, bounds in (query.get("ranges") or {}).items():
+            rf = self.ranges.get(name)
+            if rf is None:
+                raise ValueError(f"filtro de intervalo desconhecido: {name}")
+            low, high = bounds
+            a = bisect.bisect_left(rf["values"], low) if low is not None else 0
+            b = bisect.bisect_right(rf["values"], high) if high is not None else len(rf["values"])
+            mask = np.zeros(self.total, dtype=bool)
+            mask[rf["order"][a:b]] = True
+            range_passes[name] = mask
+        return passes, range_passes
+
+    def _facets(self, passes: Dict[str, np.ndarray], fails: np.ndarray) -> Dict[str, list]:
+        """Contagem de cada opção sob os DEMAIS filtros (mesma regra do computeFacetCounts)."""
+        facets = {}
+        for name, f in self.filters.items():
+            mask = fails == 0
+            if name in passes:
+                mask = mask | ((fails == 1) & ~passes[name])
+            mask &= f["codes"] >= 0
+            facets[name] = np.bincount(
+                f["codes"][mask], weights=self.weights[mask], minlength=len(f["values"])
+            ).tolist()
+        return facets
+
+    def _aggregate(self, column: dict, mask: np.ndarray) -> dict:
+        kind = column["kind"]
+        if kind == "scale":
+            selected = mask & ~np.isnan(column["values"])
+            values = column["values"][selected]
+            weights = self.weights[selected]
+            if values.size == 0:
+                return {"kind": kind, "histogram": None, "stats": None}
+            low, high = float(values.min()), float(values.max())
+            bin_size = ((high - low) or 1) / HISTOGRAM_BINS
+            idx = np.clip(np.floor((values - low) / bin_size), 0, HISTOGRAM_BINS - 1).astype(np.int64)
+            bins = np.bincount(idx, weights=weights, minlength=HISTOGRAM_BINS)
+            return {
+                "kind": kind,
+                "histogram": {"min": low, "max": high, "bins": bins.tolist(), "totalCases": float(weights.sum())},
+                "stats": weighted_stats(values, weights),
+            }
+        if kind == "string":
+            selected = mask & column["valid"]
+            texts = [t for t in column["texts"][mask] if t]
+            return {
+                "kind": kind,
+                "responses": column["responses"][selected].tolist(),
+                "keywords": extract_keywords_from_texts(texts) if texts else [],
+            }
+        # Categórica/data: frequências na ordem em que aparecem no recorte (como o JS)
+        keep = mask[column["rows"]]
+        codes = column["codes"][keep]
+        weights = self.weights[column["rows"][keep]]
+        sums = np.bincount(codes, weights=weights, minlength=len(column["labels"]))
+        present, first = np.unique(codes, return_index=True)
+        freq = {column["labels"][code]: float(sums[code]) for code in present[np.argsort(first)]}
+        return {"kind": kind, "freq": freq, "validCount": float(weights.sum())}
+
+    def aggregate(self, query: dict) -> dict:
+        """Base, facetas e agregado bruto de cada variável sob os filtros da consulta."""
+        passes, range_passes = self._masks(query)
+        fails = np.zeros(self.total, dtype=np.int64)
+        for mask in list(passes.values()) + list(range_passes.values()):
+            fails += ~mask
+        selected = fails == 0
+        return {
+            "count": int(selected.sum()),
+            "facets": self._facets(passes, fails),
+            "variables": {
+                vm["name"]: self._aggregate(self.columns[vm["name"]], selected) for vm in self.vars_meta
+            },
+        }
+
+    def query_json(self, body: bytes) -> bytes:
+        """Resposta JSON (em cache LRU pela consulta canônica) para o corpo de um POST."""
+        query = self.check_query(json.loads(body.decode("utf-8") or "{}"))
+        key = json.dumps({
+            "filters": {k: sorted(v) for k, v in query["filters"].items() if v},
+            "ranges": query["ranges"],
+        }, sort_keys=True, ensure_ascii=False)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+        started = time.perf_counter()
+        payload = json.dumps(self.aggregate(query), ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self.cache_misses += 1
+            self._cache[key] = payload
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        log.debug("🧮 Consulta agregada em %.1f ms: %s", (time.perf_counter() - started) * 1000, key)
+        return payload
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "records": self.total,
+            "variables": len(self.vars_meta),
+            "cache": {"size": len(self._cache), "hits": self.cache_hits, "misses": self.cache_misses},
+        }
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+async def serve_dashboard(store: ColumnStore, page_html: str, host: str = SERVER_HOST,
+                          port: int = SERVER_DEFAULT_PORT, ready: Optional[Callable[[int], None]] = None) -> None:
+    """
+    Servidor HTTP mínimo (asyncio, sem dependências) do modo servidor:
+      GET  /                 página do dashboard (sem RECORDS)
+      POST /api/aggregate    {filters: {nome: [valores]}, ranges: {nome: [de, até]}} → agregados
+      GET  /api/health       estado do servidor e do cache
+    A agregação roda numa thread para não travar o laço de eventos.
+    ready(porta), se informado, é chamado quando o servidor já aceita conexões.
+    """
+    page = page_html.encode("utf-8")
+
+    async def route(method: str, path: str, body: bytes) -> Tuple[int, str, bytes]:
+        if path in ("/", "/index.html"):
+            if method != "GET":
+                return 405, "text/plain; charset=utf-8", b"GET"
+            return 200, "text/html; charset=utf-8", page
+        if path == "/api/health":
+            return 200, "application/json", json.dumps(store.health()).encode("utf-8")
+        if path == "/" + SERVER_ENDPOINT:
+            if method != "POST":
+                return 405, "text/plain; charset=utf-8", b"POST"
+            try:
+                return 200, "application/json", await asyncio.to_thread(store.query_json, body)
+            except (ValueError, TypeError) as e:
+                return 400, "application/json", json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+        return 404, "text/plain; charset=utf-8", b"not found"
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
         try:
-            df, meta = read_sav_auto(in_path)
-            fix_labels_in_meta(meta)
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar arquivo:\\n{str(e)}")
-            return 2
-        
-        print(f"✅ Arquivo carregado: {len(df)} registros, {len(df.columns)} variáveis")
-        
-        # Obter labels das variáveis
-        labels = {}
-        for col in df.columns:
-            label = get_var_label(meta, col)
-            labels[col] = label if label else ""
-        
-        # Configurar estilo moderno para componentes ttk
-        style = ttk.Style()
-        style.theme_use('clam')
-        
-        # Estilo para combobox
-        style.configure("Modern.TCombobox", 
-                       fieldbackground="white",
-                       background="#f8f9fa",
-                       foreground="#2c3e50",
-                       borderwidth=1,
-                       relief="solid")
-        
-        # Configurar cores padrão para melhor visibilidade
-        style.configure("TLabel", background="#f8f9fa", foreground="#2c3e50")
-        style.configure("TFrame", background="#f8f9fa")
-        
-        # 2. JANELA DE SELEÇÃO - Layout moderno melhorado
-        root.deiconify()
-        root.title("📊 Dashboard SPSS Universal - Seleção de Variáveis")
-        root.geometry("1400x800")
-        root.minsize(1200, 700)
-        root.configure(bg="#f8f9fa")
-        
-        # Configurar cores padrão para evitar problemas de sistema
-        root.option_add('*TkDefaultFont', 'Segoe UI 10')
-        root.option_add('*Background', '#f8f9fa')
-        root.option_add('*Foreground', '#2c3e50')
-        
-        # Configurar grid weights para responsividade
-        root.grid_columnconfigure(0, weight=1)
-        root.grid_rowconfigure(0, weight=1)
-        
-        # Frame principal com melhor padding
-        main_frame = tk.Frame(root, bg="#f8f9fa")
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=25, pady=20)
-        
-        # Header melhorado
-        header_frame = tk.Frame(main_frame, bg="#f8f9fa")
-        header_frame.pack(fill=tk.X, pady=(0, 25))
-        
-        # Título principal
-        title_label = tk.Label(header_frame, 
-                              text="📊 Dashboard SPSS Universal", 
-                              font=("Segoe UI", 24, "bold"), 
-                              fg="#2c3e50", bg="#f8f9fa")
-        title_label.pack()
-        
-        # Subtítulo com informações do arquivo
-        subtitle_label = tk.Label(header_frame,
-                                 text=f"📁 {os.path.basename(in_path)} • {len(df):,} registros • {len(df.columns)} variáveis",
-                                 font=("Segoe UI", 12), 
-                                 fg="#7f8c8d", bg="#f8f9fa")
-        subtitle_label.pack(pady=(5, 0))
-        
-        # Container principal para as listas
-        content_frame = tk.Frame(main_frame, bg="#f8f9fa")
-        content_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Frame para listboxes lado a lado com melhor espaçamento
-        lists_frame = tk.Frame(content_frame, bg="#f8f9fa")
-        lists_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 20))
-        
-        # VARIÁVEIS PRINCIPAIS (lado esquerdo) - Layout melhorado
-        vars_frame = tk.LabelFrame(lists_frame, text="📊 VARIÁVEIS PARA O RELATÓRIO", 
-                                  font=("Segoe UI", 14, "bold"), fg="#2980b9", bg="#f8f9fa",
-                                  relief="solid", borderwidth=1, padx=15, pady=15)
-        vars_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 15))
-        
-        # Informações melhoradas das variáveis principais
-        vars_info = tk.Label(vars_frame, 
-                            text="Selecione as variáveis para análise:\n• Ctrl/Cmd + clique: múltiplas seleções\n• Shift + clique: intervalos",
-                            font=("Segoe UI", 11), fg="#5d6d7e", bg="#f8f9fa", justify=tk.LEFT)
-        vars_info.pack(fill=tk.X, pady=(0, 15))
-        
-        # Container para listbox e scrollbar
-        vars_list_frame = tk.Frame(vars_frame, bg="#f8f9fa")
-        vars_list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
-        
-        # Listbox de variáveis melhorada
-        vars_listbox = tk.Listbox(vars_list_frame, selectmode=tk.EXTENDED, 
-                                 font=("Consolas", 11), exportselection=False, 
-                                 bg='white', fg="#2c3e50",
-                                 selectbackground='#3498db', selectforeground='white',
-                                 relief="solid", borderwidth=1, highlightthickness=0)
-        vars_scrollbar = tk.Scrollbar(vars_list_frame, orient=tk.VERTICAL, command=vars_listbox.yview)
-        vars_listbox.config(yscrollcommand=vars_scrollbar.set)
-        
-        vars_scrollbar.pack(side=tk.RIGHT, fill=tk.Y, padx=(5, 0))
-        vars_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        # Botões de controle melhorados para variáveis
-        vars_buttons_frame = tk.Frame(vars_frame, bg="#f8f9fa")
-        vars_buttons_frame.pack(fill=tk.X)
-        
-        # Botão Selecionar Todas
-        select_all_btn = tk.Button(vars_buttons_frame, text="✅ Selecionar Todas", 
-                                  command=lambda: vars_listbox.select_set(0, tk.END),
-                                  font=("Segoe UI", 10, "bold"), bg="#1e8449", fg="#ffffff",
-                                  relief="flat", padx=15, pady=8, cursor="hand2")
-        select_all_btn.pack(side=tk.LEFT, padx=(0, 10))
-        
-        # Efeitos hover para botão Selecionar Todas
-        def on_select_all_enter(e): select_all_btn.configure(bg="#239b56")
-        def on_select_all_leave(e): select_all_btn.configure(bg="#1e8449")
-        select_all_btn.bind("<Enter>", on_select_all_enter)
-        select_all_btn.bind("<Leave>", on_select_all_leave)
-        
-        # Botão Limpar
-        clear_btn = tk.Button(vars_buttons_frame, text="❌ Limpar", 
-                             command=lambda: vars_listbox.selection_clear(0, tk.END),
-                             font=("Segoe UI", 10, "bold"), bg="#c0392b", fg="#ffffff",
-                             relief="flat", padx=15, pady=8, cursor="hand2")
-        clear_btn.pack(side=tk.LEFT)
-        
-        # Efeitos hover para botão Limpar
-        def on_clear_enter(e): clear_btn.configure(bg="#a93226")
-        def on_clear_leave(e): clear_btn.configure(bg="#c0392b")
-        clear_btn.bind("<Enter>", on_clear_enter)
-        clear_btn.bind("<Leave>", on_clear_leave)
-        
-        # FILTROS (lado direito) - Layout melhorado
-        filters_frame = tk.LabelFrame(lists_frame, text="🔍 VARIÁVEIS-FILTRO (Opcional)", 
-                                     font=("Segoe UI", 14, "bold"), fg="#8e44ad", bg="#f8f9fa",
-                                     relief="solid", borderwidth=1, padx=15, pady=15)
-        filters_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
-        
-        # Informações melhoradas dos filtros
-        filters_info = tk.Label(filters_frame, 
-                               text="Filtros para segmentação:\n• Opcional (pode deixar vazio)\n• Útil para análises específicas",
-                               font=("Segoe UI", 11), fg="#5d6d7e", bg="#f8f9fa", justify=tk.LEFT)
-        filters_info.pack(fill=tk.X, pady=(0, 15))
-        
-        # Container para listbox de filtros
-        filters_list_frame = tk.Frame(filters_frame, bg="#f8f9fa")
-        filters_list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
-        
-        # Listbox de filtros melhorada
-        filters_listbox = tk.Listbox(filters_list_frame, selectmode=tk.EXTENDED, 
-                                    font=("Consolas", 11), exportselection=False,
-                                    bg='white', fg="#2c3e50",
-                                    selectbackground='#9b59b6', selectforeground='white',
-                                    relief="solid", borderwidth=1, highlightthickness=0)
-        filters_scrollbar = tk.Scrollbar(filters_list_frame, orient=tk.VERTICAL, command=filters_listbox.yview)
-        filters_listbox.config(yscrollcommand=filters_scrollbar.set)
-        
-        filters_scrollbar.pack(side=tk.RIGHT, fill=tk.Y, padx=(5, 0))
-        filters_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        # Botões de controle melhorados para filtros
-        filters_buttons_frame = tk.Frame(filters_frame, bg="#f8f9fa")
-        filters_buttons_frame.pack(fill=tk.X)
-        
-        # Botão Selecionar Todas (filtros)
-        filters_select_all_btn = tk.Button(filters_buttons_frame, text="✅ Selecionar Todas", 
-                                          command=lambda: filters_listbox.select_set(0, tk.END),
-                                          font=("Segoe UI", 10, "bold"), bg="#1e8449", fg="#ffffff",
-                                          relief="flat", padx=15, pady=8, cursor="hand2")
-        filters_select_all_btn.pack(side=tk.LEFT, padx=(0, 10))
-        
-        # Efeitos hover para botão Selecionar Todas (filtros)
-        def on_filters_select_enter(e): filters_select_all_btn.configure(bg="#239b56")
-        def on_filters_select_leave(e): filters_select_all_btn.configure(bg="#1e8449")
-        filters_select_all_btn.bind("<Enter>", on_filters_select_enter)
-        filters_select_all_btn.bind("<Leave>", on_filters_select_leave)
-        
-        # Botão Limpar (filtros)
-        filters_clear_btn = tk.Button(filters_buttons_frame, text="❌ Limpar", 
-                                     command=lambda: filters_listbox.selection_clear(0, tk.END),
-                                     font=("Segoe UI", 10, "bold"), bg="#c0392b", fg="#ffffff",
-                                     relief="flat", padx=15, pady=8, cursor="hand2")
-        filters_clear_btn.pack(side=tk.LEFT)
-        
-        # Efeitos hover para botão Limpar (filtros)
-        def on_filters_clear_enter(e): filters_clear_btn.configure(bg="#a93226")
-        def on_filters_clear_leave(e): filters_clear_btn.configure(bg="#c0392b")
-        filters_clear_btn.bind("<Enter>", on_filters_clear_enter)
-        filters_clear_btn.bind("<Leave>", on_filters_clear_leave)
-        
-        # PESO/PONDERAÇÃO (nova seção melhorada abaixo dos filtros)
-        weight_frame = tk.LabelFrame(filters_frame, text="⚖️ VARIÁVEL PESO (Opcional)", 
-                                   font=("Segoe UI", 13, "bold"), fg="#e67e22", bg="#f8f9fa",
-                                   relief="solid", borderwidth=1, padx=15, pady=10)
-        weight_frame.pack(fill=tk.X, pady=(20, 0))
-        
-        weight_info = tk.Label(weight_frame, 
-                             text="Para pesquisas por amostragem:",
-                             font=("Segoe UI", 10), fg="#5d6d7e", bg="#f8f9fa")
-        weight_info.pack(fill=tk.X, pady=(0, 8))
-        
-        # Combobox melhorado para seleção de peso
-        weight_var = tk.StringVar()
-        weight_combo = ttk.Combobox(weight_frame, textvariable=weight_var, 
-                                  font=("Segoe UI", 11), state="readonly", width=30,
-                                  style="Modern.TCombobox")
-        weight_combo.pack(fill=tk.X)
-        
-        # POPULAR AS LISTAS COM VARIÁVEIS (preservando ordem original do SPSS)
-        print(f"🔧 Preservando ordem original das {len(df.columns)} variáveis do SPSS")
-        for col in df.columns:  # REMOVIDO sorted() para preservar ordem SPSS
-            label_text = labels.get(col, "")
-            if label_text:
-                display_text = f"{col:<15} | {label_text}"
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) < 2:
+                return
+            method, path = request_line[0].upper(), request_line[1].split("?", 1)[0]
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if length > SERVER_MAX_BODY:
+                status, content_type, payload = 413, "text/plain; charset=utf-8", b"too large"
             else:
-                display_text = f"{col:<15} | (sem rótulo)"
-            
-            vars_listbox.insert(tk.END, display_text)
-            filters_listbox.insert(tk.END, display_text)
-        
-        # Popular combobox de peso apenas com variáveis numéricas candidatas
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, content_type, payload = await route(method, path, body)
+                except Exception as e:
+                    log.error(f"❌ Erro na API de agregação: {e}")
+                    status, content_type, payload = 500, "text/plain; charset=utf-8", str(e).encode("utf-8")
+            log.debug("🌐 %s %s → %s (%d bytes)", method, path, status, len(payload))
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Cache-Control: no-store\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    bound_port = server.sockets[0].getsockname()[1]
+    if ready:
+        ready(bound_port)
+    async with server:
+        await server.serve_forever()
+
+def run_server(store: ColumnStore, page_html: str, host: str = SERVER_HOST,
+               port: int = SERVER_DEFAULT_PORT) -> None:
+    """Roda serve_dashboard até Ctrl+C."""
+    def ready(bound_port: int) -> None:
+        print(f"🌐 Dashboard em http://{host}:{bound_port}/ ({store.total} respondentes na memória) — Ctrl+C encerra")
+    try:
+        asyncio.run(serve_dashboard(store, page_html, host, port, ready))
+    except KeyboardInterrupt:
+        print(f"\n👋 Servidor encerrado ({store.cache_hits} acertos / {store.cache_misses} falhas de cache)")
+
+# ========== INTERFACE GRÁFICA CORRIGIDA ==========
+
+def _search_tokens(text: str) -> List[str]:
+    """Minúsculas, sem acentos, quebrado em palavras alfanuméricas."""
+    folded = ''.join(c for c in unicodedata.normalize('NFKD', str(text).lower()) if not unicodedata.combining(c))
+    return re.findall(r'[a-z0-9]+', folded)
+
+def build_variable_search_index(columns: List[str], labels: Dict[str, str],
+                                profiles: Optional[Dict[str, dict]] = None) -> dict:
+    """
+    Índice de busca das listas da GUI: pares (token, posição da coluna) ordenados
+    por token, para que cada palavra digitada vire um intervalo por busca binária.
+    Inclui também o texto exibido de cada linha (montado uma única vez), com o
+    resumo do perfil da coluna quando disponível.
+    """
+    pairs = set()
+    displays = []
+    for position, col in enumerate(columns):
+        label_text = labels.get(col, "")
+        if label_text:
+            display_text = f"{col:<15} | {label_text}"
+        else:
+            display_text = f"{col:<15} | (sem rótulo)"
+        if profiles and col in profiles:
+            display_text += f"   [{describe_profile(profiles[col])}]"
+        displays.append(display_text)
+        for token in _search_tokens(f"{col} {label_text}") + [col.lower()]:
+            pairs.add((token, position))
+    pairs = sorted(pairs)
+    return {
+        "tokens": [token for token, _ in pairs],
+        "positions": [position for _, position in pairs],
+        "displays": displays,
+        "size": len(columns),
+    }
+
+def search_variable_index(index: dict, query: str) -> List[int]:
+    """
+    Posições (ordem SPSS) cujas palavras de nome/rótulo começam com TODAS as
+    palavras da consulta, sem diferenciar acentos. Consulta vazia = tudo.
+    """
+    tokens = _search_tokens(query)
+    if not tokens:
+        return list(range(index["size"]))
+    result = None
+    for token in tokens:
+        lo = bisect.bisect_left(index["tokens"], token)
+        hi = bisect.bisect_left(index["tokens"], token + "\uffff")
+        hits = set(index["positions"][lo:hi])
+        result = hits if result is None else result & hits
+        if not result:
+            return []
+    return sorted(result)
+
+def _runs(items: List[int], keep: set) -> List[Tuple[int, int]]:
+    """Blocos contíguos [início, fim) de `items` que NÃO estão em `keep`."""
+    runs, pos = [], 0
+    while pos < len(items):
+        if items[pos] in keep:
+            pos += 1
+            continue
+        start = pos
+        while pos < len(items) and items[pos] not in keep:
+            pos += 1
+        runs.append((start, pos))
+    return runs
+
+def sync_listbox(listbox, visible: List[int], hits: List[int], displays: List[str], chosen: set,
+                 max_blocks: int = 40):
+    """
+    Leva o listbox das linhas `visible` para `hits` (ambas em ordem SPSS) apagando e
+    inserindo só os blocos que mudaram; as linhas mantidas preservam a seleção e as
+    inseridas são marcadas se estiverem em `chosen`. Se a diferença estiver muito
+    fragmentada (> max_blocks), uma única recarga sai mais barata.
+    """
+    hit_set = set(hits)
+    kept = hit_set.intersection(visible)
+    removed = _runs(visible, hit_set)
+    added = _runs(hits, kept)
+
+    if len(removed) + len(added) > max_blocks:
+        listbox.delete(0, tk.END)
+        listbox.insert(tk.END, *[displays[i] for i in hits])
+        for row, position in enumerate(hits):
+            if position in chosen:
+                listbox.selection_set(row)
+        return
+
+    for start, end in reversed(removed):
+        listbox.delete(start, end - 1)
+    for start, end in added:
+        listbox.insert(start, *[displays[i] for i in hits[start:end]])
+        for row in range(start, end):
+            if hits[row] in chosen:
+                listbox.selection_set(row)
+
+def run_with_progress(title: str, job: Callable, master=None):
+    """
+    Executa job(progress) numa thread de trabalho enquanto a janela mostra a
+    etapa atual, a barra de progresso e um botão Cancelar.
+
+    O job chama progress(stage, done, total) (stage de GENERATION_STAGES); os
+    avisos chegam à interface por uma fila lida com after(), então o Tk nunca
+    bloqueia. Depois do Cancelar, a próxima chamada a progress levanta
+    GenerationCancelled dentro do job. Retorna o resultado do job ou relança
+    a exceção dele.
+    """
+    events: "queue.Queue" = queue.Queue()
+    cancel = threading.Event()
+    outcome: Dict[str, Any] = {}
+    stage_keys = [key for key, _ in GENERATION_STAGES]
+    stage_texts = dict(GENERATION_STAGES)
+
+    def progress(stage: str, done: int = 0, total: int = 0):
+        if cancel.is_set():
+            raise GenerationCancelled()
+        events.put((stage, done, total))
+
+    def worker():
+        try:
+            outcome["result"] = job(progress)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            events.put(None)
+
+    win = tk.Toplevel(master) if master is not None else tk.Tk()
+    win.title(title)
+    win.geometry("480x170")
+    win.resizable(False, False)
+    win.configure(bg="#f8f9fa")
+
+    stage_label = tk.Label(win, text="Iniciando...", font=("Segoe UI", 12, "bold"),
+                           fg="#2c3e50", bg="#f8f9fa")
+    stage_label.pack(pady=(20, 8))
+    bar = ttk.Progressbar(win, length=420, mode="determinate", maximum=100)
+    bar.pack()
+    detail_label = tk.Label(win, text="", font=("Segoe UI", 10), fg="#7f8c8d", bg="#f8f9fa")
+    detail_label.pack(pady=(6, 8))
+
+    def on_cancel():
+        cancel.set()
+        cancel_btn.configure(state=tk.DISABLED, text="Cancelando...")
+
+    cancel_btn = tk.Button(win, text="❌ Cancelar", command=on_cancel,
+                           font=("Segoe UI", 10), bg="#bdc3c7", fg="#2c3e50",
+                           relief="flat", padx=16, pady=4, cursor="hand2")
+    cancel_btn.pack()
+    win.protocol("WM_DELETE_WINDOW", on_cancel)
+
+    def poll():
+        try:
+            while True:
+                item = events.get_nowait()
+                if item is None:
+                    win.quit()
+                    return
+                stage, done, total = item
+                position = stage_keys.index(stage) if stage in stage_keys else 0
+                fraction = (done / total) if total else 0.0
+                bar["value"] = (position + fraction) / len(stage_keys) * 100
+                stage_label.configure(text=f"{position + 1}/{len(stage_keys)} • {stage_texts.get(stage, stage)}")
+                detail_label.configure(text=f"{done:,} de {total:,} registros" if total else "")
+        except queue.Empty:
+            pass
+        win.after(100, poll)
+
+    threading.Thread(target=worker, daemon=True).start()
+    win.after(100, poll)
+    win.mainloop()
+    win.destroy()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
+def gui_session_round(in_path: str, df, meta, session: dict) -> Tuple[int, bool]:
+    """
+    Uma rodada da sessão da GUI: janela de seleção, arquivo de saída e geração.
+    df/meta, rótulos, candidatas a peso e detecções vêm de `session` e ficam
+    em memória para a próxima rodada. Retorna (status, gerar_outro).
+    """
+    labels = session["labels"]
+    root = tk.Tk()
+    root.withdraw()
+
+    # Configurar estilo moderno para componentes ttk
+    style = ttk.Style()
+    style.theme_use('clam')
+    
+    # Estilo para combobox
+    style.configure("Modern.TCombobox", 
+                   fieldbackground="white",
+                   background="#f8f9fa",
+                   foreground="#2c3e50",
+                   borderwidth=1,
+                   relief="solid")
+    
+    # Configurar cores padrão para melhor visibilidade
+    style.configure("TLabel", background="#f8f9fa", foreground="#2c3e50")
+    style.configure("TFrame", background="#f8f9fa")
+    
+    # 2. JANELA DE SELEÇÃO - Layout moderno melhorado
+    root.deiconify()
+    root.title("📊 Dashboard SPSS Universal - Seleção de Variáveis")
+    root.geometry("1400x800")
+    root.minsize(1200, 700)
+    root.configure(bg="#f8f9fa")
+    
+    # Configurar cores padrão para evitar problemas de sistema
+    root.option_add('*TkDefaultFont', 'Segoe UI 10')
+    root.option_add('*Background', '#f8f9fa')
+    root.option_add('*Foreground', '#2c3e50')
+    
+    # Configurar grid weights para responsividade
+    root.grid_columnconfigure(0, weight=1)
+    root.grid_rowconfigure(0, weight=1)
+    
+    # Frame principal com melhor padding
+    main_frame = tk.Frame(root, bg="#f8f9fa")
+    main_frame.pack(fill=tk.BOTH, expand=True, padx=25, pady=20)
+    
+    # Header melhorado
+    header_frame = tk.Frame(main_frame, bg="#f8f9fa")
+    header_frame.pack(fill=tk.X, pady=(0, 25))
+    
+    # Título principal
+    title_label = tk.Label(header_frame, 
+                          text="📊 Dashboard SPSS Universal", 
+                          font=("Segoe UI", 24, "bold"), 
+                          fg="#2c3e50", bg="#f8f9fa")
+    title_label.pack()
+    
+    # Subtítulo com informações do arquivo
+    subtitle_label = tk.Label(header_frame,
+                             text=f"📁 {os.path.basename(in_path)} • {len(df):,} registros • {len(df.columns)} variáveis",
+                             font=("Segoe UI", 12), 
+                             fg="#7f8c8d", bg="#f8f9fa")
+    subtitle_label.pack(pady=(5, 0))
+    
+    # Container principal para as listas
+    content_frame = tk.Frame(main_frame, bg="#f8f9fa")
+    content_frame.pack(fill=tk.BOTH, expand=True)
+    
+    # Frame para listboxes lado a lado com melhor espaçamento
+    lists_frame = tk.Frame(content_frame, bg="#f8f9fa")
+    lists_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 20))
+    
+    # VARIÁVEIS PRINCIPAIS (lado esquerdo) - Layout melhorado
+    vars_frame = tk.LabelFrame(lists_frame, text="📊 VARIÁVEIS PARA O RELATÓRIO", 
+                              font=("Segoe UI", 14, "bold"), fg="#2980b9", bg="#f8f9fa",
+                              relief="solid", borderwidth=1, padx=15, pady=15)
+    vars_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 15))
+    
+    # Informações melhoradas das variáveis principais
+    vars_info = tk.Label(vars_frame, 
+                        text="Selecione as variáveis para análise:\n• Ctrl/Cmd + clique: múltiplas seleções\n• Shift + clique: intervalos",
+                        font=("Segoe UI", 11), fg="#5d6d7e", bg="#f8f9fa", justify=tk.LEFT)
+    vars_info.pack(fill=tk.X, pady=(0, 10))
+
+    # Busca incremental por nome/rótulo
+    vars_query = tk.StringVar()
+    vars_search_frame = tk.Frame(vars_frame, bg="#f8f9fa")
+    vars_search_frame.pack(fill=tk.X, pady=(0, 10))
+    tk.Label(vars_search_frame, text="🔎 Buscar:", font=("Segoe UI", 10),
+             fg="#5d6d7e", bg="#f8f9fa").pack(side=tk.LEFT, padx=(0, 8))
+    tk.Entry(vars_search_frame, textvariable=vars_query, font=("Segoe UI", 11),
+             bg="white", relief="solid", borderwidth=1).pack(side=tk.LEFT, fill=tk.X, expand=True)
+    
+    # Container para listbox e scrollbar
+    vars_list_frame = tk.Frame(vars_frame, bg="#f8f9fa")
+    vars_list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
+    
+    # Listbox de variáveis melhorada
+    vars_listbox = tk.Listbox(vars_list_frame, selectmode=tk.EXTENDED, 
+                             font=("Consolas", 11), exportselection=False, 
+                             bg='white', fg="#2c3e50",
+                             selectbackground='#3498db', selectforeground='white',
+                             relief="solid", borderwidth=1, highlightthickness=0)
+    vars_scrollbar = tk.Scrollbar(vars_list_frame, orient=tk.VERTICAL, command=vars_listbox.yview)
+    vars_listbox.config(yscrollcommand=vars_scrollbar.set)
+    
+    vars_scrollbar.pack(side=tk.RIGHT, fill=tk.Y, padx=(5, 0))
+    vars_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    
+    # Botões de controle melhorados para variáveis
+    vars_buttons_frame = tk.Frame(vars_frame, bg="#f8f9fa")
+    vars_buttons_frame.pack(fill=tk.X)
+    
+    # Botão Selecionar Todas
+    select_all_btn = tk.Button(vars_buttons_frame, text="✅ Selecionar Todas", 
+                              command=lambda: (vars_listbox.select_set(0, tk.END), vars_picker["sync"]()),
+                              font=("Segoe UI", 10, "bold"), bg="#1e8449", fg="#ffffff",
+                              relief="flat", padx=15, pady=8, cursor="hand2")
+    select_all_btn.pack(side=tk.LEFT, padx=(0, 10))
+    
+    # Efeitos hover para botão Selecionar Todas
+    def on_select_all_enter(e): select_all_btn.configure(bg="#239b56")
+    def on_select_all_leave(e): select_all_btn.configure(bg="#1e8449")
+    select_all_btn.bind("<Enter>", on_select_all_enter)
+    select_all_btn.bind("<Leave>", on_select_all_leave)
+    
+    # Botão Limpar
+    clear_btn = tk.Button(vars_buttons_frame, text="❌ Limpar", 
+                         command=lambda: (vars_listbox.selection_clear(0, tk.END), vars_picker["sync"]()),
+                         font=("Segoe UI", 10, "bold"), bg="#c0392b", fg="#ffffff",
+                         relief="flat", padx=15, pady=8, cursor="hand2")
+    clear_btn.pack(side=tk.LEFT)
+    
+    # Efeitos hover para botão Limpar
+    def on_clear_enter(e): clear_btn.configure(bg="#a93226")
+    def on_clear_leave(e): clear_btn.configure(bg="#c0392b")
+    clear_btn.bind("<Enter>", on_clear_enter)
+    clear_btn.bind("<Leave>", on_clear_leave)
+    
+    # FILTROS (lado direito) - Layout melhorado
+    filters_frame = tk.LabelFrame(lists_frame, text="🔍 VARIÁVEIS-FILTRO (Opcional)", 
+                                 font=("Segoe UI", 14, "bold"), fg="#8e44ad", bg="#f8f9fa",
+                                 relief="solid", borderwidth=1, padx=15, pady=15)
+    filters_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+    
+    # Informações melhoradas dos filtros
+    filters_info = tk.Label(filters_frame, 
+                           text="Filtros para segmentação:\n• Opcional (pode deixar vazio)\n• Útil para análises específicas",
+                           font=("Segoe UI", 11), fg="#5d6d7e", bg="#f8f9fa", justify=tk.LEFT)
+    filters_info.pack(fill=tk.X, pady=(0, 10))
+
+    # Busca incremental por nome/rótulo
+    filters_query = tk.StringVar()
+    filters_search_frame = tk.Frame(filters_frame, bg="#f8f9fa")
+    filters_search_frame.pack(fill=tk.X, pady=(0, 10))
+    tk.Label(filters_search_frame, text="🔎 Buscar:", font=("Segoe UI", 10),
+             fg="#5d6d7e", bg="#f8f9fa").pack(side=tk.LEFT, padx=(0, 8))
+    tk.Entry(filters_search_frame, textvariable=filters_query, font=("Segoe UI", 11),
+             bg="white", relief="solid", borderwidth=1).pack(side=tk.LEFT, fill=tk.X, expand=True)
+    
+    # Container para listbox de filtros
+    filters_list_frame = tk.Frame(filters_frame, bg="#f8f9fa")
+    filters_list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
+    
+    # Listbox de filtros melhorada
+    filters_listbox = tk.Listbox(filters_list_frame, selectmode=tk.EXTENDED, 
+                                font=("Consolas", 11), exportselection=False,
+                                bg='white', fg="#2c3e50",
+                                selectbackground='#9b59b6', selectforeground='white',
+                                relief="solid", borderwidth=1, highlightthickness=0)
+    filters_scrollbar = tk.Scrollbar(filters_list_frame, orient=tk.VERTICAL, command=filters_listbox.yview)
+    filters_listbox.config(yscrollcommand=filters_scrollbar.set)
+    
+    filters_scrollbar.pack(side=tk.RIGHT, fill=tk.Y, padx=(5, 0))
+    filters_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    
+    # Botões de controle melhorados para filtros
+    filters_buttons_frame = tk.Frame(filters_frame, bg="#f8f9fa")
+    filters_buttons_frame.pack(fill=tk.X)
+    
+    # Botão Selecionar Todas (filtros)
+    filters_select_all_btn = tk.Button(filters_buttons_frame, text="✅ Selecionar Todas", 
+                                      command=lambda: (filters_listbox.select_set(0, tk.END), filters_picker["sync"]()),
+                                      font=("Segoe UI", 10, "bold"), bg="#1e8449", fg="#ffffff",
+                                      relief="flat", padx=15, pady=8, cursor="hand2")
+    filters_select_all_btn.pack(side=tk.LEFT, padx=(0, 10))
+    
+    # Efeitos hover para botão Selecionar Todas (filtros)
+    def on_filters_select_enter(e): filters_select_all_btn.configure(bg="#239b56")
+    def on_filters_select_leave(e): filters_select_all_btn.configure(bg="#1e8449")
+    filters_select_all_btn.bind("<Enter>", on_filters_select_enter)
+    filters_select_all_btn.bind("<Leave>", on_filters_select_leave)
+    
+    # Botão Limpar (filtros)
+    filters_clear_btn = tk.Button(filters_buttons_frame, text="❌ Limpar", 
+                                 command=lambda: (filters_listbox.selection_clear(0, tk.END), filters_picker["sync"]()),
+                                 font=("Segoe UI", 10, "bold"), bg="#c0392b", fg="#ffffff",
+                                 relief="flat", padx=15, pady=8, cursor="hand2")
+    filters_clear_btn.pack(side=tk.LEFT)
+    
+    # Efeitos hover para botão Limpar (filtros)
+    def on_filters_clear_enter(e): filters_clear_btn.configure(bg="#a93226")
+    def on_filters_clear_leave(e): filters_clear_btn.configure(bg="#c0392b")
+    filters_clear_btn.bind("<Enter>", on_filters_clear_enter)
+    filters_clear_btn.bind("<Leave>", on_filters_clear_leave)
+    
+    # PESO/PONDERAÇÃO (nova seção melhorada abaixo dos filtros)
+    weight_frame = tk.LabelFrame(filters_frame, text="⚖️ VARIÁVEL PESO (Opcional)", 
+                               font=("Segoe UI", 13, "bold"), fg="#e67e22", bg="#f8f9fa",
+                               relief="solid", borderwidth=1, padx=15, pady=10)
+    weight_frame.pack(fill=tk.X, pady=(20, 0))
+    
+    weight_info = tk.Label(weight_frame, 
+                         text="Para pesquisas por amostragem:",
+                         font=("Segoe UI", 10), fg="#5d6d7e", bg="#f8f9fa")
+    weight_info.pack(fill=tk.X, pady=(0, 8))
+    
+    # Combobox melhorado para seleção de peso
+    weight_var = tk.StringVar()
+    weight_combo = ttk.Combobox(weight_frame, textvariable=weight_var, 
+                              font=("Segoe UI", 11), state="readonly", width=30,
+                              style="Modern.TCombobox")
+    weight_combo.pack(fill=tk.X)
+    
+    # POPULAR AS LISTAS COM VARIÁVEIS (preservando ordem original do SPSS)
+    # Índice de busca e textos das linhas são montados uma vez por sessão
+    print(f"🔧 Preservando ordem original das {len(df.columns)} variáveis do SPSS")
+    if "search_index" not in session:
+        session["search_index"] = build_variable_search_index(
+            list(df.columns), labels, getattr(meta, "column_profiles", None)
+        )
+    search_index = session["search_index"]
+
+    def make_picker(listbox, query_var):
+        """Liga listbox + busca; `chosen` guarda as posições escolhidas mesmo quando ocultas."""
+        picker = {"visible": list(range(search_index["size"])), "chosen": set()}
+
+        def sync(event=None):
+            picker["chosen"].difference_update(picker["visible"])
+            picker["chosen"].update(picker["visible"][row] for row in listbox.curselection())
+
+        def on_query(*_):
+            hits = search_variable_index(search_index, query_var.get())
+            if hits != picker["visible"]:
+                sync_listbox(listbox, picker["visible"], hits, search_index["displays"], picker["chosen"])
+                picker["visible"] = hits
+
+        listbox.insert(tk.END, *search_index["displays"])
+        listbox.bind("<<ListboxSelect>>", sync)
+        query_var.trace_add("write", on_query)
+        picker["sync"] = sync
+        return picker
+
+    vars_picker = make_picker(vars_listbox, vars_query)
+    filters_picker = make_picker(filters_listbox, filters_query)
+    
+    # Popular combobox de peso apenas com variáveis numéricas candidatas
+    # (calculado uma vez por sessão)
+    weight_candidates = session.get("weight_candidates")
+    if weight_candidates is None:
         weight_candidates = ["(Nenhuma - sem ponderação)"]
         for col in df.columns:
             # Detectar se é variável numérica (candidata a peso)
@@ -3357,147 +6486,192 @@ def run_gui() -> int:
                     max_val = numeric_vals.max()
                     if 0.1 <= min_val and max_val <= 20 and 0.5 <= mean_val <= 3.0:
                         weight_candidates.append(f"{col} | {labels.get(col, '(numérica)')}")
+        session["weight_candidates"] = weight_candidates
+    
+    weight_combo['values'] = weight_candidates
+    weight_combo.current(0)  # Seleciona "Nenhuma" por padrão
+
+    # Sessão: repetir as seleções do dashboard anterior como ponto de partida
+    last = session.get("last_selection")
+    if last:
+        for i, col in enumerate(df.columns):
+            if col in last["vars"]:
+                vars_listbox.selection_set(i)
+            if col in last["filters"]:
+                filters_listbox.selection_set(i)
+        vars_picker["sync"]()
+        filters_picker["sync"]()
+        if last["weight"] in weight_candidates:
+            weight_combo.current(weight_candidates.index(last["weight"]))
+    
+    # Variáveis para armazenar seleções
+    selected_vars = []
+    selected_filters = []
+    selected_weight = None
+    preview_n = 0
+    success = False
+    
+    def on_generate():
+        nonlocal selected_vars, selected_filters, selected_weight, success
         
-        weight_combo['values'] = weight_candidates
-        weight_combo.current(0)  # Seleciona "Nenhuma" por padrão
-        
-        # Variáveis para armazenar seleções
-        selected_vars = []
-        selected_filters = []
-        selected_weight = None
-        success = False
-        
-        def on_generate():
-            nonlocal selected_vars, selected_filters, selected_weight, success
-            
-            # Obter seleções
-            var_indices = vars_listbox.curselection()
-            filter_indices = filters_listbox.curselection()
-            
-            if not var_indices:
-                messagebox.showwarning("Atenção", "Selecione pelo menos uma variável para o relatório!")
-                return
-            
-            # Preservar ordem original do SPSS (REMOVIDO sorted())
-            columns_list = list(df.columns)  # Ordem original preservada
-            selected_vars = [columns_list[i] for i in var_indices]
-            selected_filters = [columns_list[i] for i in filter_indices]
-            
-            # Obter variável peso selecionada
-            weight_selection = weight_var.get()
-            if weight_selection and not weight_selection.startswith("(Nenhuma"):
-                # Extrair nome da variável do formato "PESO | descrição"
-                selected_weight = weight_selection.split(" | ")[0]
-                if selected_weight not in df.columns:
-                    selected_weight = None
-            else:
-                selected_weight = None
-            
-            success = True
-            root.quit()
-        
-        def on_cancel():
-            nonlocal success
-            success = False
-            root.quit()
-        
-        # BOTÕES FINAIS - Layout moderno
-        buttons_section = tk.Frame(main_frame, bg="#f8f9fa")
-        buttons_section.pack(fill=tk.X, pady=(30, 0))
-        
-        # Frame para centralizar botões
-        buttons_frame = tk.Frame(buttons_section, bg="#f8f9fa")
-        buttons_frame.pack(anchor=tk.CENTER)
-        
-        # Botão Cancelar melhorado
-        cancel_btn = tk.Button(buttons_frame, text="❌ Cancelar", command=on_cancel, 
-                              font=("Segoe UI", 12, "bold"), width=15, 
-                              bg="#bdc3c7", fg="#2c3e50", relief="flat",
-                              padx=20, pady=12, cursor="hand2")
-        cancel_btn.pack(side=tk.LEFT, padx=(0, 20))
-        
-        # Efeitos hover para botão Cancelar
-        def on_cancel_enter(e): cancel_btn.configure(bg="#95a5a6")
-        def on_cancel_leave(e): cancel_btn.configure(bg="#bdc3c7")
-        cancel_btn.bind("<Enter>", on_cancel_enter)
-        cancel_btn.bind("<Leave>", on_cancel_leave)
-        
-        # Botão Gerar melhorado
-        generate_btn = tk.Button(buttons_frame, text="🚀 Gerar Dashboard", command=on_generate, 
-                                font=("Segoe UI", 12, "bold"), width=20, 
-                                bg="#1e8449", fg="#ffffff", relief="flat",
-                                padx=25, pady=12, cursor="hand2")
-        generate_btn.pack(side=tk.RIGHT)
-        
-        # Efeitos hover para botão Gerar
-        def on_generate_enter(e): generate_btn.configure(bg="#239b56")
-        def on_generate_leave(e): generate_btn.configure(bg="#1e8449")
-        generate_btn.bind("<Enter>", on_generate_enter)
-        generate_btn.bind("<Leave>", on_generate_leave)
-        
-        # Instruções melhoradas
-        instructions_frame = tk.Frame(main_frame, bg="#f8f9fa")
-        instructions_frame.pack(fill=tk.X, pady=(20, 10))
-        
-        instructions_title = tk.Label(instructions_frame, 
-                                     text="💡 INSTRUÇÕES DE USO",
-                                     font=("Segoe UI", 12, "bold"), 
-                                     fg="#34495e", bg="#f8f9fa")
-        instructions_title.pack(anchor=tk.W)
-        
-        instructions_text = tk.Label(instructions_frame, 
-                                    text="• Clique simples: seleciona um item\n"
-                                         "• Ctrl/Cmd + clique: múltiplas seleções\n"
-                                         "• Shift + clique: seleciona intervalo\n"
-                                         "• Use os botões para facilitar a seleção", 
-                                    font=("Segoe UI", 10), fg="#7f8c8d", bg="#f8f9fa", 
-                                    justify=tk.LEFT)
-        instructions_text.pack(anchor=tk.W, pady=(5, 0))
-        
-        # Executar interface
-        root.mainloop()
-        
-        if not success:
-            root.destroy()
-            print("❌ Operação cancelada.")
-            return 1
-        
-        print(f"✅ Variáveis selecionadas: {len(selected_vars)} - {selected_vars[:3]}{'...' if len(selected_vars) > 3 else ''}")
-        print(f"✅ Filtros selecionados: {len(selected_filters)} - {selected_filters[:3] if selected_filters else 'Nenhum'}")
-        
-        # DEBUG: Mostrar detalhes das variáveis selecionadas
-        print("\n🔍 === DEBUG: VARIÁVEIS SELECIONADAS ===")
-        mr_candidates = []
-        single_vars = []
+        # Obter seleções (inclusive as que a busca atual esconde)
+        vars_picker["sync"]()
+        filters_picker["sync"]()
+        var_indices = sorted(vars_picker["chosen"])
+        filter_indices = sorted(filters_picker["chosen"])
         
-        for var in selected_vars:
-            if "_" in var and re.match(r'^[A-Za-z]+\d+_\d+', var):
-                mr_candidates.append(var)
-            else:
-                single_vars.append(var)
+        if not var_indices:
+            messagebox.showwarning("Atenção", "Selecione pelo menos uma variável para o relatório!")
+            return
         
-        print(f"📊 Variáveis com padrão MR: {len(mr_candidates)}")
-        if mr_candidates:
-            for var in mr_candidates[:10]:
-                print(f"   • {var}")
-            if len(mr_candidates) > 10:
-                print(f"   ... e mais {len(mr_candidates) - 10}")
+        # Preservar ordem original do SPSS (REMOVIDO sorted())
+        columns_list = list(df.columns)  # Ordem original preservada
+        selected_vars = [columns_list[i] for i in var_indices]
+        selected_filters = [columns_list[i] for i in filter_indices]
         
-        print(f"📋 Variáveis individuais: {len(single_vars)}")
-        if single_vars:
-            for var in single_vars[:10]:
-                print(f"   • {var}")
-            if len(single_vars) > 10:
-                print(f"   ... e mais {len(single_vars) - 10}")
-        print()
+        # Obter variável peso selecionada
+        weight_selection = weight_var.get()
+        if weight_selection and not weight_selection.startswith("(Nenhuma"):
+            # Extrair nome da variável do formato "PESO | descrição"
+            selected_weight = weight_selection.split(" | ")[0]
+            if selected_weight not in df.columns:
+                selected_weight = None
+        else:
+            selected_weight = None
         
+        session["last_selection"] = {
+            "vars": selected_vars, "filters": selected_filters, "weight": weight_selection
+        }
+        success = True
+        root.quit()
+    
+    def on_preview():
+        nonlocal preview_n
+        n = simpledialog.askinteger(
+            "Prévia", "Quantos respondentes na amostra estratificada?",
+            initialvalue=PREVIEW_DEFAULT_N, minvalue=10, parent=root
+        )
+        if n:
+            preview_n = n
+            on_generate()
+            if not success:
+                preview_n = 0
+
+    def on_cancel():
+        nonlocal success
+        success = False
+        root.quit()
+    
+    # BOTÕES FINAIS - Layout moderno
+    buttons_section = tk.Frame(main_frame, bg="#f8f9fa")
+    buttons_section.pack(fill=tk.X, pady=(30, 0))
+    
+    # Frame para centralizar botões
+    buttons_frame = tk.Frame(buttons_section, bg="#f8f9fa")
+    buttons_frame.pack(anchor=tk.CENTER)
+    
+    # Botão Cancelar melhorado
+    cancel_btn = tk.Button(buttons_frame, text="❌ Cancelar", command=on_cancel, 
+                          font=("Segoe UI", 12, "bold"), width=15, 
+                          bg="#bdc3c7", fg="#2c3e50", relief="flat",
+                          padx=20, pady=12, cursor="hand2")
+    cancel_btn.pack(side=tk.LEFT, padx=(0, 20))
+    
+    # Efeitos hover para botão Cancelar
+    def on_cancel_enter(e): cancel_btn.configure(bg="#95a5a6")
+    def on_cancel_leave(e): cancel_btn.configure(bg="#bdc3c7")
+    cancel_btn.bind("<Enter>", on_cancel_enter)
+    cancel_btn.bind("<Leave>", on_cancel_leave)
+    
+    # Botão Gerar melhorado
+    generate_btn = tk.Button(buttons_frame, text="🚀 Gerar Dashboard", command=on_generate, 
+                            font=("Segoe UI", 12, "bold"), width=20, 
+                            bg="#1e8449", fg="#ffffff", relief="flat",
+                            padx=25, pady=12, cursor="hand2")
+    generate_btn.pack(side=tk.RIGHT)
+
+    # Botão Prévia: mesma geração, sobre uma amostra estratificada
+    preview_btn = tk.Button(buttons_frame, text="👁️ Prévia", command=on_preview,
+                            font=("Segoe UI", 12, "bold"), width=12,
+                            bg="#f0ad4e", fg="#ffffff", relief="flat",
+                            padx=20, pady=12, cursor="hand2")
+    preview_btn.pack(side=tk.RIGHT, padx=(0, 20))
+    
+    # Efeitos hover para botão Gerar
+    def on_generate_enter(e): generate_btn.configure(bg="#239b56")
+    def on_generate_leave(e): generate_btn.configure(bg="#1e8449")
+    generate_btn.bind("<Enter>", on_generate_enter)
+    generate_btn.bind("<Leave>", on_generate_leave)
+    
+    # Instruções melhoradas
+    instructions_frame = tk.Frame(main_frame, bg="#f8f9fa")
+    instructions_frame.pack(fill=tk.X, pady=(20, 10))
+    
+    instructions_title = tk.Label(instructions_frame, 
+                                 text="💡 INSTRUÇÕES DE USO",
+                                 font=("Segoe UI", 12, "bold"), 
+                                 fg="#34495e", bg="#f8f9fa")
+    instructions_title.pack(anchor=tk.W)
+    
+    instructions_text = tk.Label(instructions_frame, 
+                                text="• Clique simples: seleciona um item\n"
+                                     "• Ctrl/Cmd + clique: múltiplas seleções\n"
+                                     "• Shift + clique: seleciona intervalo\n"
+                                     "• Use os botões para facilitar a seleção", 
+                                font=("Segoe UI", 10), fg="#7f8c8d", bg="#f8f9fa", 
+                                justify=tk.LEFT)
+    instructions_text.pack(anchor=tk.W, pady=(5, 0))
+    
+    # Executar interface
+    root.mainloop()
+    
+    if not success:
         root.destroy()
-        
-        # 3. ARQUIVO DE SAÍDA
+        print("❌ Operação cancelada.")
+        return 1, False
+    
+    print(f"✅ Variáveis selecionadas: {len(selected_vars)} - {selected_vars[:3]}{'...' if len(selected_vars) > 3 else ''}")
+    print(f"✅ Filtros selecionados: {len(selected_filters)} - {selected_filters[:3] if selected_filters else 'Nenhum'}")
+    
+    # DEBUG: Mostrar detalhes das variáveis selecionadas
+    print("\n🔍 === DEBUG: VARIÁVEIS SELECIONADAS ===")
+    mr_candidates = []
+    single_vars = []
+    
+    for var in selected_vars:
+        if "_" in var and re.match(r'^[A-Za-z]+\d+_\d+', var):
+            mr_candidates.append(var)
+        else:
+            single_vars.append(var)
+    
+    print(f"📊 Variáveis com padrão MR: {len(mr_candidates)}")
+    if mr_candidates:
+        for var in mr_candidates[:10]:
+            print(f"   • {var}")
+        if len(mr_candidates) > 10:
+            print(f"   ... e mais {len(mr_candidates) - 10}")
+    
+    print(f"📋 Variáveis individuais: {len(single_vars)}")
+    if single_vars:
+        for var in single_vars[:10]:
+            print(f"   • {var}")
+        if len(single_vars) > 10:
+            print(f"   ... e mais {len(single_vars) - 10}")
+    print()
+    
+    root.destroy()
+    
+    # 3. ARQUIVO DE SAÍDA (a prévia vai direto para um arquivo fixo ao lado do .sav)
+    if preview_n:
+        out_path = os.path.splitext(in_path)[0] + "_dashboard_previa.html"
+    else:
         root2 = tk.Tk()
         root2.withdraw()
         
-        default_out = os.path.splitext(in_path)[0] + "_dashboard_universal.html"
+        # Na sessão, cada dashboard sugere um nome novo para não sobrescrever o anterior
+        session["round"] = session.get("round", 0) + 1
+        suffix = f"_{session['round']}" if session["round"] > 1 else ""
+        default_out = os.path.splitext(in_path)[0] + f"_dashboard_universal{suffix}.html"
         out_path = filedialog.asksaveasfilename(
             title="Salvar dashboard HTML como...",
             defaultextension=".html", 
@@ -3507,55 +6681,146 @@ def run_gui() -> int:
         
         root2.destroy()
 
-        # 4. PROCESSAMENTO
-        print("⚙️ Processando dados...")
-        created_at, vars_meta, filters_meta, records, value_orders, code_to_label = build_records_and_meta(
-            df, meta, selected_vars, selected_filters, os.path.basename(in_path), "", selected_weight
+    # 4. PROCESSAMENTO (thread de trabalho; a janela mostra o progresso)
+    print("⚙️ Processando dados...")
+    selected_filters, range_filters = split_range_filters(df, meta, selected_filters)
+    if range_filters:
+        print(f"📅 Filtros de intervalo: {range_filters}")
+
+    # Prévia: mesmo pipeline sobre a amostra (sem o cache de detecção, que é do arquivo inteiro)
+    work_df, preview, detection_cache = df, None, session["detection_cache"]
+    if preview_n:
+        work_df = stratified_sample(df, selected_filters, preview_n)
+        preview = {"sample": len(work_df), "total": len(df), "strata": selected_filters}
+        detection_cache = None
+        print(f"👁️ Prévia: {len(work_df)} de {len(df)} respondentes")
+
+    def generate_job(progress):
+        started = time.perf_counter()
+        built = build_records_and_meta(
+            work_df, meta, selected_vars, selected_filters, os.path.basename(in_path), "", selected_weight,
+            None, range_filters, progress, detection_cache
         )
+        created_at, vars_meta, filters_meta, records, value_orders, code_to_label = built
 
+        progress("render")
         print("🎨 Gerando HTML universal...")
         html = render_html_with_working_filters(
             os.path.basename(in_path), created_at, "",
-            vars_meta, filters_meta, records, value_orders, code_to_label
+            vars_meta, filters_meta, records, value_orders, code_to_label, preview
         )
-        
+
+        # Último ponto de cancelamento: nada é gravado depois dele
+        progress("write")
         with open(out_path, "w", encoding="utf-8") as f:
             f.write(html)
+        write_search_index(out_path, vars_meta, records)
+        write_analysis_summary(out_path, build_analysis_summary(
+            os.path.basename(in_path), created_at, vars_meta, filters_meta, records,
+            len(html.encode("utf-8")), time.perf_counter() - started
+        ))
+        return built
 
-        # 5. RESULTADO
-        mr_found = [v for v in vars_meta if v["type"] == "mr"]
-        string_found = [v for v in vars_meta if v["type"] == "string"]
-        
-        result_msg = f"""✅ Dashboard criado com sucesso!
+    try:
+        created_at, vars_meta, filters_meta, records, value_orders, code_to_label = run_with_progress(
+            "⚙️ Gerando dashboard", generate_job
+        )
+    except GenerationCancelled:
+        # Volta para a seleção: os dados continuam carregados
+        print("❌ Geração cancelada. Nenhum arquivo foi gravado.")
+        return 1, True
+
+    # 5. RESULTADO
+    mr_found = [v for v in vars_meta if v["type"] == "mr"]
+    string_found = [v for v in vars_meta if v["type"] == "string"]
+    
+    result_msg = f"""✅ Dashboard criado com sucesso!
 
 • Registros: {len(records)}
 • Variáveis analisadas: {len(vars_meta)}
 • Filtros: {len(filters_meta)}
 • Arquivo gerado: {os.path.basename(out_path)}
 """
+    
+    # Informar sobre ponderação
+    if selected_weight:
+        result_msg += f"⚖️ Ponderação aplicada: {selected_weight}\\n"
+    if preview:
+        result_msg += f"👁️ PRÉVIA (amostra de {preview['sample']} de {preview['total']})\n"
+    
+    # Adiciona informações resumidas sobre tipos especiais de variáveis
+    special_vars = []
+    mr_count = len([v for v in vars_meta if v["type"] == "mr"])
+    string_count = len([v for v in vars_meta if v["type"] == "string"])
+    
+    if string_count > 0:
+        special_vars.append(f"🟣 {string_count} Respostas Abertas")
+    if mr_count > 0:
+        special_vars.append(f"🟠 {mr_count} Respostas Múltiplas")
         
-        # Informar sobre ponderação
-        if selected_weight:
-            result_msg += f"⚖️ Ponderação aplicada: {selected_weight}\\n"
+    if special_vars:
+        result_msg += f"\n{' | '.join(special_vars)}"
+
+    result_msg += "\n\n🔁 Gerar outro dashboard com este arquivo?\n(dados já carregados, sem reler o .sav)"
+
+    root3 = tk.Tk()
+    root3.withdraw()
+    again = messagebox.askyesno("Dashboard Universal - Concluído", result_msg)
+    root3.destroy()
+    return 0, again
+
+def run_gui() -> int:
+    """Interface gráfica CORRIGIDA - exportselection=False é a chave"""
+    setup_logging()
+    try:
+        # 1. SELEÇÃO DO ARQUIVO
+        root = tk.Tk()
+        root.withdraw()
         
-        # Adiciona informações resumidas sobre tipos especiais de variáveis
-        special_vars = []
-        mr_count = len([v for v in vars_meta if v["type"] == "mr"])
-        string_count = len([v for v in vars_meta if v["type"] == "string"])
+        in_path = filedialog.askopenfilename(
+            title="Selecione o arquivo .sav (SPSS)",
+            filetypes=[("SPSS files", "*.sav"), ("All files", "*.*")]
+        )
         
-        if string_count > 0:
-            special_vars.append(f"🟣 {string_count} Respostas Abertas")
-        if mr_count > 0:
-            special_vars.append(f"🟠 {mr_count} Respostas Múltiplas")
-            
-        if special_vars:
-            result_msg += f"\n{' | '.join(special_vars)}"
+        if not in_path:
+            print("❌ Nenhum arquivo selecionado.")
+            return 1
+        
+        print(f"📂 Carregando: {os.path.basename(in_path)}")
+        
+        def read_job(progress):
+            loaded = read_sav_auto(in_path, progress)
+            fix_labels_in_meta(loaded[1])
+            profile_columns(*loaded)
+            return loaded
 
-        root3 = tk.Tk()
-        root3.withdraw()
-        messagebox.showinfo("Dashboard Universal - Concluído", result_msg)
-        root3.destroy()
-        return 0
+        try:
+            df, meta = run_with_progress("📂 Carregando arquivo", read_job, master=root)
+        except GenerationCancelled:
+            print("❌ Operação cancelada.")
+            return 1
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao carregar arquivo:\\n{str(e)}")
+            return 2
+        
+        print(f"✅ Arquivo carregado: {len(df)} registros, {len(df.columns)} variáveis")
+        
+        # Sessão: dados, rótulos e detecções ficam em memória entre dashboards
+        root.destroy()
+        session = {
+            "labels": {col: get_var_label(meta, col) or "" for col in df.columns},
+            "detection_cache": {},
+        }
+        generated = 0
+        while True:
+            status, again = gui_session_round(in_path, df, meta, session)
+            if status == 0:
+                generated += 1
+            if not again:
+                break
+        if generated > 1:
+            print(f"✅ Sessão encerrada: {generated} dashboards gerados com uma única leitura do arquivo")
+        return 0 if generated else status
 
     except Exception as e:
         try:
@@ -3571,44 +6836,219 @@ def run_gui() -> int:
 
 # ========== LINHA DE COMANDO ==========
 
+def print_column_profiles(profiles: Dict[str, dict], meta) -> None:
+    """Tabela de perfis para --profile-columns (ordem SPSS)."""
+    print(f"{'VARIÁVEL':<20} {'TIPO':<9} {'MEDIDA':<8} {'DISTINTOS':>9} {'VAZIOS':>7} {'NUM.':>5}  RÓTULO / ALERTA")
+    for col, prof in profiles.items():
+        label_text = get_var_label(meta, col) or ""
+        alert = f"  ⚠️ {prof['warning']}" if prof["warning"] else ""
+        print(f"{col:<20} {prof['physical_type']:<9} {prof['measure'] or '-':<8} {prof['unique']:>9} "
+              f"{prof['missing_rate'] * 100:>6.1f}% {prof['numeric_ratio'] * 100:>4.0f}%  {label_text[:50]}{alert}")
+    flagged = [prof for prof in profiles.values() if prof["warning"]]
+    print(f"\n📋 {len(profiles)} colunas • {len(flagged)} com alerta")
+
 def run_cli() -> int:
     import argparse
     p = argparse.ArgumentParser(description="Dashboard SPSS Universal")
-    p.add_argument("input", help="Caminho do arquivo .sav")
-    p.add_argument("--vars", type=str, required=True, help="Variáveis do relatório separadas por vírgula")
+    p.add_argument("input", nargs="?", help="Caminho do arquivo .sav")
+    p.add_argument("--vars", type=str, default="", help="Variáveis do relatório separadas por vírgula")
     p.add_argument("--filters", type=str, default="", help="Variáveis-filtro separadas por vírgula")
     p.add_argument("--cliente", type=str, default="", help="Nome do cliente para o título")
     p.add_argument("-o", "--output", default=None, help="HTML de saída")
+    p.add_argument("--top-n", type=str, default="",
+                   help="TOP N por variável (ex.: MUNICIPIO=20,PROFISSAO=10; 0 desativa o agrupamento)")
+    p.add_argument("--range-filters", type=str, default="",
+                   help="Variáveis de data/escala filtradas por intervalo, separadas por vírgula")
+    p.add_argument("--preview", type=int, default=0, metavar="N",
+                   help="Prévia rápida: amostra estratificada de N respondentes pelas variáveis-filtro")
+    p.add_argument("--profile", action="store_true",
+                   help="Mede tempo/CPU/memória de cada etapa e grava <saída>.profile.json")
+    p.add_argument("--cprofile", default=None, metavar="ARQUIVO",
+                   help="Grava também um dump do cProfile (abrir com pstats/snakeviz); liga o --profile")
+    p.add_argument("-v", "--verbose", action="store_true",
+                   help="Mostra o detalhe de depuração (por variável, valor de filtro e registro)")
+    p.add_argument("--profile-columns", action="store_true",
+                   help="Apenas lista o perfil das colunas (tipo, distintos, vazios) e sai")
+    p.add_argument("--data-module", action="store_true",
+                   help="Grava também <saída>.data.js, só com os dados, para o runtime único do Dashboard Master")
+    p.add_argument("--runtime", default=None, metavar="ARQUIVO",
+                   help="Gera apenas a página do runtime único (sem dados) do Dashboard Master e sai")
+    p.add_argument("--wave", action="append", default=[], metavar="ROTULO=ARQUIVO",
+                   help="Onda de uma pesquisa recorrente (repita, da mais antiga para a mais recente); "
+                        "gera um dashboard de tendência com todas as ondas")
+    p.add_argument("--shared-labels", default=None, metavar="PROJETO",
+                   help="Usa (ou cria, na primeira página) o dicionário de rótulos do projeto "
+                        "<PROJETO>.labels.<hash>.js na pasta de saída e embute na página só o que difere dele")
+    p.add_argument("--table", choices=sorted(TABLE_FORMATS), default=None,
+                   help="Grava também a tabela de respondentes processada (<saída>.parquet, ou .arrow = Arrow IPC "
+                        "para memory-map) e os metadados em <saída>.vars_meta.json")
+    p.add_argument("--serve", nargs="?", type=int, const=SERVER_DEFAULT_PORT, default=None, metavar="PORTA",
+                   help=f"Não grava o HTML: mantém os dados na memória e serve o dashboard e a API de "
+                        f"agregação em http://{SERVER_HOST}:PORTA/ (padrão {SERVER_DEFAULT_PORT}; 0 = porta livre)")
     args = p.parse_args()
-
+    if args.cprofile:
+        args.profile = True
+    setup_logging(args.verbose)
+    if args.runtime:
+        with open(args.runtime, "w", encoding="utf-8") as f:
+            f.write(render_runtime_html())
+        print(f"✅ Runtime do Dashboard Master criado: {args.runtime}")
+        return 0
+    waves = []
+    for item in args.wave:
+        if "=" not in item:
+            p.error(f"--wave espera ROTULO=ARQUIVO (recebido: {item})")
+        label, path = item.split("=", 1)
+        waves.append((label.strip(), path.strip()))
+    if len({label for label, _ in waves}) < len(waves):
+        p.error("--wave: os rótulos das ondas devem ser distintos")
+    if waves and args.input:
+        p.error("use o arquivo .sav ou --wave, não os dois")
+    if not args.input and not waves:
+        p.error("o arquivo .sav é obrigatório (exceto com --runtime ou --wave)")
+    if not args.vars and not args.profile_columns:
+        p.error("--vars é obrigatório (exceto com --profile-columns)")
+    if args.table and pa is None:
+        p.error("--table requer pyarrow (pip install pyarrow --break-system-packages)")
+    if args.serve is not None and (waves or args.shared_labels or args.data_module):
+        p.error("--serve não combina com --wave, --shared-labels nem --data-module")
+
+    cprofiler = None
+    if args.profile:
+        PROFILER.start()
+        if args.cprofile:
+            import cProfile
+            cprofiler = cProfile.Profile()
+            cprofiler.enable()
+
+    started = time.perf_counter()
     try:
-        df, meta = read_sav_auto(args.input)
-        fix_labels_in_meta(meta)
-        
+        sources = waves or [(None, args.input)]
         selected_vars = [v.strip() for v in args.vars.split(",") if v.strip()]
         filter_vars = [v.strip() for v in args.filters.split(",") if v.strip()] if args.filters else []
-        
-        out_path = args.output or os.path.splitext(args.input)[0] + "_dashboard_universal.html"
-        
-        created_at, vars_meta, filters_meta, records, value_orders, code_to_label = build_records_and_meta(
-            df, meta, selected_vars, filter_vars, os.path.basename(args.input), args.cliente, None
-        )
+        top_n_overrides = {}
+        for item in args.top_n.split(","):
+            if "=" in item:
+                name, value = item.split("=", 1)
+                top_n_overrides[name.strip()] = int(value)
+        range_filter_vars = [v.strip() for v in args.range_filters.split(",") if v.strip()]
+
+        preview = None
+        built = []
+        for label, path in sources:
+            with PROFILER.stage("read"):
+                df, meta = read_sav_auto(path)
+            with PROFILER.stage("meta_fix"):
+                fix_labels_in_meta(meta)
+            with PROFILER.stage("columns", columns=len(df.columns)):
+                profiles = profile_columns(df, meta)
+
+            if args.profile_columns:
+                if label is not None:
+                    print(f"\n🌊 Onda {label}: {path}")
+                print_column_profiles(profiles, meta)
+                continue
+
+            if args.preview:
+                total_rows = len(df)
+                df = stratified_sample(df, filter_vars, args.preview)
+                preview = preview or {"sample": 0, "total": 0, "strata": filter_vars}
+                preview["sample"] += len(df)
+                preview["total"] += total_rows
+                print(f"👁️ Prévia{f' ({label})' if label else ''}: {len(df)} de {total_rows} respondentes")
+
+            built.append((label, build_records_and_meta(
+                df, meta, selected_vars, filter_vars, os.path.basename(path), args.cliente, None,
+                top_n_overrides, range_filter_vars
+            )))
+
+        if args.profile_columns:
+            return 0
+
+        if waves:
+            file_source = " + ".join(os.path.basename(path) for _, path in waves)
+            suffix = "_dashboard_ondas_previa.html" if preview else "_dashboard_ondas.html"
+            out_path = args.output or os.path.splitext(waves[-1][1])[0] + suffix
+            created_at, vars_meta, filters_meta, records, value_orders, code_to_label = merge_waves(built)
+            wave_labels = [label for label, _ in waves]
+            print(f"🌊 {len(waves)} ondas: {', '.join(wave_labels)} ({len(records)} respondentes)")
+        else:
+            file_source = os.path.basename(args.input)
+            suffix = "_dashboard_previa.html" if preview else "_dashboard_universal.html"
+            out_path = args.output or os.path.splitext(args.input)[0] + suffix
+            created_at, vars_meta, filters_meta, records, value_orders, code_to_label = built[0][1]
+            wave_labels = None
+
+        if args.table:
+            with PROFILER.stage("table", rows=len(records)):
+                table_path, sidecar_path = write_respondent_table(
+                    out_path, args.table, file_source, created_at, args.cliente,
+                    vars_meta, filters_meta, records, value_orders, code_to_label, waves=wave_labels
+                )
+            print(f"🧊 Tabela processada: {table_path} (metadados: {sidecar_path})")
+
+        if args.serve is not None:
+            store = ColumnStore(vars_meta, filters_meta, records)
+            html = render_html_with_working_filters(
+                file_source, created_at, args.cliente,
+                vars_meta, filters_meta, records, value_orders, code_to_label, preview,
+                server={"total": len(records), "endpoint": SERVER_ENDPOINT}
+            )
+            run_server(store, html, port=args.serve)
+            return 0
+
+        shared_labels = None
+        if args.shared_labels:
+            shared_labels = shared_label_dictionary(
+                os.path.dirname(out_path), args.shared_labels,
+                build_label_dictionary(vars_meta, filters_meta, value_orders, code_to_label)
+            )
+            print(f"📚 Dicionário de rótulos: {shared_labels[0]}")
 
         html = render_html_with_working_filters(
-            os.path.basename(args.input), created_at, args.cliente,
-            vars_meta, filters_meta, records, value_orders, code_to_label
+            file_source, created_at, args.cliente,
+            vars_meta, filters_meta, records, value_orders, code_to_label, preview,
+            waves=wave_labels, shared_labels=shared_labels
         )
         
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(html)
+        with PROFILER.stage("write", bytes=len(html.encode("utf-8"))):
+            with open(out_path, "w", encoding="utf-8") as f:
+                f.write(html)
         
         print(f"✅ Dashboard universal criado: {out_path}")
+        print(f"🔎 Índice de busca: {write_search_index(out_path, vars_meta, records)}")
+        summary = build_analysis_summary(
+            file_source, created_at, vars_meta, filters_meta, records,
+            len(html.encode("utf-8")), time.perf_counter() - started
+        )
+        print(f"🗂️ Resumo: {write_analysis_summary(out_path, summary)}")
+        if args.data_module:
+            module_path = os.path.splitext(out_path)[0] + ".data.js"
+            analysis_id = os.path.splitext(os.path.basename(out_path))[0]
+            with open(out_path, "rb") as f:
+                html_hash = hashlib.sha256(f.read()).hexdigest()[:12]
+            with open(module_path, "w", encoding="utf-8") as f:
+                f.write(render_data_module(
+                    analysis_id, file_source, created_at, args.cliente,
+                    vars_meta, filters_meta, records, value_orders, code_to_label,
+                    waves=wave_labels, html_hash=html_hash
+                ))
+            print(f"📦 Módulo de dados: {module_path}")
+        if args.profile:
+            PROFILER.write(os.path.splitext(out_path)[0] + ".profile.json")
         return 0
         
     except Exception as e:
         print(f"❌ Erro: {e}", file=sys.stderr)
         return 1
 
+    finally:
+        PROFILER.stop()
+        if cprofiler:
+            cprofiler.disable()
+            cprofiler.dump_stats(args.cprofile)
+            print(f"📝 cProfile: {args.cprofile}")
+
 # ========== MAIN ==========
 
 if __name__ == "__main__":